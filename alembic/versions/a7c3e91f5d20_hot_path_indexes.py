@@ -0,0 +1,34 @@
+"""hot path indexes
+
+Revision ID: a7c3e91f5d20
+Revises: cd7dc0a03ddd
+Create Date: 2026-10-19 10:12:41.302117
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a7c3e91f5d20'
+down_revision: Union[str, None] = 'cd7dc0a03ddd'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # additional_ingredients.order_pizza_id jest już pierwszą kolumną
+    # unikalnego indeksu _order_pizza_ingredient_uc, więc nie dublujemy go.
+    op.create_index('ix_order_pizzas_order_id_id', 'order_pizzas', ['order_id', 'id'], unique=False)
+    op.create_index('ix_transcription_logs_order_id_id', 'transcription_logs', ['order_id', 'id'], unique=False)
+    op.create_index('ix_pizzas_name_lower', 'pizzas', [sa.text('lower(name)')], unique=False)
+    op.create_index('ix_ingredients_name_lower', 'ingredients', [sa.text('lower(name)')], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_ingredients_name_lower', table_name='ingredients')
+    op.drop_index('ix_pizzas_name_lower', table_name='pizzas')
+    op.drop_index('ix_transcription_logs_order_id_id', table_name='transcription_logs')
+    op.drop_index('ix_order_pizzas_order_id_id', table_name='order_pizzas')
@@ -0,0 +1,51 @@
+"""restore pizza doughs
+
+Revision ID: e5b8d2a14c07
+Revises: a7c3e91f5d20
+Create Date: 2026-10-19 14:03:52.418230
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5b8d2a14c07'
+down_revision: Union[str, None] = 'a7c3e91f5d20'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Po nazwie klucza głównego downgrade rozpoznaje tabelę utworzoną przez tę rewizję.
+RESTORED_PKEY = 'pizza_doughs_restored_pkey'
+
+
+def _inspector():
+    # W trybie --sql nie ma połączenia - skrypt zakłada/usuwa tabelę bez sprawdzania.
+    return None if op.get_context().as_sql else sa.inspect(op.get_bind())
+
+
+def upgrade() -> None:
+    # Tabela powstała w b316bd4cf563, ale autogenerate w 688fd07a24b7 ją usunął,
+    # bo nie było jej w modelach. init_db.sql nadal ją wypełnia. Bazy, w których
+    # przetrwała (założone ręcznie z modeli), zostawiamy bez zmian.
+    inspector = _inspector()
+    if inspector is not None and inspector.has_table('pizza_doughs'):
+        return
+    op.create_table('pizza_doughs',
+    sa.Column('pizza_id', sa.Integer(), nullable=False),
+    sa.Column('dough_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['dough_id'], ['doughs.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['pizza_id'], ['pizzas.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('pizza_id', 'dough_id', name=RESTORED_PKEY)
+    )
+
+
+def downgrade() -> None:
+    # Tylko tabelę, którą założył upgrade - istniejącej wcześniej nie ruszamy.
+    inspector = _inspector()
+    if inspector is not None and (not inspector.has_table('pizza_doughs')
+                                  or inspector.get_pk_constraint('pizza_doughs').get('name') != RESTORED_PKEY):
+        return
+    op.drop_table('pizza_doughs')
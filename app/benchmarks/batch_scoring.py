@@ -0,0 +1,94 @@
+# path/filename: benchmarks/batch_scoring.py
+"""
+Ocena podobieństwa tokenów do nazw z menu: para po parze (fuzzywuzzy w pętli,
+jak w parserze) vs macierz token x nazwa liczona raz na wypowiedź (utils/batch_scoring.py).
+
+Wypowiedzi to długie zamówienia z app/test_analyze_pizza_order.py. Parser ocenia
+każdy token kilka razy (liczba pizz, atrybuty, dodatki) - odwzorowujemy to
+parametrem --stages. Menu można sztucznie powiększyć (--menu-size), żeby zobaczyć
+skalowanie. Benchmark nie potrzebuje bazy ani modelu spaCy.
+
+    python -m app.benchmarks.batch_scoring --repeat 20 --menu-size 200
+"""
+import argparse
+import re
+import statistics
+import time
+from typing import List
+
+from fuzzywuzzy import fuzz
+
+from app.test_analyze_pizza_order import example_orders_by_chat_gpt
+from app.utils.batch_scoring import ScoreMatrix
+
+
+PIZZAS = ["margherita", "pepperoni", "wegetariańska", "hawajska", "capriciosa"]
+INGREDIENTS = ["pomidor", "mozzarella", "bazylia", "salami", "pieczarki", "parmezan", "kurczak", "szynka",
+               "ananas", "oliwki", "papryka", "kukurydza"]
+LONG_ORDER_MIN_CHARS = 200
+
+_WORD = re.compile(r"\w+")
+
+
+def _pairwise_best(query: str, names: List[str]):
+    best_score, best_name = 0, None
+    for name in names:
+        score = fuzz.ratio(query, name)
+        if score > best_score:
+            best_score, best_name = score, name
+    return (best_name, best_score)
+
+
+def _run_pairwise(tokens: List[str], pizzas: List[str], ingredients: List[str], stages: int):
+    results = []
+    for _ in range(stages):
+        results = [(_pairwise_best(t, pizzas), _pairwise_best(t, ingredients)) for t in tokens]
+    return results
+
+
+def _run_matrix(tokens: List[str], pizzas: List[str], ingredients: List[str], stages: int):
+    queries = list(dict.fromkeys(tokens))
+    pizza_matrix = ScoreMatrix(queries, pizzas)
+    ingredient_matrix = ScoreMatrix(queries, ingredients)
+    results = []
+    for _ in range(stages):
+        results = [(pizza_matrix.best(t), ingredient_matrix.best(t)) for t in tokens]
+    return results
+
+
+def _padded(names: List[str], size: int) -> List[str]:
+    return names + [f"{names[i % len(names)]} {i}" for i in range(max(0, size - len(names)))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--stages", type=int, default=3)
+    parser.add_argument("--menu-size", type=int, default=0, help="sztuczne powiększenie list pizz i składników")
+    args = parser.parse_args()
+
+    pizzas = _padded(PIZZAS, args.menu_size)
+    ingredients = _padded(INGREDIENTS, args.menu_size)
+    orders = [_WORD.findall(text.lower()) for text in example_orders_by_chat_gpt if len(text) >= LONG_ORDER_MIN_CHARS]
+
+    timings = {"pairwise": [], "matrix": []}
+    for _ in range(args.repeat):
+        for tokens in orders:
+            for name, run in (("pairwise", _run_pairwise), ("matrix", _run_matrix)):
+                start = time.perf_counter()
+                run(tokens, pizzas, ingredients, args.stages)
+                timings[name].append(time.perf_counter() - start)
+
+    mismatches = sum(_run_pairwise(tokens, pizzas, ingredients, 1) != _run_matrix(tokens, pizzas, ingredients, 1)
+                     for tokens in orders)
+    print(f"{len(orders)} long orders, avg {statistics.fmean(len(t) for t in orders):.0f} tokens, "
+          f"{len(pizzas)} pizzas x {len(ingredients)} ingredients, {args.stages} stages")
+    print(f"{'method':<10}{'p50 ms':>9}{'mean ms':>9}")
+    for name, values in timings.items():
+        print(f"{name:<10}{statistics.median(values) * 1000:>9.2f}{statistics.fmean(values) * 1000:>9.2f}")
+    speedup = statistics.fmean(timings["pairwise"]) / statistics.fmean(timings["matrix"])
+    print(f"speedup x{speedup:.1f}, orders with different best matches: {mismatches}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+# path/filename: benchmarks/db_sync_vs_async.py
+"""
+Porównanie ścieżki synchronicznej (Session + pula wątków, jak dawniej w FastAPI)
+z asynchroniczną (AsyncSession + asyncpg) na tym samym obciążeniu bazy.
+
+Każde "połączenie telefoniczne" to: nowe zamówienie, dwie pozycje, odczyt pozycji,
+odczyt ostatniej transkrypcji i zapis nowej - czyli to, co robią /orders/init
+i /conversation/*. Kod ORM jest wspólny, różni się tylko sposób uruchomienia.
+
+    python -m app.benchmarks.db_sync_vs_async --calls 500 --concurrency 50
+"""
+import argparse
+import asyncio
+import statistics
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import List
+
+from sqlalchemy.orm import Session
+
+from app.database import AsyncSessionLocal, SessionLocal, async_engine, engine
+from app.models import Client, Order, OrderPizzas, TranscriptionLog
+
+
+def _simulated_call(session: Session, client_id: int):
+    order = Order(client_id=client_id)
+    session.add(order)
+    session.commit()
+    for _ in range(2):
+        session.add(OrderPizzas(order_id=order.id, quantity=1, is_partial=True))
+        session.commit()
+    session.query(OrderPizzas).filter(OrderPizzas.order_id == order.id).all()
+    session.query(TranscriptionLog).filter(TranscriptionLog.order_id == order.id) \
+        .order_by(TranscriptionLog.id.desc()).first()
+    session.add(TranscriptionLog(content="dużą margheritę", updated_slots="", parsed="[]", order_id=order.id))
+    session.commit()
+
+
+def _timed_sync_call(client_id: int) -> float:
+    start = time.perf_counter()
+    with SessionLocal() as session:
+        _simulated_call(session, client_id)
+    return time.perf_counter() - start
+
+
+def run_sync(calls: int, concurrency: int, client_id: int) -> List[float]:
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        return list(executor.map(_timed_sync_call, [client_id] * calls))
+
+
+async def run_async(calls: int, concurrency: int, client_id: int) -> List[float]:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def timed_call() -> float:
+        async with semaphore:
+            start = time.perf_counter()
+            async with AsyncSessionLocal() as session:
+                await session.run_sync(_simulated_call, client_id)
+            return time.perf_counter() - start
+
+    latencies = await asyncio.gather(*(timed_call() for _ in range(calls)))
+    await async_engine.dispose()
+    return latencies
+
+
+def _report(name: str, latencies: List[float], wall: float):
+    latencies = sorted(latencies)
+    quantiles = statistics.quantiles(latencies, n=100)
+    print(f"{name:>6}: {len(latencies) / wall:8.1f} calls/s | "
+          f"p50 {quantiles[49] * 1000:7.1f} ms | p95 {quantiles[94] * 1000:7.1f} ms | "
+          f"p99 {quantiles[98] * 1000:7.1f} ms | wall {wall:.2f} s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=40, help="40 = domyślny limit wątków AnyIO")
+    args = parser.parse_args()
+
+    with SessionLocal() as session:
+        client = Client(phone=f"bench-{uuid.uuid4().hex[:12]}")
+        session.add(client)
+        session.commit()
+        client_id = client.id
+
+    try:
+        start = time.perf_counter()
+        latencies = run_sync(args.calls, args.concurrency, client_id)
+        _report("sync", latencies, time.perf_counter() - start)
+
+        start = time.perf_counter()
+        latencies = asyncio.run(run_async(args.calls, args.concurrency, client_id))
+        _report("async", latencies, time.perf_counter() - start)
+    finally:
+        with SessionLocal() as session:
+            session.query(Order).filter(Order.client_id == client_id).delete()
+            session.query(Client).filter(Client.id == client_id).delete()
+            session.commit()
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
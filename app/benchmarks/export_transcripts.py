@@ -0,0 +1,51 @@
+# path/filename: benchmarks/export_transcripts.py
+"""
+Eksport rozmów z transcription_logs do korpusu parsera (app/benchmarks/corpus/).
+
+Jedno zamówienie = jeden wpis: wypowiedzi w kolejności zapisu, zanonimizowane
+(telefony, e-maile, adresy -> znaczniki). Jako etykiety wstawiamy sloty, które parser
+zwrócił po ostatniej wypowiedzi - to tylko propozycja, dlatego wpis ma "reviewed": false
+i benchmark go pomija, dopóki ktoś nie poprawi etykiet i nie przestawi flagi.
+
+    python -m app.benchmarks.export_transcripts --limit 200 >> app/benchmarks/corpus/orders.jsonl
+"""
+import argparse
+import ast
+from itertools import groupby
+
+from app.database import SessionLocal
+from app.models import TranscriptionLog
+from app.utils.parser_corpus import corpus_line, from_parser
+
+
+def _draft_labels(parsed: str) -> list:
+    try:
+        return [from_parser(slot) for slot in ast.literal_eval(parsed)]
+    except (ValueError, SyntaxError, KeyError, TypeError):
+        return []
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--limit", type=int, default=100, help="maksymalna liczba zamówień")
+    parser.add_argument("--after-order", type=int, default=0, help="tylko zamówienia o id większym niż podane")
+    args = parser.parse_args()
+
+    with SessionLocal() as db:
+        order_ids = [row.order_id for row in db.query(TranscriptionLog.order_id)
+                     .filter(TranscriptionLog.order_id > args.after_order)
+                     .distinct().order_by(TranscriptionLog.order_id).limit(args.limit)]
+        if not order_ids:
+            return
+        rows = (db.query(TranscriptionLog.order_id, TranscriptionLog.content, TranscriptionLog.parsed)
+                .filter(TranscriptionLog.order_id.in_(order_ids))
+                .order_by(TranscriptionLog.order_id, TranscriptionLog.id).all())
+
+    for order_id, logs in groupby(rows, key=lambda row: row.order_id):
+        logs = list(logs)
+        print(corpus_line(f"order-{order_id}", [log.content for log in logs], _draft_labels(logs[-1].parsed or "[]"),
+                          source="transcription_logs"))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,229 @@
+# path/filename: benchmarks/load_test.py
+"""
+Test obciążeniowy całych rozmów: ilu równoczesnych rozmówców wytrzyma jedna maszyna,
+zanim p99 się rozjedzie.
+
+Każdy wirtualny rozmówca w pętli przechodzi pełny przebieg rozmowy telefonicznej:
+/orders/init -> /conversation/start -> /conversation/continue (kolejne wypowiedzi)
+-> /orders/summary. Skrypty rozmów to wpisy korpusu parsera (app/benchmarks/corpus/),
+a nagrane rozmowy z produkcji dokłada się tam przez app.benchmarks.export_transcripts -
+etykiety nie są tu potrzebne, więc bierzemy też wpisy nieprzejrzane.
+
+Serwer uruchamiamy osobno (lokalny Postgres albo SQLite, patrz DATABASE_URL).
+Poziomy obciążenia z --callers mierzymy po kolei, każdy przez --duration sekund.
+Raport per poziom i krok: p50/p95/p99, odsetek błędów i liczba zapytań SQL na żądanie
+(z nagłówka X-DB-Queries, gdy serwer ma APP_DEBUG=1, inaczej z różnicy /monitoring/queries -
+dokładnej tylko przy jednym workerze). Wynik trafia do pliku JSON; --compare pokazuje
+zmianę p99 względem wcześniejszego przebiegu.
+
+    python -m app.benchmarks.load_test --base-url http://localhost:8000 --callers 1,4,8,16 --duration 30
+    python -m app.benchmarks.load_test --callers 8 --compare load-results/20240101-120000.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+import httpx
+
+from app.utils.parser_corpus import load_corpus
+
+
+CORPUS = os.path.join(os.path.dirname(__file__), "corpus", "orders.jsonl")
+STEPS = ("init", "start", "continue", "summary")
+STEP_ROUTES = {
+    "init": "/orders/init",
+    "start": "/conversation/start",
+    "continue": "/conversation/continue",
+    "summary": "/orders/summary/{order_id}",
+}
+
+
+class StepStats:
+    __slots__ = ("latencies", "errors", "queries")
+
+    def __init__(self):
+        self.latencies: List[float] = []
+        self.errors: Dict[str, int] = defaultdict(int)
+        self.queries: List[int] = []
+
+    def report(self, elapsed: float, route_queries: Optional[float]) -> dict:
+        requests = len(self.latencies) + sum(self.errors.values())
+        latencies = sorted(self.latencies)
+        result = {
+            "requests": requests,
+            "per_s": requests / elapsed if elapsed else 0.0,
+            "error_rate": sum(self.errors.values()) / requests if requests else 0.0,
+            "errors": dict(self.errors),
+            "queries_per_request": statistics.fmean(self.queries) if self.queries else route_queries,
+            "max_queries": max(self.queries) if self.queries else None,
+        }
+        if len(latencies) >= 2:
+            percentiles = statistics.quantiles(latencies, n=100, method="inclusive")
+            result.update(p50_ms=percentiles[49] * 1000, p95_ms=percentiles[94] * 1000,
+                          p99_ms=percentiles[98] * 1000, max_ms=latencies[-1] * 1000)
+        return result
+
+
+class CallFailed(Exception):
+    pass
+
+
+async def _request(client: httpx.AsyncClient, stats: Dict[str, StepStats], step: str, method: str, url: str,
+                   **kwargs) -> dict:
+    started = time.perf_counter()
+    try:
+        response = await client.request(method, url, **kwargs)
+    except httpx.HTTPError as exc:
+        stats[step].errors[type(exc).__name__] += 1
+        raise CallFailed() from exc
+    elapsed = time.perf_counter() - started
+    if response.status_code >= 400:
+        stats[step].errors[str(response.status_code)] += 1
+        raise CallFailed()
+    stats[step].latencies.append(elapsed)
+    if "X-DB-Queries" in response.headers:
+        stats[step].queries.append(int(response.headers["X-DB-Queries"]))
+    return response.json()
+
+
+async def _call(client: httpx.AsyncClient, stats: Dict[str, StepStats], script: List[str], phone: str,
+                think_time: float):
+    """Jedna rozmowa telefoniczna; błąd kroku przerywa rozmowę jak rozłączenie."""
+    order = await _request(client, stats, "init", "POST", "/orders/init", json={"phone": phone})
+    conversation = await _request(client, stats, "start", "POST", "/conversation/start",
+                                  json={"order_id": order["id"], "initial_text": script[0]})
+    for text in script[1:]:
+        if think_time:
+            await asyncio.sleep(think_time)
+        await _request(client, stats, "continue", "POST", "/conversation/continue",
+                       json={"conversation_id": conversation["conversation_id"], "user_text": text})
+    await _request(client, stats, "summary", "GET", f"/orders/summary/{order['id']}")
+
+
+async def _caller(client, stats, scripts, phones, deadline: float, think_time: float, rng: random.Random) -> int:
+    calls = 0
+    while time.perf_counter() < deadline:
+        try:
+            await _call(client, stats, rng.choice(scripts), rng.choice(phones), think_time)
+        except CallFailed:
+            pass
+        calls += 1
+    return calls
+
+
+async def _route_queries(client: httpx.AsyncClient) -> Dict[str, dict]:
+    try:
+        return (await client.get("/monitoring/queries")).json()
+    except (httpx.HTTPError, ValueError):
+        return {}
+
+
+def _route_query_average(before: dict, after: dict, route: str) -> Optional[float]:
+    requests = after.get(route, {}).get("requests", 0) - before.get(route, {}).get("requests", 0)
+    if requests <= 0:
+        return None
+    return (after[route]["queries"] - before.get(route, {}).get("queries", 0)) / requests
+
+
+async def _run_level(args, callers: int, scripts: List[List[str]], phones: List[str]) -> dict:
+    limits = httpx.Limits(max_connections=callers, max_keepalive_connections=callers)
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=args.timeout, limits=limits) as client:
+        stats = {step: StepStats() for step in STEPS}
+        queries_before = await _route_queries(client)
+        started = time.perf_counter()
+        deadline = started + args.duration
+        calls = await asyncio.gather(*(
+            _caller(client, stats, scripts, phones, deadline, args.think_ms / 1000, random.Random(args.seed + n))
+            for n in range(callers)
+        ))
+        elapsed = time.perf_counter() - started
+        queries_after = await _route_queries(client)
+    return {
+        "callers": callers,
+        "seconds": elapsed,
+        "calls": sum(calls),
+        "calls_per_s": sum(calls) / elapsed,
+        "steps": {step: stats[step].report(elapsed, _route_query_average(queries_before, queries_after,
+                                                                          STEP_ROUTES[step]))
+                  for step in STEPS},
+    }
+
+
+async def _wait_ready(base_url: str, timeout: float):
+    deadline = time.perf_counter() + timeout
+    async with httpx.AsyncClient(base_url=base_url) as client:
+        while True:
+            try:
+                if (await client.get("/monitoring/ready")).status_code == 200:
+                    return
+            except httpx.HTTPError:
+                pass
+            if time.perf_counter() > deadline:
+                raise SystemExit(f"{base_url} not ready after {timeout:.0f} s")
+            await asyncio.sleep(1)
+
+
+def _print_level(level: dict, previous: Optional[dict]):
+    print(f"\n{level['callers']} callers: {level['calls']} calls in {level['seconds']:.1f} s "
+          f"({level['calls_per_s']:.1f} calls/s)")
+    print(f"{'step':<10}{'req/s':>8}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'max ms':>9}{'errors':>8}{'SQL/req':>9}"
+          f"{'  p99 vs prev' if previous else ''}")
+    for step, result in level["steps"].items():
+        if not result["requests"]:
+            continue
+        queries = result["queries_per_request"]
+        line = (f"{step:<10}{result['per_s']:>8.1f}{result.get('p50_ms', 0):>9.1f}{result.get('p95_ms', 0):>9.1f}"
+                f"{result.get('p99_ms', 0):>9.1f}{result.get('max_ms', 0):>9.1f}{result['error_rate']:>8.1%}"
+                f"{'-' if queries is None else format(queries, '.1f'):>9}")
+        old = (previous or {}).get("steps", {}).get(step, {})
+        if old.get("p99_ms") and result.get("p99_ms"):
+            line += f"  {(result['p99_ms'] / old['p99_ms'] - 1):+.0%}"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--callers", default="1,4,8,16", help="poziomy równoczesnych rozmów, po przecinku")
+    parser.add_argument("--duration", type=float, default=30, help="sekundy na poziom")
+    parser.add_argument("--think-ms", type=float, default=0, help="przerwa między wypowiedziami (mówienie klienta)")
+    parser.add_argument("--corpus", action="append", help="pliki JSONL ze skryptami rozmów (domyślnie korpus parsera)")
+    parser.add_argument("--phones", type=int, default=50, help="ilu różnych klientów (numerów) dzwoni")
+    parser.add_argument("--timeout", type=float, default=30)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=os.path.join("load-results", time.strftime("%Y%m%d-%H%M%S") + ".json"))
+    parser.add_argument("--compare", help="wcześniejszy plik wyników")
+    args = parser.parse_args()
+
+    scripts = [entry["turns"] for path in (args.corpus or [CORPUS])
+               for entry in load_corpus(path, include_unreviewed=True) if entry["turns"]]
+    phones = [f"555{n:06d}" for n in range(args.phones)]
+    previous = {}
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            previous = {level["callers"]: level for level in json.load(f)["levels"]}
+
+    asyncio.run(_wait_ready(args.base_url, args.timeout))
+    started = time.strftime("%Y-%m-%dT%H:%M:%S")
+    levels = []
+    for callers in (int(value) for value in args.callers.split(",")):
+        level = asyncio.run(_run_level(args, callers, scripts, phones))
+        _print_level(level, previous.get(callers))
+        levels.append(level)
+
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump({"base_url": args.base_url, "started": started,
+                   "duration": args.duration, "think_ms": args.think_ms, "scripts": len(scripts),
+                   "levels": levels}, f, indent=2)
+    print(f"\nresults saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+# path/filename: benchmarks/nlp_profiles.py
+"""
+Porównanie profili potoku spaCy (app.utils.nlp.NLP_PROFILES) na przykładowych zamówieniach.
+
+Każdy profil mierzymy w osobnym procesie, żeby pamięć (max RSS) nie mieszała
+się między modelami. Raport: czas ładowania, latencja na zdanie, pamięć oraz
+zgodność z profilem "full" na atrybutach, które czyta parser (text, lemma_, like_num).
+
+    python -m app.benchmarks.nlp_profiles --repeat 5
+"""
+import argparse
+import json
+import resource
+import statistics
+import subprocess
+import sys
+import time
+
+from app.test_analyze_pizza_order import example_orders_by_chat_gpt
+from app.utils.nlp import NLP_PROFILES, load_nlp
+
+
+def _measure(profile: str, repeat: int) -> dict:
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.perf_counter()
+    nlp = load_nlp(profile)
+    load_time = time.perf_counter() - start
+
+    parsed = []
+    latencies = []
+    for _ in range(repeat):
+        parsed = []
+        for text in example_orders_by_chat_gpt:
+            start = time.perf_counter()
+            doc = nlp(text.lower())
+            latencies.append(time.perf_counter() - start)
+            parsed.append([(t.text, t.lemma_, t.like_num) for t in doc])
+    return {
+        "profile": profile,
+        "pipeline": nlp.pipe_names,
+        "vectors": nlp.vocab.vectors.shape[0],
+        "load_s": load_time,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "mean_ms": statistics.fmean(latencies) * 1000,
+        "max_rss_mb": (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss_before) / 1024,
+        "tokens": parsed,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--profile", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.profile:
+        json.dump(_measure(args.profile, args.repeat), sys.stdout)
+        return
+
+    results = {}
+    for profile in NLP_PROFILES:
+        output = subprocess.run(
+            [sys.executable, "-m", "app.benchmarks.nlp_profiles", "--profile", profile, "--repeat", str(args.repeat)],
+            check=True, capture_output=True, text=True,
+        ).stdout
+        results[profile] = json.loads(output)
+
+    reference = results["full"]["tokens"]
+    print(f"{'profile':<16}{'load s':>8}{'p50 ms':>9}{'mean ms':>9}{'RSS MB':>9}{'equal':>8}  pipeline")
+    for profile, result in results.items():
+        equal = sum(a == b for a, b in zip(result["tokens"], reference)) / len(reference)
+        print(f"{profile:<16}{result['load_s']:>8.2f}{result['p50_ms']:>9.2f}{result['mean_ms']:>9.2f}"
+              f"{result['max_rss_mb']:>9.0f}{equal:>8.0%}  {', '.join(result['pipeline'])}"
+              f" (vectors: {result['vectors']})")
+
+
+if __name__ == "__main__":
+    main()
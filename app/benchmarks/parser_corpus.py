@@ -0,0 +1,142 @@
+# path/filename: benchmarks/parser_corpus.py
+"""
+Benchmark i test trafności parsera na oznaczonym korpusie (app/benchmarks/corpus/).
+
+Każdy wpis korpusu to rozmowa: pierwsza wypowiedź idzie przez parse_order, kolejne
+przez parse_order_in_context - tak jak /conversation/start i /continue, ale z pominięciem
+parse_cache. Menu pochodzi ze stałego katalogu (corpus/menu.json), więc benchmark
+nie potrzebuje bazy; potrzebuje tylko modelu spaCy (NLP_MODEL / NLP_PROFILE jak w aplikacji).
+
+Raport: latencja na wypowiedź (p50/p95/p99), wypowiedzi na sekundę, czas etapów
+parsera (z histogramu pizza_parse_stage_seconds) oraz precision/recall per pole
+i dla całych slotów. --min-f1 kończy się kodem 1, gdy F1 slotów spadnie poniżej progu
+(do CI), --json zapisuje wynik do porównania między wersjami.
+
+    python -m app.benchmarks.parser_corpus --repeat 5 --errors
+    python -m app.benchmarks.parser_corpus --min-f1 0.6 --json parser-corpus.json
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+from app.routers.analyze_order import PizzaParser
+from app.utils import metrics
+from app.utils.parser_corpus import CorpusScore, FIELDS, from_parser, load_corpus, load_menu
+
+
+CORPUS_DIR = os.path.join(os.path.dirname(__file__), "corpus")
+
+
+def _run_dialog(parser: PizzaParser, turns, latencies=None):
+    slots = []
+    for number, text in enumerate(turns):
+        start = time.perf_counter()
+        if number == 0:
+            slots = parser._parse_order_uncached(text)
+        else:
+            slots = parser.parse_order_in_context(text, slots)
+        if latencies is not None:
+            latencies.append(time.perf_counter() - start)
+    return slots
+
+
+def _stage_times(before: dict, after: dict) -> dict:
+    stages = {}
+    for labels, (count, total) in after.items():
+        count_before, total_before = before.get(labels, (0, 0.0))
+        if count > count_before:
+            stages[labels[0]] = {"calls": count - count_before, "total_s": total - total_before}
+    return stages
+
+
+def _format_slot(slot) -> str:
+    if slot is None:
+        return "-"
+    extras = ", ".join(f"{name} x{qty}" for name, qty in slot["extras"])
+    return (f"{slot['pizza_count']}x {slot['pizza']} big={slot['big_size']} thick={slot['on_thick_pastry']}"
+            f"{' + ' + extras if extras else ''}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", default=os.path.join(CORPUS_DIR, "orders.jsonl"))
+    parser.add_argument("--menu", default=os.path.join(CORPUS_DIR, "menu.json"))
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--include-unreviewed", action="store_true",
+                        help="także wpisy z eksportu, których etykiet nikt jeszcze nie poprawił")
+    parser.add_argument("--errors", action="store_true", help="wypisz sloty niezgodne z etykietami")
+    parser.add_argument("--min-f1", type=float, default=None, help="próg F1 slotów; poniżej kod wyjścia 1")
+    parser.add_argument("--json", help="zapisz wynik do pliku")
+    args = parser.parse_args()
+
+    entries = load_corpus(args.corpus, args.include_unreviewed)
+    pizza_parser = PizzaParser(catalog=load_menu(args.menu))
+
+    # rozgrzewka: indeksy katalogu, tablica lematów, cache spaCy
+    start = time.perf_counter()
+    for entry in entries:
+        _run_dialog(pizza_parser, entry["turns"])
+    warmup_s = time.perf_counter() - start
+
+    score = CorpusScore()
+    errors = []
+    for entry in entries:
+        predicted = [from_parser(slot) for slot in _run_dialog(pizza_parser, entry["turns"])]
+        errors.extend((entry["id"], expected, got) for expected, got in score.add(entry["expected"], predicted))
+    accuracy = score.report()
+
+    latencies = []
+    stages_before = metrics.PARSE_STAGE.snapshot()
+    start = time.perf_counter()
+    for _ in range(args.repeat):
+        for entry in entries:
+            _run_dialog(pizza_parser, entry["turns"], latencies)
+    elapsed = time.perf_counter() - start
+    stages = _stage_times(stages_before, metrics.PARSE_STAGE.snapshot())
+
+    percentiles = statistics.quantiles(latencies, n=100, method="inclusive")
+    result = {
+        "entries": len(entries),
+        "utterances": len(latencies),
+        "warmup_s": warmup_s,
+        "latency_ms": {"p50": percentiles[49] * 1000, "p95": percentiles[94] * 1000,
+                       "p99": percentiles[98] * 1000, "max": max(latencies) * 1000},
+        "utterances_per_s": len(latencies) / elapsed,
+        "stages": stages,
+        "accuracy": accuracy,
+        "catalog": pizza_parser.catalog.version,
+    }
+
+    latency = result["latency_ms"]
+    print(f"{result['entries']} entries, {result['utterances']} utterances ({args.repeat} repeats), "
+          f"warm-up {warmup_s:.2f} s")
+    print(f"latency ms: p50 {latency['p50']:.2f}  p95 {latency['p95']:.2f}  p99 {latency['p99']:.2f}  "
+          f"max {latency['max']:.2f}   {result['utterances_per_s']:.1f} utterances/s")
+    print(f"\n{'stage':<16}{'calls':>8}{'ms/utt':>9}{'share':>8}")
+    stage_total = sum(stage["total_s"] for stage in stages.values()) or 1.0
+    for name, stage in sorted(stages.items(), key=lambda item: -item[1]["total_s"]):
+        print(f"{name:<16}{stage['calls']:>8}{stage['total_s'] * 1000 / len(latencies):>9.3f}"
+              f"{stage['total_s'] / stage_total:>8.0%}")
+    print(f"\n{'':<16}{'prec':>7}{'recall':>8}{'F1':>7}{'support':>9}")
+    for name, values in [("slots", accuracy["slots"])] + [(field, accuracy["fields"][field]) for field in FIELDS] \
+            + [("all fields", accuracy["micro"])]:
+        print(f"{name:<16}{values['precision']:>7.2f}{values['recall']:>8.2f}{values['f1']:>7.2f}"
+              f"{values['support']:>9}")
+
+    if args.errors:
+        print()
+        for entry_id, expected, got in errors:
+            print(f"{entry_id:<12} expected {_format_slot(expected)}\n{'':<12} got      {_format_slot(got)}")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2, ensure_ascii=False)
+    if args.min_f1 is not None and accuracy["slots"]["f1"] < args.min_f1:
+        print(f"\nslot F1 {accuracy['slots']['f1']:.3f} below --min-f1 {args.min_f1}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
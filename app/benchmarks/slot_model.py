@@ -0,0 +1,123 @@
+# path/filename: benchmarks/slot_model.py
+"""
+Stan rozmowy: sloty jako zagnieżdżone słowniki vs Slot z __slots__ (utils/slot_model.py).
+
+Mierzy:
+  - pamięć na rozmowę (tracemalloc, --conversations rozmów po --slots pozycji),
+  - czas wyznaczenia różnic po wypowiedzi: dawna ścieżka (literal_eval zapisanego
+    str(slotów) z TranscriptionLog + porównanie słowników) vs diff_slots na Slotach,
+  - koszt konwersji Slot -> słowniki dla parsera i z powrotem.
+Nie potrzebuje bazy ani modelu spaCy - katalog jest budowany w pamięci.
+
+    python -m app.benchmarks.slot_model --conversations 5000 --slots 4
+"""
+import argparse
+import ast
+import random
+import statistics
+import time
+import tracemalloc
+from typing import List
+
+from app.utils.catalog import MenuCatalog
+from app.utils.slot_model import SlotCodec, diff_slots
+
+
+PIZZAS = ["Margherita", "Pepperoni", "Wegetariańska", "Hawajska", "Capriciosa"]
+INGREDIENTS = ["Pomidor", "Mozzarella", "Bazylia", "Salami", "Pieczarki", "Parmezan", "Kurczak", "Szynka",
+               "Ananas", "Oliwki", "Papryka", "Kukurydza"]
+MISSING = ["Nazwa pizzy", "Rozmiar", "Grubość ciasta"]
+
+
+def _random_slot(rng: random.Random, db_id: int) -> dict:
+    return {
+        "pizza": rng.choice(PIZZAS).lower(),
+        "pizza_count": rng.randint(1, 3),
+        "dough": {"big_size": rng.choice([True, False, None]), "on_thick_pastry": rng.choice([True, False, None])},
+        "extras": [(name.lower(), rng.randint(1, 2)) for name in rng.sample(INGREDIENTS, rng.randint(0, 3))],
+        "missing_info": rng.sample(MISSING, rng.randint(0, 2)),
+        "db_id": db_id,
+    }
+
+
+def _dict_summary(slots: List[dict]) -> dict:
+    return {slot["db_id"]: {"pizza": slot["pizza"], "pizza_count": slot["pizza_count"],
+                            "big_size": slot["dough"]["big_size"], "on_thick_pastry": slot["dough"]["on_thick_pastry"],
+                            "extras": [f"{ing}-{qty}" for ing, qty in slot["extras"]]} for slot in slots}
+
+
+def _dict_diff(updated: List[dict], stored: str) -> str:
+    existing_map, updated_map = _dict_summary(ast.literal_eval(stored)), _dict_summary(updated)
+    differences = []
+    for slot_id, slot in updated_map.items():
+        if slot_id not in existing_map:
+            differences.append(f"Nowy slot: {slot}")
+            continue
+        for key, value in slot.items():
+            if existing_map[slot_id][key] != value:
+                differences.append(f"Zmieniona zmienna w slocie {slot_id}: {key} (z '{existing_map[slot_id][key]}' na '{value}')")
+    for slot_id, slot in existing_map.items():
+        if slot_id not in updated_map:
+            differences.append(f"Slot usunięty: {slot}")
+    return ", ".join(differences) if differences else "Brak zmian"
+
+
+def _allocated(build) -> int:
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    kept = build()
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    size = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+    del kept
+    return size
+
+
+def _timed(function, repeat: int) -> float:
+    values = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        values.append(time.perf_counter() - start)
+    return statistics.median(values)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--conversations", type=int, default=5000)
+    parser.add_argument("--slots", type=int, default=4)
+    parser.add_argument("--repeat", type=int, default=2000)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    catalog = MenuCatalog(list(enumerate(PIZZAS, 1)), list(enumerate(INGREDIENTS, 1)))
+    codec = SlotCodec.build(catalog)
+    conversations = [[_random_slot(rng, n * args.slots + i) for i in range(args.slots)]
+                     for n in range(args.conversations)]
+    serialized = repr(conversations)
+
+    dict_bytes = _allocated(lambda: ast.literal_eval(serialized))
+    # słowniki już istnieją, więc liczy się tylko to, co Sloty trzymają same
+    slot_bytes = _allocated(lambda: [codec.encode(slots) for slots in conversations])
+    print(f"{args.conversations} conversations x {args.slots} slots")
+    print(f"memory per conversation: dict {dict_bytes / args.conversations:.0f} B, "
+          f"Slot {slot_bytes / args.conversations:.0f} B")
+
+    before = conversations[0]
+    after = [dict(slot) for slot in before]
+    after[0] = dict(after[0], pizza_count=after[0]["pizza_count"] + 1)
+    stored = str(before)
+    compact_before, compact_after = codec.encode(before), codec.encode(after)
+    assert _dict_diff(after, stored) == diff_slots(codec, compact_after, compact_before)
+
+    timings = {
+        "dict diff (literal_eval + maps)": _timed(lambda: _dict_diff(after, stored), args.repeat),
+        "Slot diff": _timed(lambda: diff_slots(codec, compact_after, compact_before), args.repeat),
+        "decode + encode (per turn)": _timed(lambda: codec.encode(codec.decode(compact_before)), args.repeat),
+    }
+    for name, value in timings.items():
+        print(f"{name:<34}{value * 1e6:>9.1f} us")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,74 @@
+import os
+
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 
-DATABASE_URL = "postgresql://user:pizza123@db:5432/pizzeria"
+from app.utils import query_counter, sqlite_tuning
+from app.utils.pool_metrics import TimedAsyncAdaptedQueuePool, TimedQueuePool
+
+DATABASE_URL = os.getenv("DATABASE_URL", "postgresql://user:pizza123@db:5432/pizzeria")
+
+# Pula jest liczona per proces - przy N workerach do bazy trafia do
+# N * (DB_POOL_SIZE + DB_MAX_OVERFLOW) połączeń.
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "-1"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "false").lower() in ("1", "true", "yes")
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "0"))
+
+
+ASYNC_DRIVERS = {"postgresql": "postgresql+asyncpg", "sqlite": "sqlite+aiosqlite"}
+
+
+def _async_url(url: str) -> str:
+    """Ten sam adres bazy z asynchronicznym sterownikiem (asyncpg / aiosqlite)."""
+    url = make_url(url)
+    return url.set(drivername=ASYNC_DRIVERS[url.get_backend_name()]).render_as_string(hide_password=False)
+
+
+def _connect_args(url: str) -> dict:
+    url = make_url(url)
+    if not DB_STATEMENT_TIMEOUT_MS or url.get_backend_name() != "postgresql":
+        return {}
+    if url.get_driver_name() == "asyncpg":
+        return {"server_settings": {"statement_timeout": str(DB_STATEMENT_TIMEOUT_MS)}}
+    return {"options": f"-c statement_timeout={DB_STATEMENT_TIMEOUT_MS}"}
 
-engine = create_engine(DATABASE_URL)
+
+def _pool_args(url: str) -> dict:
+    return dict(
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT,
+        pool_recycle=DB_POOL_RECYCLE,
+        pool_pre_ping=DB_POOL_PRE_PING,
+        connect_args=_connect_args(url),
+    )
+
+
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL") or _async_url(DATABASE_URL)
+
+engine = create_engine(DATABASE_URL, poolclass=TimedQueuePool, **_pool_args(DATABASE_URL))
+query_counter.install(engine)
+IS_SQLITE = sqlite_tuning.is_sqlite(DATABASE_URL)
+if IS_SQLITE:
+    sqlite_tuning.install(engine)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+# Silnik asynchroniczny ma własną pulę - przy liczeniu połączeń na workera trzeba
+# doliczyć obie. expire_on_commit=False, bo po commit nie wolno leniwie dociągać
+# atrybutów poza greenletem (run_sync).
+async_engine = create_async_engine(ASYNC_DATABASE_URL, poolclass=TimedAsyncAdaptedQueuePool,
+                                   **_pool_args(ASYNC_DATABASE_URL))
+query_counter.install(async_engine.sync_engine)
+if IS_SQLITE:
+    sqlite_tuning.install(async_engine.sync_engine)
+AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
 Base = declarative_base()
 
 
@@ -15,3 +78,8 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -1,10 +1,51 @@
-from fastapi import FastAPI
+import os
+import threading
+import time
+import uuid
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 
-from .routers import analyze_order, orders, conversation
+from .database import IS_SQLITE, SessionLocal, engine
+from .routers import analyze_order, orders, conversation, monitoring
+from .utils import metrics, query_counter, sqlite_tuning, tracing
+from .utils.logger import get_logger, request_id_var
+
+DEBUG = os.getenv("APP_DEBUG", "").lower() in ("1", "true", "yes")
+WARMUP_RETRY_SECONDS = float(os.getenv("WARMUP_RETRY_SECONDS", "5"))
+
+log = get_logger(__name__)
+
+
+def _warm_up(app: FastAPI):
+    """
+    Ładuje spaCy i katalog w tle; do końca rozgrzewki /monitoring/ready zwraca 503.
+    Gdy baza jeszcze nie wstała, ponawiamy co WARMUP_RETRY_SECONDS.
+    """
+    while True:
+        try:
+            started = time.perf_counter()
+            with SessionLocal() as db:
+                analyze_order.warm_up(db)
+            app.state.ready = True
+            log.info("Warmup finished in %.2f s", time.perf_counter() - started)
+            return
+        except Exception:
+            log.exception("Warmup failed, retrying in %s s", WARMUP_RETRY_SECONDS)
+            time.sleep(WARMUP_RETRY_SECONDS)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    app.state.ready = False
+    if IS_SQLITE and sqlite_tuning.create_schema(engine, sqlite_tuning.SQLITE_SEED_FILE):
+        log.info("Created SQLite schema in %s", engine.url.database)
+    threading.Thread(target=_warm_up, args=(app,), name="warmup", daemon=True).start()
+    yield
 
 
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 app.add_middleware(
     middleware_class=CORSMiddleware,
     allow_origins=["http://localhost:3000"],
@@ -13,6 +54,45 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+
+@app.middleware("http")
+async def trace_request(request: Request, call_next):
+    """Ślad żądania (utils/tracing.py); zapisywany tylko dla wolnych żądań."""
+    with tracing.start_trace(f"{request.method} {request.url.path}", **{"request.id": request_id_var.get()}):
+        return await call_next(request)
+
+
+@app.middleware("http")
+async def bind_request_id(request: Request, call_next):
+    """request_id trafia do każdego rekordu logu z tego żądania (i do nagłówka odpowiedzi)."""
+    request_id = request.headers.get("x-request-id") or uuid.uuid4().hex
+    token = request_id_var.set(request_id)
+    try:
+        response = await call_next(request)
+    finally:
+        request_id_var.reset(token)
+    response.headers["X-Request-ID"] = request_id
+    return response
+
+
+@app.middleware("http")
+async def count_db_queries(request: Request, call_next):
+    """Zapytania SQL per żądanie oraz metryki /metrics (latencja, status, czas w bazie)."""
+    started = time.perf_counter()
+    with query_counter.track_queries() as stats:
+        response = await call_next(request)
+    route = metrics.route_label(request.scope)
+    query_counter.record_request(route, stats)
+    metrics.REQUEST_LATENCY.observe(time.perf_counter() - started, route, request.method)
+    metrics.REQUESTS.inc(route, request.method, str(response.status_code))
+    metrics.REQUEST_DB_TIME.observe(stats.total_time, route)
+    if DEBUG:
+        response.headers.update(query_counter.debug_headers(stats))
+    return response
+
+
 app.include_router(analyze_order.router, prefix='/analyzer', tags=["analyze_order"])
 app.include_router(orders.router, prefix='/orders' , tags=["orders"])
 app.include_router(conversation.router, prefix='/conversation', tags=["conversations"])
+app.include_router(monitoring.router, prefix='/monitoring', tags=["monitoring"])
+app.include_router(monitoring.metrics_router, tags=["monitoring"])
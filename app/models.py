@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Boolean, Table, Enum, UniqueConstraint
+from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Boolean, Table, Enum, UniqueConstraint, Index, func
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from .database import Base, engine
@@ -12,6 +12,13 @@ pizza_ingredients = Table(
     Column("ingredient_id", Integer, ForeignKey("ingredients.id", ondelete="CASCADE"), primary_key=True)
 )
 
+pizza_doughs = Table(
+    "pizza_doughs",
+    Base.metadata,
+    Column("pizza_id", Integer, ForeignKey("pizzas.id", ondelete="CASCADE"), primary_key=True),
+    Column("dough_id", Integer, ForeignKey("doughs.id", ondelete="CASCADE"), primary_key=True)
+)
+
 order_transcripts = Table(
     "order_transcripts",
     Base.metadata,
@@ -41,6 +48,7 @@ class OrderPizzas(Base):
     dough_id = Column(Integer, ForeignKey("doughs.id", ondelete="CASCADE"), nullable=True)
     quantity = Column(Integer, nullable=False, default=1)
     is_partial = Column(Boolean, nullable=False, default=True)
+    __table_args__ = (Index('ix_order_pizzas_order_id_id', 'order_id', 'id'),)
     additional_ingredients_pivot = relationship("AdditionalIngredient", back_populates="order_pizza")
 
 class Pizza(Base):
@@ -48,7 +56,9 @@ class Pizza(Base):
     id = Column(Integer, primary_key=True, index=True, autoincrement=True)
     name = Column(String, index=True, nullable=False)
     in_menu = Column(Boolean, default=True)
+    __table_args__ = (Index('ix_pizzas_name_lower', func.lower(name)),)
     ingredients = relationship("Ingredient", secondary=pizza_ingredients, back_populates="pizzas")
+    available_pizza_doughs = relationship("Dough", secondary=pizza_doughs)
     orders = relationship("Order", secondary='order_pizzas', back_populates="pizzas")
 
 class Ingredient(Base):
@@ -57,6 +67,7 @@ class Ingredient(Base):
     name = Column(String, nullable=False)
     category = Column(String, nullable=False)
     price = Column(Float, nullable=False)
+    __table_args__ = (Index('ix_ingredients_name_lower', func.lower(name)),)
     pizzas = relationship("Pizza", secondary=pizza_ingredients, back_populates="ingredients")
     additional_ingredients_pivot = relationship("AdditionalIngredient", back_populates="ingredient")
 
@@ -84,6 +95,7 @@ class TranscriptionLog(Base):
     updated_slots = Column(String, nullable=True)
     parsed = Column(String, nullable=True)
     order_id = Column(Integer, ForeignKey("orders.id", ondelete="CASCADE"))
+    __table_args__ = (Index('ix_transcription_logs_order_id_id', 'order_id', 'id'),)
     orders = relationship("Order", secondary=order_transcripts, back_populates="transcripts_history")
     
     
@@ -4,23 +4,28 @@ Rozbudowana wersja algorytmu, podzielona na mniejsze funkcje dla większej czyte
 Wykrywa kilka osobnych pizz różniących się atrybutami ciasta, dopasowuje nazwy pizz
 (fuzzy match), rozróżnia liczbę sztuk, wykrywa sosy, dodatki i braki danych.
 """
+from collections import Counter
+from contextlib import contextmanager
+
 from fastapi import APIRouter, Depends
 from pydantic import BaseModel
-from typing import Optional, List, Dict, Tuple
+from typing import Collection, Optional, List, Dict, Set, Tuple
 
 from sqlalchemy import false
 from sqlalchemy.orm import Session
-import spacy
 from fuzzywuzzy import fuzz
 
 from app.utils.logger import get_logger
+from app.utils import batch_scoring, fast_path, inflection, menu_bitsets, metrics, parse_cache, parser_trace, semantic, tracing
+from app.utils.catalog import MenuCatalog, get_catalog
+from app.utils.nlp import get_nlp
+from app.utils.slot_model import DOUGH_NOT_AVAILABLE
 from app.database import get_db
 from app.models import Order, OrderPizzas, Pizza, Dough, Ingredient
 
 
 log = get_logger(__name__)
 router = APIRouter()
-nlp = spacy.load("pl_core_news_md")
 
 class AnalyzeOrderRequest(BaseModel):
     order_id: int
@@ -79,7 +84,39 @@ REFERENCE_ALL_SLOTS = {
     "wszystkim": 0,
     "wszystkimi": 0
     }
-    
+
+# Słowa spoza leksykonów, które często padają w krótkich dopowiedzeniach
+# ("na grubym cieście", "tak, proszę") - trafiają do tablicy lematów szybkiej ścieżki.
+FAST_PATH_EXTRA_WORDS = {
+    "na", "z", "ze", "i", "oraz", "do", "w", "ta", "tej", "ten", "to", "tak", "nie", "a",
+    "proszę", "poproszę", "dziękuję", "jednak", "może", "bez",
+    "pizza", "pizzę", "pizzy", "pizze", "pizz", "numer",
+    "ciasto", "cieście", "ciasta", "cienkie", "grube", "cienkim", "grubym",
+    "dodatkowy", "dodatkowym", "dodatkową", "dodatkowe", "dodatkowo", "dodatek", "dodatkiem",
+    "podwójny", "podwójnym", "podwójną", "podwójne", "potrójny", "potrójnym", "potrójną",
+    "ser", "serem", "sera",
+}
+
+
+def _parser_lexicon_words() -> set:
+    words = set()
+    for lexicon in (POLISH_NUMBERS, POLISH_MULTIPLIERS, REFERENCE_SLOT_WORDS, NEW_SLOT_WORDS, REFERENCE_ALL_SLOTS):
+        words.update(lexicon)
+    for synonyms_dict in (SIZE_SYNONYMS, THICKNESS_SYNONYMS):
+        for key, synonyms in synonyms_dict.items():
+            words.add(key)
+            words.update(synonyms)
+    return words
+
+
+PARSER_LEXICON_WORDS = _parser_lexicon_words()
+
+# Słowa, które nic nie mówią o tym, o którą pizzę chodzi - pomijane przy podpowiedzi semantycznej.
+SEMANTIC_IGNORED_WORDS = PARSER_LEXICON_WORDS | {
+    "proszę", "poproszę", "chciałbym", "chciałabym", "zamówić", "dzień", "dobry", "cześć",
+    "pizza", "pizzę", "pizzy", "pizze", "pizz", "ciasto", "cieście", "ciasta",
+}
+
 def _map_synonym_with_dict(word: str, synonyms_dict: dict, return_none=False):
     """
     Funkcja pomocnicza do mapowania słowa na klucz, jeśli występuje w słowniku synonimów.
@@ -103,7 +140,6 @@ def detect_number_if_any(token, return_none=False):
         val = None
     else:
         val = 1
-    log.info("token: %s, %s, %s, %s", token.text, token.lemma_, token.like_num, token)
     if token.like_num:
         try:
             val = int(token.text)
@@ -116,8 +152,9 @@ def detect_number_if_any(token, return_none=False):
         val = POLISH_NUMBERS[token.lemma_]
     elif token.text in POLISH_NUMBERS:
         val = POLISH_NUMBERS[token.text]
-    log.info("Detected number: %s", val)
-    
+    trace = parser_trace.current()
+    if trace is not None:
+        trace.event("number", token=token.text, lemma=token.lemma_, value=val)
     return val
 
 def detect_multiplier_if_any(token) -> int:
@@ -130,7 +167,16 @@ def fuzzy_match_pizza(candidate: str, pizza_names: List[str]) -> Optional[str]:
     """
     Używamy fuzzywuzzy, by ustalić najlepsze dopasowanie do nazwy pizzy.
     Zwraca nazwę pizzy lub None, jeśli score za niski.
+    Odmienione formy nazw z katalogu (np. "margheritę") trafiamy od razu w indeksie form,
+    a score dla tokenów bieżącej wypowiedzi czytamy z macierzy (batch_scoring).
     """
+    exact = inflection.lookup(pizza_names, candidate)
+    if exact is not None:
+        return exact
+    scored = batch_scoring.best_match(candidate, pizza_names)
+    if scored is not None:
+        best_name, best_score = scored
+        return best_name if best_score >= 66 else None
     best_score = 0
     best_name = None
     for p_name in pizza_names:
@@ -146,7 +192,14 @@ def fuzzy_match_pizza(candidate: str, pizza_names: List[str]) -> Optional[str]:
 def fuzzy_find_ingredient(txt: str, ingredients: List[str]) -> Tuple[str, int]:
     """
     Przeszukuje listę 'ingredients' w fuzzywuzzy, zwracając (najlepsza_nazwa, score).
+    Dokładne trafienie w indeksie form (np. "pieczarkami") zwraca score 100 bez liczenia fuzzy.
     """
+    exact = inflection.lookup(ingredients, txt)
+    if exact is not None:
+        return (exact, 100)
+    scored = batch_scoring.best_match(txt, ingredients)
+    if scored is not None:
+        return scored
     best_score = 0
     best_ing = None
     for ing in ingredients:
@@ -161,7 +214,6 @@ def _detect_slot_references(tokens, existing_slots):
     chosen_slot_index = None
     i = 0
     while i < len(tokens):
-        log.info("Jestem w petli %s", i)
         t = tokens[i].lemma_.lower()
         if t in ("do", "w", "ta"):
             if (i + 1) < len(tokens):
@@ -169,7 +221,6 @@ def _detect_slot_references(tokens, existing_slots):
                 if maybe_tej in ("tej"):
                      if (i + 2) < len(tokens):
                         lem =  tokens[i + 2].lemma_.lower()
-                        log.info("ref_word: %s -> lema %s", tokens[i+2].text, lem)
                         if lem in REFERENCE_SLOT_WORDS:
                             number = REFERENCE_SLOT_WORDS[lem]
                             slot_idx = number - 1
@@ -205,41 +256,49 @@ def _detect_slot_references(tokens, existing_slots):
                                         chosen_slot_index = i
                                         break
         i += 1
+    trace = parser_trace.current()
+    if trace is not None:
+        trace.event("slot_reference", slot=chosen_slot_index)
     return chosen_slot_index
 
 
 def _detect_pizza_count(tokens, slots: List[dict], all_pizzas: List[str])  -> List[dict]:
+    trace = parser_trace.current()
     slots_created = False
     i = 0
     while i < len(tokens):
-        log.info("Pętla detect_pizza_count: %s", i)
         token = tokens[i]
         lemma = token.lemma_
         if detect_number_if_any(token, return_none=True) and (i + 1) < len(tokens):
             next_lemma = tokens[i + 1].lemma_
             pizza_name = fuzzy_match_pizza(tokens[i+1].text, all_pizzas)
-            log.info("next_lemma: %s", next_lemma)
             if "pizz" in next_lemma or pizza_name:
                 count_val = detect_number_if_any(token, return_none=True)
                 if pizza_name:
-                    log.info("Znalazłem pizzę: %s", pizza_name)
                     slot = _create_slot()
                     slot["pizza_count"] = count_val
                     slot["pizza"] =  pizza_name
                     slots.append(slot)
+                    if trace is not None:
+                        trace.rule(slot, "pizza_count", count_val, "count_before_name", token.text)
+                        trace.rule(slot, "pizza", pizza_name, "count_before_name", tokens[i+1].text)
                 elif (i +2) < len(tokens) and fuzzy_match_pizza(tokens[i+2].text, all_pizzas):
-                    log.info("Znalazłem pizzę przy 2gim podejsciu: %s", tokens[i+2].text)
                     slot = _create_slot()
                     slot["pizza_count"] = count_val
                     slot["pizza"] =  fuzzy_match_pizza(tokens[i+2].text, all_pizzas)
                     slots.append(slot)
+                    if trace is not None:
+                        trace.rule(slot, "pizza_count", count_val, "count_pizza_name", token.text)
+                        trace.rule(slot, "pizza", slot["pizza"], "count_pizza_name", tokens[i+2].text)
                 else:
                     for _ in range(count_val):
-                        slots.append(_create_slot())
+                        slot = _create_slot()
+                        slots.append(slot)
+                        if trace is not None:
+                            trace.rule(slot, "pizza_count", 1, "count_splits_slots", token.text)
                 slots_created = True
                 i += 2
             elif  _map_synonym_with_dict(next_lemma, SIZE_SYNONYMS, return_none=True) and (i + 2) < len(tokens):
-                log.info("Znalazłem rozmiar pizzy: %s", tokens[i+1].text)
                 next_next_lemma = tokens[i + 2].lemma_
                 pizza_name = fuzzy_match_pizza(tokens[i+2].text, all_pizzas)
                 if "pizz" in next_next_lemma or pizza_name:
@@ -254,19 +313,28 @@ def _detect_pizza_count(tokens, slots: List[dict], all_pizzas: List[str])  -> Li
                             slot["dough"]["big_size"] = False
                         slot["dough"]["big_size"] = next_lemma == "duża"
                         slots.append(slot)
+                        if trace is not None:
+                            trace.rule(slot, "pizza_count", count_val, "count_size_name", tokens[i].text)
+                            trace.rule(slot, "big_size", slot["dough"]["big_size"], "count_size_name", tokens[i+1].text)
+                            trace.rule(slot, "pizza", pizza_name, "count_size_name", tokens[i+2].text)
                     elif (i + 3) < len(tokens) and fuzzy_match_pizza(tokens[i+3].text, all_pizzas):
                         slot = _create_slot()
                         slot["pizza_count"] = count_val
                         slot["pizza"] = fuzzy_match_pizza(tokens[i+3].text, all_pizzas)
                         slots.append(slot)
+                        if trace is not None:
+                            trace.rule(slot, "pizza_count", count_val, "count_size_pizza_name", tokens[i].text)
+                            trace.rule(slot, "pizza", slot["pizza"], "count_size_pizza_name", tokens[i+3].text)
                     else:
                         for _ in range(count_val):
                             slot = _create_slot()
                             slot["dough"]["big_size"] = _is_big_pizza_size(next_lemma)
                             slots.append(slot)
+                            if trace is not None:
+                                trace.rule(slot, "big_size", slot["dough"]["big_size"], "count_size_splits_slots",
+                                           tokens[i+1].text)
                     i += 3
                     slots_created = True
-                    log.info("slots: %s", slots)
                     continue
             i += 1
             continue
@@ -276,18 +344,20 @@ def _detect_pizza_count(tokens, slots: List[dict], all_pizzas: List[str])  -> Li
             slot = _create_slot()
             if not lemma in "pizza":
                 slot["pizza"] = fuzzy_match_pizza(tokens[i-1].text, all_pizzas)
+                if trace is not None:
+                    trace.rule(slot, "pizza", slot["pizza"], "single_pizza_name", tokens[i-1].text)
             slots.append(slot)
             i += 1
             continue
         i += 1
-    log.info("slots_created: %s -> %s", slots_created, slots)
+    if trace is not None:
+        trace.event("pizza_count", slots=len(slots))
     return slots
 
 def _create_slot() -> dict:
     """
     Tworzy nowy slot opisujący pojedynczą sztukę pizzy.
     """
-    log.info("Tworzę nowy slot")
     return {
         "pizza":        None,
         "pizza_count":  1,
@@ -306,6 +376,7 @@ def _assign_attributes(tokens, slots: List[dict], all_pizzas: List[str],
     Przypisuje do slotów atrybuty takie jak nazwa pizzy, rozmiar, grubość.
     Jeśli nie ma żadnego slotu, zapisuje w 'common_attributes', by potem scalić je do wszystkich.
     """
+    trace = parser_trace.current()
     i = 0
     if active_slot:
         slot = active_slot
@@ -314,19 +385,17 @@ def _assign_attributes(tokens, slots: List[dict], all_pizzas: List[str],
     
         
     while i < len(tokens):
-        log.info("pętla assign_attributes: %s", i)
         txt = tokens[i].text.lower()
         lemma = tokens[i].lemma_.lower()
                 #rozmiar
         mapped_size = _map_synonym_with_dict(lemma, SIZE_SYNONYMS)
         if mapped_size in ("duża", "mała"):
-            log.info("mapped_size: %s", mapped_size)
             if slots:
                 slot["dough"]["big_size"] = (mapped_size == "duża")
-                log.info("dodaje do slotu %s", slot)
             else:
                 common_attributes["dough"]["big_size"] = (mapped_size == "duża")
-                log.info("dodaje do wspólnych atrybutów")
+            if trace is not None:
+                trace.rule(slot if slots else None, "big_size", mapped_size == "duża", "size_synonym", txt)
             i += 1
             continue
         
@@ -338,6 +407,8 @@ def _assign_attributes(tokens, slots: List[dict], all_pizzas: List[str],
                 slot["dough"]["on_thick_pastry"] = on_thick
             else:
                 common_attributes["dough"]["on_thick_pastry"] = on_thick
+            if trace is not None:
+                trace.rule(slot if slots else None, "on_thick_pastry", on_thick, "thickness_synonym", txt)
             i += 1
             continue
         
@@ -349,20 +420,23 @@ def _assign_attributes(tokens, slots: List[dict], all_pizzas: List[str],
             
             slot = slots[-1]
             slot["pizza"] = matched_pizza
+            if trace is not None:
+                trace.rule(slot, "pizza", matched_pizza, "pizza_name", txt)
             i += 1
             continue
         i += 1
 
 
 def _assign_extras_trigram(tokens, slots: List[dict], all_ingredients: List[str],
-                           common_attributes: dict, active_slot: dict = None):
+                           common_attributes: dict, active_slot: dict = None, explicit: Optional[dict] = None):
     """
     Szuka w tekście 3-gramów w stylu:
       - [z/dodatkową], [podwójną/potrójną?], [nazwę składnika]
     lub odwrotny wariant itd.
     Jeżeli znajdzie, to wstawia do slots[-1]["extras"] np.: (składnik, qty).
+    Dodatki zamówione słowem "dodatkowy"/"extra" trafiają też do `explicit` (_mark_ordered_extra).
     """
-    log.info("Assigning extras")
+    trace = parser_trace.current()
     i = 0
     if active_slot:
         slot = active_slot
@@ -378,6 +452,10 @@ def _assign_extras_trigram(tokens, slots: List[dict], all_ingredients: List[str]
                     slot["extras"].append((best_ing, qty))
                 else:
                     common_attributes["extras"].append((best_ing, qty))
+                if _orders_extra(tokens[i]):
+                    _mark_ordered_extra(explicit, slot if slots else None, (best_ing, qty))
+                if trace is not None:
+                    trace.rule(slot if slots else None, "extras", (best_ing, qty), "extra_pair", tokens[i+1].text)
                     
     while i <= len(tokens) - 3:
         if _about_additional_ing_words(tokens[i].lemma_) and _about_additional_ing_words(tokens[i+1].lemma_) and i < len(tokens) - 4:
@@ -385,22 +463,24 @@ def _assign_extras_trigram(tokens, slots: List[dict], all_ingredients: List[str]
         tri = tokens[i], tokens[i+1], tokens[i+2]
         tri_text = [tok.text.lower() for tok in tri]
         tri_lemma = [tok.lemma_.lower() for tok in tri]
-        log.info("TRIGRAM: %s", tri_text)
-        log.info("TRIGRAM: %s LEMMA", tri_lemma)
         # CASE A: [z|dodatk*], [multipler], [ingredient]
         if _about_additional_ing_words(tri_lemma[0]):
             multiplier = detect_multiplier_if_any(tri[1])
             best_ing, sc = fuzzy_find_ingredient(tri_text[2], all_ingredients)
             if sc > 70 and best_ing:
                 qty = multiplier
+                ordered = _orders_extra(tri[0]) or _orders_extra(tri[1])  # "z dodatkowym X" pod koniec zdania
                 if slots:
                     slot["extras"].append((best_ing, qty))
                 else:
                     common_attributes["extras"].append((best_ing, qty))
-                    
-                log.info("Dodano składnik: %s x %s", best_ing, qty)
+                if ordered:
+                    _mark_ordered_extra(explicit, slot if slots else None, (best_ing, qty))
+                if trace is not None:
+                    trace.rule(slot if slots else None, "extras", (best_ing, qty), "trigram_with_multiplier", tri_text[2])
                 if len(tokens) >= i + 4:
-                    check_for_extra_ingredient(tokens[i + 3:], all_ingredients, slots, common_attributes)
+                    check_for_extra_ingredient(tokens[i + 3:], all_ingredients, slots, common_attributes,
+                                               explicit=explicit, ordered=ordered)
                 
                 i += 3
                 continue
@@ -409,10 +489,15 @@ def _assign_extras_trigram(tokens, slots: List[dict], all_ingredients: List[str]
         if _about_additional_ing_words(tri_lemma[0]):
             best_ing, sc = fuzzy_find_ingredient(tri_text[1], all_ingredients)
             if sc > 70 and best_ing:
-                if tri_lemma[2] in ("i", "oraz") and len(tokens) >= i + 3:
-                    best_second_ing, sc2 = fuzzy_find_ingredient(tokens[i+3], all_ingredients)
+                ordered = _orders_extra(tri[0])
+                if tri_lemma[2] in ("i", "oraz") and len(tokens) > i + 3:
+                    best_second_ing, sc2 = fuzzy_find_ingredient(tokens[i+3].text.lower(), all_ingredients)
                     if sc2 > 70 and best_second_ing and slots:
                         slot["extras"].append((best_second_ing, 1))
+                        if ordered:
+                            _mark_ordered_extra(explicit, slot, (best_second_ing, 1))
+                        if trace is not None:
+                            trace.rule(slot, "extras", (best_second_ing, 1), "trigram_conjunction", tokens[i+3].text)
                     qty = 1
                 else:
                     multiplier = detect_multiplier_if_any(tri[2])
@@ -423,8 +508,13 @@ def _assign_extras_trigram(tokens, slots: List[dict], all_ingredients: List[str]
                     slot["extras"].append((best_ing, qty))
                 else:
                     common_attributes["extras"].append((best_ing, qty))
+                if ordered:
+                    _mark_ordered_extra(explicit, slot if slots else None, (best_ing, qty))
+                if trace is not None:
+                    trace.rule(slot if slots else None, "extras", (best_ing, qty), "trigram_ingredient_first", tri_text[1])
                 if len(tokens) >= i + 3:
-                    check_for_extra_ingredient(tokens[i + 3:], all_ingredients, slots, common_attributes)
+                    check_for_extra_ingredient(tokens[i + 3:], all_ingredients, slots, common_attributes,
+                                               explicit=explicit, ordered=ordered)
                 
                 i += 3
                 continue
@@ -434,12 +524,18 @@ def _assign_extras_trigram(tokens, slots: List[dict], all_ingredients: List[str]
             best_ing, sc = fuzzy_find_ingredient(tri_text[2], all_ingredients)
             if sc > 70 and best_ing:
                 qty = detect_multiplier_if_any(tri[0])
+                ordered = _orders_extra(tri[1])
                 if slots:
                     slot["extras"].append((best_ing, qty))
                 else:
                     common_attributes["extras"].append((best_ing, qty))
+                if ordered:
+                    _mark_ordered_extra(explicit, slot if slots else None, (best_ing, qty))
+                if trace is not None:
+                    trace.rule(slot if slots else None, "extras", (best_ing, qty), "trigram_multiplier_first", tri_text[2])
                 if len(tokens) >= i + 3:
-                    check_for_extra_ingredient(tokens[i + 3:], all_ingredients, slots, common_attributes)
+                    check_for_extra_ingredient(tokens[i + 3:], all_ingredients, slots, common_attributes,
+                                               explicit=explicit, ordered=ordered)
                 
                 i += 3
                 continue
@@ -451,18 +547,40 @@ def _about_additional_ing_words(lemma):
         return True
     return False
 
-def check_for_extra_ingredient(tokens, all_ingredients, slots, common_attributes, active_slot: dict = None):
+def _orders_extra(token) -> bool:
+    """"dodatkowy", "dodatkowo", "extra" - składnik ma być ponad przepis, a nie opisywać pizzę."""
+    return any(word.startswith(("dodatk", "extra", "ekstra")) for word in (token.lemma_.lower(), token.text.lower()))
+
+
+def _mark_ordered_extra(explicit: Optional[dict], slot: Optional[dict], extra: tuple):
+    """
+    Zapamiętuje dodatek zamówiony wprost, per slot (klucz id(slot); None = wspólne dla
+    wszystkich slotów). match_pizza_by_ingredients nie zdejmuje ich jako części przepisu.
+    """
+    if explicit is not None:
+        explicit.setdefault(None if slot is None else id(slot), Counter())[extra] += 1
+
+
+def check_for_extra_ingredient(tokens, all_ingredients, slots, common_attributes, active_slot: dict = None,
+                               explicit: Optional[dict] = None, ordered: bool = False):
+    """Ciąg dalszy frazy z dodatkami ("... i cebulą"); `ordered`, gdy fraza zaczęła się od "dodatkowy"."""
+    if not tokens:  # fraza "z X i" na samym końcu wypowiedzi
+        return
     if active_slot:
         slot = active_slot
     elif slots:
         slot = slots[-1]
     def add_extra_ingredient(ingredient, quantity):
         """Dodaje składnik do odpowiedniego miejsca (slotów lub wspólnych atrybutów)."""
-        log.info("Dodano składnik: %s x %s", ingredient, quantity)
         if slots:
             slot["extras"].append((ingredient, quantity))
         else:
             common_attributes["extras"].append((ingredient, quantity))
+        if ordered:
+            _mark_ordered_extra(explicit, slot if slots else None, (ingredient, quantity))
+        trace = parser_trace.current()
+        if trace is not None:
+            trace.rule(slot if slots else None, "extras", (ingredient, quantity), "extra_continuation")
 
     if tokens and tokens[0].lemma_ in ("i", "oraz"):
         if len(tokens) > 2:
@@ -481,19 +599,49 @@ def check_for_extra_ingredient(tokens, all_ingredients, slots, common_attributes
             return
         if len(tokens) > 1:
             qty = detect_multiplier_if_any(tokens[0])
+            ordered = ordered or _orders_extra(tokens[0])  # "..., dodatkowo szynka"
             best_ing, sc = fuzzy_find_ingredient(tokens[1].text.lower(), all_ingredients)
     if sc > 70 and best_ing:
         add_extra_ingredient(best_ing, qty)
-        
-        
-def merge_and_find_missing(slots: List[dict], common_attributes: dict):
+
+
+def validate_dough(slot: dict, compatibility: menu_bitsets.DoughCompatibility):
+    """
+    Sprawdza w macierzy zgodności, czy wybrane (lub częściowo wybrane) ciasto jest dostępne
+    dla pizzy ze slotu. Jeśli nie - dopisuje brak i proponuje najbliższe dozwolone ciasto.
+    """
+    slot.pop("dough_suggestion", None)
+    if slot["pizza"] is None:
+        return
+    dough = slot["dough"]
+    if compatibility.allowed(slot["pizza"], dough["big_size"], dough["on_thick_pastry"]):
+        return
+    slot["missing_info"].append(DOUGH_NOT_AVAILABLE)
+    alternative = compatibility.alternative(slot["pizza"], dough["big_size"], dough["on_thick_pastry"])
+    if alternative is not None:
+        slot["dough_suggestion"] = alternative
+    trace = parser_trace.current()
+    if trace is not None:
+        trace.rule(slot, "dough_suggestion", alternative, "dough_compatibility")
+
+
+def merge_and_find_missing(slots: List[dict], common_attributes: dict,
+                           compatibility: Optional[menu_bitsets.DoughCompatibility] = None):
+    trace = parser_trace.current()
     for slot in slots:          # scal wspólne z slotami
         if slot["dough"]["big_size"] is None and common_attributes["dough"]["big_size"] is not None:
             slot["dough"]["big_size"] = common_attributes["dough"]["big_size"]
+            if trace is not None:
+                trace.rule(slot, "big_size", slot["dough"]["big_size"], "common_attributes")
         if slot["dough"]["on_thick_pastry"] is None and common_attributes["dough"][
             "on_thick_pastry"] is not None:
             slot["dough"]["on_thick_pastry"] = common_attributes["dough"]["on_thick_pastry"]
+            if trace is not None:
+                trace.rule(slot, "on_thick_pastry", slot["dough"]["on_thick_pastry"], "common_attributes")
         slot["extras"].extend(common_attributes["extras"])
+        if trace is not None:
+            for extra in common_attributes["extras"]:
+                trace.rule(slot, "extras", extra, "common_attributes")
     
     for slot in slots:      # Wyznacz braki
         slot["missing_info"] = []
@@ -503,27 +651,189 @@ def merge_and_find_missing(slots: List[dict], common_attributes: dict):
             slot["missing_info"].append("Rozmiar")
         if slot["dough"]["on_thick_pastry"] is None:
             slot["missing_info"].append("Grubość ciasta")
+        if compatibility is not None:
+            validate_dough(slot, compatibility)
+
+
+WARMUP_UTTERANCES = [
+    "Dzień dobry, poproszę jedną dużą Margheritę na cienkim cieście.",
+    "Dwie małe pizze Pepperoni na grubym cieście z dodatkowym serem i podwójną szynką.",
+    "Do tej drugiej poproszę jeszcze pieczarki.",
+    "duża",
+]
+
+
+def _build_lemma_table(catalog: MenuCatalog) -> fast_path.LemmaTable:
+    """
+    Tablica lematów szybkiej ścieżki: wszystkie słowa z leksykonów parsera i z nazw w menu.
+    """
+    words = FAST_PATH_EXTRA_WORDS | PARSER_LEXICON_WORDS
+    for forms in (_pizza_forms(catalog).forms, _ingredient_forms(catalog).forms):
+        for form in forms:
+            words.update(form.split())
+    return fast_path.LemmaTable.build(get_nlp(), words)
+
+
+def _pizza_forms(catalog: MenuCatalog) -> inflection.FormIndex:
+    return catalog.get_index("pizza_forms", lambda c: inflection.build_form_index(c.pizzas, get_nlp()))
+
+
+def _ingredient_forms(catalog: MenuCatalog) -> inflection.FormIndex:
+    return catalog.get_index("ingredient_forms", lambda c: inflection.build_form_index(c.ingredients, get_nlp()))
+
+
+def _semantic_index(catalog: MenuCatalog) -> semantic.SemanticIndex:
+    return catalog.get_index("semantic", lambda c: semantic.SemanticIndex.build(get_nlp(), c))
+
+
+def _ingredient_index(catalog: MenuCatalog) -> menu_bitsets.IngredientIndex:
+    return catalog.get_index("ingredient_bitsets", menu_bitsets.IngredientIndex.build)
+
+
+def match_pizza_by_ingredients(slot: dict, index: menu_bitsets.IngredientIndex,
+                               explicit: Collection[Tuple[str, int]] = ()) -> bool:
+    """
+    "dużą pizzę z szynką i pieczarkami" bez nazwy: szukamy pizz z menu, których przepis ma
+    wszystkie wymienione składniki. Jedna taka pizza - wybieramy ją, a składniki z przepisu
+    przestają być dodatkami (podwójna szynka zostaje jako jedna dodatkowa). Kilka pizz -
+    zostaje podpowiedź z najlepiej pokrytą i alternatywami.
+    Wpisy `explicit` (dodatki tego slotu zamówione wprost, "z dodatkowym ananasem") są ponad
+    przepis: nie wybierają pizzy i zostają w extras bez zmian.
+    Zwraca True, jeśli slot coś dostał.
+    """
+    trace = parser_trace.current()
+    remaining = Counter(explicit)
+    ordered = []
+    for extra in slot["extras"]:
+        ordered.append(remaining[extra] > 0)
+        remaining[extra] -= 1
+    named = [name for (name, _), is_ordered in zip(slot["extras"], ordered) if not is_ordered]
+    candidates = index.pizzas_with(named) if named else []
+    if not candidates:
+        return False
+    if len(candidates) == 1:
+        pizza, _ = candidates[0]
+        slot["pizza"] = pizza
+        slot["extras"] = [(name, qty if is_ordered else qty - 1)
+                          for (name, qty), is_ordered in zip(slot["extras"], ordered) if is_ordered or qty > 1]
+        if "Nazwa pizzy" in slot["missing_info"]:
+            slot["missing_info"].remove("Nazwa pizzy")
+        slot.pop("suggestion", None)
+        if trace is not None:
+            trace.rule(slot, "pizza", pizza, "ingredient_bitsets", " ".join(named))
+        return True
+    (pizza, coverage), alternatives = candidates[0], candidates[1:]
+    slot["suggestion"] = {
+        "pizza": pizza,
+        "confidence": round(coverage, 3),
+        "source": "ingredients",
+        "alternatives": [name for name, _ in alternatives],
+    }
+    if trace is not None:
+        trace.rule(slot, "suggestion", pizza, "ingredient_bitsets", " ".join(named))
+    return True
+
+
+@contextmanager
+def _stage(name: str):
+    """Etap parsera: histogram w /metrics i span w śladzie żądania."""
+    with metrics.PARSE_STAGE.time(name), tracing.span(f"parse.{name}"):
+        yield
 
 
 class PizzaParser:
-    def __init__(self, db: Session):
+    def __init__(self, db: Optional[Session] = None, catalog: Optional[MenuCatalog] = None):
+        """
+        Menu z bazy (get_catalog) albo podany wprost `catalog` - np. stały katalog
+        korpusu w benchmarku, który działa bez bazy danych.
+        """
         self.db = db
-        self.nlp = nlp
-        self.all_pizzas = [p.name.lower() for p in db.query(Pizza).all()]
-        self.all_ingredients = [ing.name.lower() for ing in db.query(Ingredient).all()]
+        self.nlp = get_nlp()
+        self.catalog = catalog if catalog is not None else get_catalog(db)
+        self.all_pizzas = _pizza_forms(self.catalog)
+        self.all_ingredients = _ingredient_forms(self.catalog)
+        self.dough_compatibility = self.catalog.get_index("dough_bitsets", menu_bitsets.DoughCompatibility.build)
+
+    def _tokenize(self, text: str) -> list:
+        """
+        Krótkie wypowiedzi złożone wyłącznie ze znanych słów omijają spaCy (fast_path);
+        pozostałe idą przez pełny potok.
+        """
+        lemma_table = self.catalog.get_index("lemma_table", _build_lemma_table)
+        with _stage("tokenize"):
+            return fast_path.tokenize(self.nlp, lemma_table, text.lower())
+
+    def _scoring(self, tokens):
+        """Macierze score token x nazwa dla całej wypowiedzi, liczone raz przed etapami parsera."""
+        return batch_scoring.scoring([t.text.lower() for t in tokens], self.all_pizzas, self.all_ingredients)
+
+    def _resolve_missing_pizzas(self, tokens, slots: List[dict], explicit: dict):
+        """
+        Slotom bez nazwy pizzy najpierw dobiera pizzę po wymienionych składnikach
+        (indeks bitmap), a pozostałym dokłada podpowiedź semantyczną.
+        `explicit` to dodatki zamówione wprost, zebrane przez _assign_extras_trigram.
+        """
+        missing = [slot for slot in slots if slot["pizza"] is None]
+        if not missing:
+            return
+        with _stage("resolve_pizza"):
+            index = _ingredient_index(self.catalog)
+            common = explicit.get(None, Counter())
+            unresolved = []
+            for slot in missing:
+                ordered = explicit.get(id(slot), Counter()) + common
+                if not match_pizza_by_ingredients(slot, index, list(ordered.elements())):
+                    unresolved.append(slot)
+                elif slot["pizza"] is not None:
+                    validate_dough(slot, self.dough_compatibility)
+            if unresolved:
+                self._suggest_missing_pizzas(tokens, unresolved)
+
+    def _suggest_missing_pizzas(self, tokens, missing: List[dict]):
+        """
+        Dokłada podpowiedź semantyczną {"pizza", "confidence", "source"}
+        ("ta z owocami" -> hawajska), jeśli fraza jest wystarczająco podobna do pozycji menu.
+        """
+        stop_words = self.nlp.Defaults.stop_words
+        words = [t.text.lower() for t in tokens
+                 if t.text.isalpha() and t.text.lower() not in SEMANTIC_IGNORED_WORDS
+                 and t.text.lower() not in stop_words]
+        suggestion = _semantic_index(self.catalog).suggest(self.nlp, words) if words else None
+        if suggestion is None:
+            return
+        pizza, confidence = suggestion
+        trace = parser_trace.current()
+        for slot in missing:
+            slot["suggestion"] = {"pizza": pizza, "confidence": confidence, "source": "semantic"}
+            if trace is not None:
+                trace.rule(slot, "suggestion", pizza, "semantic", " ".join(words))
 
     def parse_order(self, text: str) -> List[dict]:
-        doc = self.nlp(text.lower())
-        tokens = list(doc)
-        
-        for token in doc:
-            log.info(f"{token.text}: {token.pos_}, {token.dep_}, {token.head.text}")
-        # for chunk in doc.noun_chunks:
-        #     log.info(chunk.text)
-        log.info("Text: %s", text)
-        log.info("Tokens: %s", tokens)
-        log.info("Tokens Lemma %s", [t.lemma_ for t in tokens])
-        # log.info("Existing slots: %s", existing_slots)
+        """
+        Wynik zależy tylko od tekstu i menu, więc idzie przez parse_cache (kopie przy odczycie).
+        W trybie explain parsujemy zawsze - z cache nie byłoby czego wyjaśniać.
+        """
+        if parser_trace.explaining():
+            return self._parse_order_uncached(text)
+        cached = parse_cache.get(self.catalog.version, text)
+        if cached is not None:
+            return cached
+        slots = self._parse_order_uncached(text)
+        parse_cache.put(self.catalog.version, text, slots)
+        return slots
+
+    def _parse_order_uncached(self, text: str) -> List[dict]:
+        tokens = self._tokenize(text)
+        explicit = {}
+        with self._scoring(tokens):
+            slots = self._parse_order(text, tokens, explicit)
+        self._resolve_missing_pizzas(tokens, slots, explicit)
+        return slots
+
+    def _parse_order(self, text: str, tokens, explicit: dict) -> List[dict]:
+        trace = parser_trace.current()
+        if trace is not None:
+            trace.event("parse", text=text, tokens=[t.text for t in tokens], lemmas=[t.lemma_ for t in tokens])
         common_attributes = {
             "dough": {
                 "big_size": None,
@@ -532,35 +842,47 @@ class PizzaParser:
             "extras": []
         }
         slots: List[dict] = []
-        slots = _detect_pizza_count(tokens, slots,  self.all_pizzas)
+        with _stage("pizza_count"):
+            slots = _detect_pizza_count(tokens, slots,  self.all_pizzas)
 
-        _assign_attributes(tokens, slots, self.all_pizzas, common_attributes)
-        _assign_extras_trigram(tokens, slots, self.all_ingredients, common_attributes)
+        with _stage("attributes"):
+            _assign_attributes(tokens, slots, self.all_pizzas, common_attributes)
+        with _stage("extras"):
+            _assign_extras_trigram(tokens, slots, self.all_ingredients, common_attributes, explicit=explicit)
     
-        merge_and_find_missing(slots, common_attributes)
+        with _stage("merge"):
+            merge_and_find_missing(slots, common_attributes, self.dough_compatibility)
         
         return slots
     
     def parse_order_in_context(self, text: str, existing_slots: List[dict]) -> List[dict]:
-        log.info(40*"-x-")
+        tokens = self._tokenize(text)
+        explicit = {}
+        with self._scoring(tokens):
+            slots = self._parse_order_in_context(text, tokens, existing_slots, explicit)
+        self._resolve_missing_pizzas(tokens, slots, explicit)
+        return slots
+
+    def _parse_order_in_context(self, text: str, tokens, existing_slots: List[dict], explicit: dict) -> List[dict]:
         reference_to_all = False
-        doc = self.nlp(text.lower())
-        tokens = list(doc)
-        for token in doc:
-            log.info(f"{token.text}: {token.pos_}, {token.dep_}, {token.head.text}")
-        log.info("Text: %s", text)
-        log.info("Tokens: %s", tokens)
-        log.info("Tokens Lemma %s", [t.lemma_ for t in tokens])
-        log.info("Existing slots: %s", existing_slots)
+        trace = parser_trace.current()
+        if trace is not None:
+            trace.event("parse_in_context", text=text, tokens=[t.text for t in tokens],
+                        lemmas=[t.lemma_ for t in tokens], existing_slots=len(existing_slots))
         
-        slot_idx_ref = _detect_slot_references(tokens, existing_slots)
+        with _stage("slot_reference"):
+            slot_idx_ref = _detect_slot_references(tokens, existing_slots)
         common_attributes = {"dough": {"big_size": None, "on_thick_pastry": None}, "extras": []}
         
         if slot_idx_ref is not None:
             active_slot = existing_slots[slot_idx_ref]
-            _assign_attributes(tokens, existing_slots, self.all_pizzas, common_attributes, active_slot)
-            _assign_extras_trigram(tokens, existing_slots, self.all_ingredients, common_attributes, active_slot)
-            merge_and_find_missing([active_slot], common_attributes)
+            with _stage("attributes"):
+                _assign_attributes(tokens, existing_slots, self.all_pizzas, common_attributes, active_slot)
+            with _stage("extras"):
+                _assign_extras_trigram(tokens, existing_slots, self.all_ingredients, common_attributes, active_slot,
+                                       explicit)
+            with _stage("merge"):
+                merge_and_find_missing([active_slot], common_attributes, self.dough_compatibility)
             return existing_slots
         
         else:
@@ -572,22 +894,35 @@ class PizzaParser:
                         existing_slots.pop(idx)
                 slots_to_fill = new_slots
             else:
-                new_slots = _detect_pizza_count(tokens, new_slots, self.all_pizzas)
+                with _stage("pizza_count"):
+                    new_slots = _detect_pizza_count(tokens, new_slots, self.all_pizzas)
                 slots_to_fill = new_slots if new_slots else existing_slots
             for token in tokens:
                 if token.text.lower() in REFERENCE_ALL_SLOTS:
                     reference_to_all = True
-            if reference_to_all:
-                _assign_attributes(tokens, [], self.all_pizzas, common_attributes)
-                _assign_extras_trigram(tokens, [], self.all_ingredients, common_attributes)
-            else:
-                _assign_attributes(tokens, slots_to_fill, self.all_pizzas, common_attributes)
-                _assign_extras_trigram(tokens, slots_to_fill, self.all_ingredients, common_attributes)
+            targets = [] if reference_to_all else slots_to_fill
+            with _stage("attributes"):
+                _assign_attributes(tokens, targets, self.all_pizzas, common_attributes)
+            with _stage("extras"):
+                _assign_extras_trigram(tokens, targets, self.all_ingredients, common_attributes, explicit=explicit)
             
-            merge_and_find_missing(slots_to_fill, common_attributes)
+            with _stage("merge"):
+                merge_and_find_missing(slots_to_fill, common_attributes, self.dough_compatibility)
             
             return existing_slots + new_slots if new_slots else existing_slots
 
+
+def warm_up(db: Session):
+    """
+    Ładuje model i katalog, a potem przepuszcza przez parser przykładowe zdania,
+    żeby pierwsze prawdziwe zamówienie nie trafiało na zimne cache spaCy.
+    """
+    parser = PizzaParser(db)
+    slots = parser._parse_order_uncached(WARMUP_UTTERANCES[0])  # z cache nic by się nie rozgrzało
+    for text in WARMUP_UTTERANCES[1:]:
+        slots = parser.parse_order_in_context(text, slots)
+    log.info("Parser warmed up with %s utterances (catalog %s)", len(WARMUP_UTTERANCES), parser.catalog.version)
+
 #
 # @router.post("/analyze-order")
 # def analyze_order(data: AnalyzeOrderRequest, db: Session = Depends(get_db)):
@@ -6,13 +6,19 @@ a po uzupełnieniu braków aktualizujemy i ewentualnie zmieniamy is_partial=Fals
 """
 
 from fastapi import APIRouter, Depends
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel
 from typing import Dict, List, Optional
-import ast
 import uuid
 
-from app.utils.logger import get_logger
-from app.database import get_db
+from app.utils.logger import conversation_id_var, get_logger
+from app.utils.caller_profiles import invalidate_caller_profile, is_reorder_request, reorder_last_order
+from app.utils import parser_trace, tracing
+from app.utils.catalog import MenuCatalog, current_catalog, load_catalog, publish_catalog
+from app.utils.slot_model import SlotCodec, diff_slots
+from app.database import get_async_db
+from sqlalchemy import func
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 from .analyze_order import PizzaParser
@@ -25,15 +31,19 @@ log = get_logger(__name__)
 
 router = APIRouter()
 
+# {"order_id", "status", "slots": List[Slot]} - sloty w zwartej postaci (utils/slot_model.py),
+# do parsera i odpowiedzi API zamieniane na słowniki przez SlotCodec
 CONVERSATION_STATES: Dict[str, dict] = {}
 
 class StartConversationRequest(BaseModel):
     order_id: int
     initial_text: str
+    explain: bool = False  # dołącz do odpowiedzi reguły parsera, które ustawiły pola slotów
 
 class ContinueConversationRequest(BaseModel):
     conversation_id: str
     user_text: str
+    explain: bool = False
 
 def _fill_db_item(session: Session, order_id: int, slot: dict) -> int:
     """
@@ -42,7 +52,7 @@ def _fill_db_item(session: Session, order_id: int, slot: dict) -> int:
     """
     pizza_id = None
     if slot["pizza"]:
-        pizza_obj = session.query(Pizza).filter(Pizza.name.ilike(slot["pizza"])).first()
+        pizza_obj = session.query(Pizza).filter(func.lower(Pizza.name) == slot["pizza"].lower()).first()
         if pizza_obj:
             pizza_id = pizza_obj.id
 
@@ -69,7 +79,7 @@ def _fill_db_item(session: Session, order_id: int, slot: dict) -> int:
     session.refresh(new_item)  # żeby mieć new_item._id
     
     for (ing_name, ing_qty) in slot["extras"]:
-        ing_obj = session.query(Ingredient).filter(Ingredient.name.ilike(ing_name)).first()
+        ing_obj = session.query(Ingredient).filter(func.lower(Ingredient.name) == ing_name.lower()).first()
         if ing_obj and ing_obj not in new_item.additional_ingredients_pivot:
             try:
                 new_additional_ingredient = AdditionalIngredient(order_pizza_id=new_item.id,
@@ -93,7 +103,7 @@ def _update_db_item(session: Session, db_id: int, slot: dict):
 
     # Ustawiamy pizza_id, jeśli slot["pizza"] rozpoznano
     if slot["pizza"]:
-        pizza_obj = session.query(Pizza).filter(Pizza.name.ilike(slot["pizza"])).first()
+        pizza_obj = session.query(Pizza).filter(func.lower(Pizza.name) == slot["pizza"].lower()).first()
         if pizza_obj:
             db_item.pizza_id = pizza_obj.id
     
@@ -111,7 +121,7 @@ def _update_db_item(session: Session, db_id: int, slot: dict):
         db_item.quantity = slot["pizza_count"]
     
     for (ing_name, ing_qty) in slot["extras"]:
-        ing_obj = session.query(Ingredient).filter(Ingredient.name.ilike(ing_name)).first()
+        ing_obj = session.query(Ingredient).filter(func.lower(Ingredient.name) == ing_name.lower()).first()
         if session.query(AdditionalIngredient).filter(AdditionalIngredient.order_pizza_id == db_id, AdditionalIngredient.ingredient_id == ing_obj.id).first():
             continue
         if ing_obj and ing_obj not in db_item.additional_ingredients_pivot:
@@ -127,63 +137,64 @@ def _update_db_item(session: Session, db_id: int, slot: dict):
     session.commit()
 
 
-def _compare_slots(updated_slots, existing_slots=None):
+def _try_reorder(session: Session, order_id: int, text: str) -> Optional[List[dict]]:
     """
-    Porównuje dwie listy słowników i zwraca różnice jako sformatowany string.
+    Szybka ścieżka dla stałych klientów: "to samo co ostatnio" kopiuje poprzednie
+    zamówienie bez uruchamiania parsera. Zwraca sloty z db_id albo None.
     """
-    existing_map ={}
-    updated_map = {}
-    if existing_slots:
-        for slot in existing_slots:
-            existing_map[slot["db_id"]] = {
-                "pizza":           slot["pizza"],
-                "pizza_count":     slot["pizza_count"],
-                "big_size":        slot["dough"]["big_size"],
-                "on_thick_pastry": slot["dough"]["on_thick_pastry"],
-                "extras":   [f"{ing}-{qty}" for ing, qty in slot["extras"]]
-                }
-    for slot in updated_slots:
-        updated_map[slot["db_id"]] = {
-            "pizza":           slot["pizza"],
-            "pizza_count":     slot["pizza_count"],
-            "big_size":        slot["dough"]["big_size"],
-            "on_thick_pastry": slot["dough"]["on_thick_pastry"],
-            "extras":   [f"{ing}-{qty}" for ing, qty in slot["extras"]]
-            }
-        
-    differences = []
-    log.info(f"Existing slots: {existing_map}")
-    log.info(f"Updated slots: {updated_map}")
-    
-    for slot_id, updated_slot in updated_map.items():
-        if slot_id not in existing_map:
-            differences.append(f"Nowy slot: {updated_slot}")
-        else:
-            existing_slot = existing_map[slot_id]
-            for key, value in updated_slot.items():
-                if key not in existing_slot:
-                    differences.append(f"Nowa zmienna w slocie {slot_id}: {key} = {value}")
-                elif existing_slot[key] != value:
-                    differences.append(f"Zmieniona zmienna w slocie {slot_id}: {key} (z '{existing_slot[key]}' na '{value}')")
+    if not is_reorder_request(text):
+        return None
+    order = session.get(Order, order_id)
+    if not order:
+        return None
+    return reorder_last_order(session, order)
 
-    for slot_id in existing_map.keys():
-        if slot_id not in updated_map:
-            differences.append(f"Slot usunięty: {existing_map[slot_id]}")
 
-    result = ", ".join(differences) if  differences else "Brak zmian"
-    return result
+async def _catalog(db: AsyncSession) -> MenuCatalog:
+    """Bieżący katalog; po upływie TTL wiersze wczytujemy przez run_sync, reszta to podmiana wskaźnika."""
+    catalog = current_catalog()
+    if catalog is None:
+        with tracing.span("catalog.load"):
+            catalog = publish_catalog(await db.run_sync(load_catalog))
+    return catalog
 
 
+async def _slot_codec(db: AsyncSession) -> SlotCodec:
+    catalog = await _catalog(db)
+    return await run_in_threadpool(catalog.get_index, "slot_codec", SlotCodec.build)
+
+
+def _parse(catalog: MenuCatalog, text: str, existing_slots: Optional[List[dict]] = None) -> List[dict]:
+    """
+    W puli wątków: budowa parsera (model, indeksy form i bitmap katalogu - przy nowej
+    wersji menu to nlp.pipe po całym katalogu) i samo parsowanie.
+    """
+    with tracing.span("parser.init"):
+        parser = PizzaParser(catalog=catalog)
+    if existing_slots is None:
+        return parser.parse_order(text)
+    return parser.parse_order_in_context(text, existing_slots)
+
 
 @router.post("/start")
-def start_conversation(data: StartConversationRequest, db: Session = Depends(get_db)):
+async def start_conversation(data: StartConversationRequest, db: AsyncSession = Depends(get_async_db)):
     conversation_id = str(uuid.uuid4())
-    order = db.query(Order).filter(Order.id == data.order_id).first()
+    conversation_id_var.set(conversation_id)
+    order = await db.get(Order, data.order_id)
     if not order:
         return {"success": False, "message": f"Zamówienie {data.order_id} nie istnieje."}
 
-    parser = PizzaParser(db)
-    parsed_items = parser.parse_order(data.initial_text)
+    explanation = []
+    with tracing.span("conversation.reorder"):
+        parsed_items = await db.run_sync(_try_reorder, data.order_id, data.initial_text)
+    if parsed_items is None:
+        # Zapytania (katalog, zapisy slotów) idą przez run_sync, a budowa parsera
+        # i parsowanie (CPU) do puli wątków, żeby nie blokować pętli zdarzeń.
+        catalog = await _catalog(db)
+        with parser_trace.tracing(conversation_id, explain=data.explain) as trace, tracing.span("parse"):
+            parsed_items = await run_in_threadpool(_parse, catalog, data.initial_text)
+        if data.explain:
+            explanation = trace.explanation(parsed_items)
     
     if not parsed_items:
         # Tworzymy pusty stan
@@ -192,20 +203,30 @@ def start_conversation(data: StartConversationRequest, db: Session = Depends(get
             "status": "waiting_for_order_details",
             "slots": []
         }
-        return {
+        response = {
             "conversation_id": conversation_id,
             "message": "Nie zrozumiałem zamówienia. Podaj proszę, co chcesz zamówić."
         }
+        if data.explain:
+            response["explanation"] = explanation
+        return response
 
     for slot in parsed_items:
-        db_id = _fill_db_item(db, data.order_id, slot)
+        if "db_id" in slot:
+            continue
+        with tracing.span("db.fill_item"):
+            db_id = await db.run_sync(_fill_db_item, data.order_id, slot)
         slot["db_id"] = db_id  # zapamiętujemy, który wiersz w bazie to jest
     
-    parse_transcription_results = _compare_slots(parsed_items)
+    codec = await _slot_codec(db)
+    slots = codec.encode(parsed_items)
+    parse_transcription_results = diff_slots(codec, slots)
     log.info(f'Parse transcription "%s" results: %s', data.initial_text, parse_transcription_results)
     new_transcription_log = TranscriptionLog(content=data.initial_text, updated_slots=parse_transcription_results, parsed=str(parsed_items),order_id=data.order_id)
-    db.add(new_transcription_log)
-    db.commit()
+    with tracing.span("db.transcript_commit"):
+        db.add(new_transcription_log)
+        await db.commit()
+    await db.run_sync(invalidate_caller_profile, data.order_id)
     
     incomplete = any(len(s["missing_info"]) > 0 for s in parsed_items)
     status = "awaiting_missing_info" if incomplete else "all_info_provided"
@@ -213,50 +234,70 @@ def start_conversation(data: StartConversationRequest, db: Session = Depends(get
     CONVERSATION_STATES[conversation_id] = {
         "order_id": data.order_id,
         "status": status,
-        "slots": parsed_items
+        "slots": slots
     }
 
     msg = "Wszystkie informacje uzupełnione." if not incomplete else (
         "Brakuje parametrów. Proszę dopowiedz szczegóły."
     )
-    return {
+    response = {
         "conversation_id": conversation_id,
         "message": msg,
         "parsed_items": parsed_items
     }
+    if data.explain:
+        response["explanation"] = explanation
+    return response
 
 
 @router.post("/continue")
-def continue_conversation(data: ContinueConversationRequest, db: Session = Depends(get_db)):
-    conv_state = CONVERSATION_STATES.get(data.conversation_id)
-    if not conv_state:
-        return {"success": False, "message": "Nie znaleziono konwersacji o tym ID."}
-    
-    exists_slots = conv_state["slots"]
-    parser = PizzaParser(db)
-    updated_slots = parser.parse_order_in_context(data.user_text, exists_slots)
-    
+async def continue_conversation(data: ContinueConversationRequest, db: AsyncSession = Depends(get_async_db)):
+    conversation_id_var.set(data.conversation_id)
+    with tracing.span("conversation.state"):
+        conv_state = CONVERSATION_STATES.get(data.conversation_id)
+        if not conv_state:
+            return {"success": False, "message": "Nie znaleziono konwersacji o tym ID."}
+        codec = await _slot_codec(db)
+        slots_before = conv_state["slots"]
+        # parser modyfikuje sloty w miejscu, więc dostaje świeże słowniki, a slots_before zostaje do porównania
+        exists_slots = codec.decode(slots_before)
     old_len = len(exists_slots)
+    explanation = []
+    with tracing.span("conversation.reorder"):
+        reordered_slots = await db.run_sync(_try_reorder, conv_state["order_id"], data.user_text)
+    if reordered_slots is not None:
+        updated_slots = exists_slots + reordered_slots
+    else:
+        catalog = await _catalog(db)
+        with parser_trace.tracing(data.conversation_id, explain=data.explain) as trace, tracing.span("parse"):
+            updated_slots = await run_in_threadpool(_parse, catalog, data.user_text, exists_slots)
+        if data.explain:
+            explanation = trace.explanation(updated_slots)
+    
     new_len = len(updated_slots)
     if new_len > old_len:
         new_slots = updated_slots[old_len:]
         for s in new_slots:
-            db_id = _fill_db_item(db, conv_state["order_id"], s)
+            if "db_id" in s:
+                continue
+            with tracing.span("db.fill_item"):
+                db_id = await db.run_sync(_fill_db_item, conv_state["order_id"], s)
             s["db_id"] = db_id
     else:
         for s in updated_slots:
             if "db_id" not in s:
-                db_id = _fill_db_item(db, conv_state["order_id"], s)
+                with tracing.span("db.fill_item"):
+                    db_id = await db.run_sync(_fill_db_item, conv_state["order_id"], s)
                 s["db_id"] = db_id
 
-    conv_state["slots"] = updated_slots
-
     for slot in updated_slots:
-        _update_db_item(db, slot["db_id"], slot)
+        with tracing.span("db.update_item", **{"order_pizza.id": slot["db_id"]}):
+            await db.run_sync(_update_db_item, slot["db_id"], slot)
     incomplete = any(len(s["missing_info"]) > 0 for s in updated_slots)
     status = "awaiting_missing_info" if incomplete else "all_info_provided"
     
-    conv_state["slots"] = updated_slots
+    slots = codec.encode(updated_slots)
+    conv_state["slots"] = slots
     conv_state["status"] = status
     
     msg = "OK"
@@ -265,22 +306,21 @@ def continue_conversation(data: ContinueConversationRequest, db: Session = Depen
     else:
         msg += " – Wszystkie informacje kompletne."
         
-    latest_transcription = db.query(TranscriptionLog).filter(
-            TranscriptionLog.order_id == conv_state["order_id"]).order_by(TranscriptionLog.id.desc()).first()
-    try:
-        parsed_slots_before = ast.literal_eval(latest_transcription.parsed)
-    except:
-        parsed_slots_before = []
-    parse_transcription_results = _compare_slots(updated_slots, parsed_slots_before)
+    parse_transcription_results = diff_slots(codec, slots, slots_before)
     log.info(f'Parse transcription "%s" results: %s', data.user_text, parse_transcription_results)
     new_transcription_log = TranscriptionLog(content=data.user_text, updated_slots=parse_transcription_results,
                                              parsed=str(updated_slots), order_id=conv_state["order_id"])
-    db.add(new_transcription_log)
-    db.commit()
+    with tracing.span("db.transcript_commit"):
+        db.add(new_transcription_log)
+        await db.commit()
+    await db.run_sync(invalidate_caller_profile, conv_state["order_id"])
 
-    return {
+    response = {
         "conversation_id": data.conversation_id,
         "status": conv_state["status"],
         "parsed_items": updated_slots,
         "message": msg
     }
+    if data.explain:
+        response["explanation"] = explanation
+    return response
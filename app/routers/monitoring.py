@@ -0,0 +1,147 @@
+# path/filename: routers/monitoring.py
+"""
+Endpointy diagnostyczne: gotowość workera, statystyki zapytań SQL per trasa,
+stan puli połączeń itp. oraz /metrics w formacie Prometheusa.
+"""
+import hmac
+import os
+import time
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, PlainTextResponse
+
+from app.database import async_engine, engine
+from app.routers.conversation import CONVERSATION_STATES
+from app.utils import metrics, stack_sampler
+from app.utils.fast_path import get_fast_path_stats
+from app.utils.inflection import get_form_index_stats
+from app.utils.logger import get_log_stats
+from app.utils.parse_cache import get_parse_cache_stats
+from app.utils.pool_metrics import get_pool_stats
+from app.utils.query_counter import get_route_query_metrics
+from app.utils.tracing import get_trace_stats
+
+
+router = APIRouter()
+metrics_router = APIRouter()
+
+# pusty = endpointy administracyjne wyłączone
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+
+
+def _require_admin(x_admin_token: str = Header(default="")):
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not hmac.compare_digest(x_admin_token.encode(), ADMIN_TOKEN.encode()):
+        raise HTTPException(status_code=403, detail="Forbidden")
+
+
+@router.get("/ready")
+def get_readiness(request: Request):
+    """
+    200 dopiero po rozgrzaniu modelu spaCy i katalogu - orchestrator kieruje
+    połączenia tylko do gotowych workerów.
+    """
+    ready = getattr(request.app.state, "ready", False)
+    return JSONResponse({"ready": ready}, status_code=200 if ready else 503)
+
+
+@router.get("/queries")
+def get_query_metrics():
+    """
+    Liczba zapytań i czas w bazie per trasa oraz liczba żądań z podejrzeniem N+1.
+    """
+    return get_route_query_metrics()
+
+
+@router.get("/pool")
+def get_pool_metrics():
+    """
+    Stan puli połączeń tego workera (wypożyczone, overflow, czas oczekiwania na połączenie).
+    """
+    return {
+        "sync": get_pool_stats(engine),
+        "async": get_pool_stats(async_engine.sync_engine),
+    }
+
+
+@router.get("/nlp")
+def get_nlp_metrics():
+    """
+    Trafienia szybkiej ścieżki (tablica lematów) vs pełny potok spaCy i średnie czasy obu,
+    ile nazw z menu rozpoznał indeks form, a ile trafiło do fuzzy, oraz trafienia cache parsera.
+    """
+    return {**get_fast_path_stats(), "form_index": get_form_index_stats(), "parse_cache": get_parse_cache_stats()}
+
+
+@router.get("/logging")
+def get_logging_metrics():
+    """
+    Kolejka logów: ile rekordów przyjęto, ile odrzucono przy pełnej kolejce i ile czeka na zapis.
+    """
+    return get_log_stats()
+
+
+@router.get("/tracing")
+def get_tracing_metrics():
+    """
+    Ślady żądań: ile powstało, ile przekroczyło TRACE_SLOW_MS i trafiło do pliku, ile odrzucono.
+    """
+    return get_trace_stats()
+
+
+@router.post("/profile", dependencies=[Depends(_require_admin)])
+async def profile_worker(seconds: float = 10.0, interval_ms: float = 5.0, thread: str = None):
+    """
+    Próbkuje stosy wszystkich wątków TEGO workera przez `seconds` s i zwraca plik collapsed
+    (flamegraph.pl / speedscope). `thread` zawęża wynik do wątków o danym prefiksie nazwy
+    (np. "MainThread" - pętla zdarzeń, "AnyIO worker" - pula parsera). Wymaga nagłówka X-Admin-Token.
+    """
+    try:
+        result = await run_in_threadpool(stack_sampler.sample, seconds, interval_ms / 1000)
+    except stack_sampler.ProfilerBusy:
+        raise HTTPException(status_code=409, detail="Profiler already running on this worker")
+    filename = f"profile-{os.getpid()}-{int(time.time())}.collapsed"
+    return PlainTextResponse(stack_sampler.collapsed(result["stacks"], thread), headers={
+        "Content-Disposition": f'attachment; filename="{filename}"',
+        "X-Worker-PID": str(os.getpid()),
+        "X-Profile-Samples": str(result["samples"]),
+    })
+
+
+def _collect_stats():
+    """Istniejące statystyki modułów jako próbki Prometheusa (liczone przy scrape'ie)."""
+    yield ("pizza_conversations_active", "gauge", "Rozmowy trzymane w pamięci tego workera.",
+           [({}, len(CONVERSATION_STATES))])
+    cache = get_parse_cache_stats()
+    yield ("pizza_parse_cache_lookups_total", "counter", "Odczyty cache parsera wg wyniku.",
+           [({"result": "memory_hit"}, cache["memory_hits"]), ({"result": "disk_hit"}, cache["disk_hits"]),
+            ({"result": "miss"}, cache["misses"])])
+    fast_path = get_fast_path_stats()
+    yield ("pizza_tokenize_total", "counter", "Tokenizacje szybką ścieżką (tablica lematów) i pełnym spaCy.",
+           [({"path": "fast"}, fast_path["fast"]["count"]), ({"path": "full"}, fast_path["full"]["count"])])
+    forms = get_form_index_stats()
+    yield ("pizza_name_lookups_total", "counter", "Dopasowania nazw z menu wg metody.",
+           [({"method": method}, forms[method]) for method in ("exact", "phonetic", "fuzzy")])
+    logs = get_log_stats()
+    yield ("pizza_log_records_total", "counter", "Rekordy logu przyjęte do kolejki i odrzucone.",
+           [({"result": "enqueued"}, logs["enqueued"]), ({"result": "dropped"}, logs["dropped"])])
+    pools = {"sync": get_pool_stats(engine), "async": get_pool_stats(async_engine.sync_engine)}
+    yield ("pizza_db_pool_checked_out", "gauge", "Połączenia wypożyczone z puli.",
+           [({"engine": name}, stats["checked_out"]) for name, stats in pools.items() if "checked_out" in stats])
+    yield ("pizza_db_pool_checkout_timeouts_total", "counter", "Przekroczenia czasu oczekiwania na połączenie.",
+           [({"engine": name}, stats["checkout_timeouts"]) for name, stats in pools.items()
+            if "checkout_timeouts" in stats])
+
+
+metrics.register_collector(_collect_stats)
+
+
+@metrics_router.get("/metrics", response_class=PlainTextResponse)
+def get_prometheus_metrics():
+    """
+    Metryki tego workera w formacie tekstowym Prometheusa: latencja tras, etapy parsera,
+    czas w bazie na żądanie, liczba rozmów w pamięci, trafienia cache.
+    """
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
@@ -1,9 +1,12 @@
 from fastapi import APIRouter, Depends
-from app.database import get_db
+from app.database import get_async_db
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from app.models import Client, Order, OrderPizzas, Pizza, Dough, Ingredient, TranscriptionLog
 from app.schemas import InitOrderRequest, OrderSchema, TranscriptionHistoryResponse, TranscriptionItem
 from app.utils.logger import get_logger
+from app.utils.caller_profiles import warm_caller_profile
 from app.schemas import OrderItemSummary, OrderSummaryResponse
 
 # path/filename: routers/orders.py
@@ -20,36 +23,43 @@ log = get_logger(__name__)
 router = APIRouter()
 
 @router.get("/")
-def get_orders(db: Session = Depends(get_db)):
-    order_items = db.query(Order).all()
+async def get_orders(db: AsyncSession = Depends(get_async_db)):
+    order_items = (await db.execute(select(Order))).scalars().all()
     return order_items
 
 
 @router.post("/init", response_model=OrderSchema)
-def call_and_initiate_order(request: InitOrderRequest, db: Session = Depends(get_db)):
+async def call_and_initiate_order(request: InitOrderRequest, db: AsyncSession = Depends(get_async_db)):
 		"""
 		Call the order and initiate it for the given client.
 		"""
 		phone = request.phone
 		log.info("Initiating order")
-		client = db.query(Client).filter(Client.phone == phone).first()
+		client = (await db.execute(select(Client).filter(Client.phone == phone))).scalars().first()
 		if not client:
 				log.info(f"Creating new client with phone: {phone}")
 				client = Client(phone=phone)
 				db.add(client)
-				db.commit()
-				db.refresh(client)
+				await db.commit()
+				await db.refresh(client)
 		log.info(f"Creating new order for client: {client}")
 		order = Order(client_id=client.id)
 		db.add(order)
-		db.commit()
-		db.refresh(order)
+		await db.commit()
+		# Kolumny są już wypełnione po flush; AsyncSession nie doładuje leniwie relacji.
+		await db.refresh(order, ["pizzas"])
+		await db.run_sync(warm_caller_profile, client, exclude_order_id=order.id)
 		return OrderSchema.model_validate(order)
 
 
 
 @router.get("/summary/{order_id}", response_model=OrderSummaryResponse)
-def get_order_summary(order_id: int, db: Session = Depends(get_db)):
+async def get_order_summary(order_id: int, db: AsyncSession = Depends(get_async_db)):
+    # Leniwe relacje (składniki pizzy, dodatki) ładujemy w greenlecie przez run_sync.
+    return await db.run_sync(_build_order_summary, order_id)
+
+
+def _build_order_summary(db: Session, order_id: int) -> OrderSummaryResponse:
     order = db.query(Order).filter(Order.id == order_id).first()
     if not order:
         raise HTTPException(status_code=404, detail="Order not found")
@@ -116,12 +126,13 @@ def get_order_summary(order_id: int, db: Session = Depends(get_db)):
     return summary
 
 @router.get("/transcript/{order_id}", response_model=TranscriptionHistoryResponse)
-def get_transcription_history(order_id: int, db: Session = Depends(get_db)):
-    order = db.query(Order).filter(Order.id == order_id).first()
+async def get_transcription_history(order_id: int, db: AsyncSession = Depends(get_async_db)):
+    order = await db.get(Order, order_id)
     if not order:
         raise HTTPException(status_code=404, detail="Order not found")
     transcriptions_history: List[TranscriptionItem]= []
-    transcriptions = db.query(TranscriptionLog).filter(TranscriptionLog.order_id == order_id).all()
+    transcriptions = (await db.execute(
+        select(TranscriptionLog).filter(TranscriptionLog.order_id == order_id))).scalars().all()
     for row in transcriptions:
         if not row.parsed:
             row.parsed = "N/A"
@@ -1,5 +1,3 @@
-from app.routers.analyze_order import analyze_order
-
 example_orders_by_chat_gpt = [
 	"Dzień dobry, poproszę jedną dużą Margheritę i średnią Pepperoni. Do tego jeszcze dwie butelki coli, jeśli można.",
 	"Cześć, chciałbym zamówić pizzę Capriciosa na cienkim cieście, dużą. Proszę jeszcze o sos czosnkowy i dodatkowy ser.",
@@ -28,7 +26,13 @@ example_orders_by_chat_gpt = [
 	"Poproszę dwie duże pizze: jedną Pepperoni z podwójnym serem i sosem barbecue, drugą Hawajską na cienkim cieście. Do tego jeszcze jedną średnią pizzę cztery sery z dodatkowym jalapeños. Chciałbym także zamówić zestaw pięciu sosów: dwa czosnkowe, dwa pomidorowe i jeden barbecue. Jeśli można, proszę o dwie butelki coli i jedną Sprite. Adres dostawy podam zaraz."
                               ]
 
-for order in example_orders_by_chat_gpt:
-	print(analyze_order(order))
+if __name__ == "__main__":
+	from app.database import SessionLocal
+	from app.routers.analyze_order import PizzaParser
+
+	with SessionLocal() as db:
+		parser = PizzaParser(db)
+		for order in example_orders_by_chat_gpt:
+			print(parser.parse_order(order))
 
 
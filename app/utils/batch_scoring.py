@@ -0,0 +1,79 @@
+# path/filename: utils/batch_scoring.py
+"""
+Macierz podobieństwa token x nazwa z katalogu liczona raz na wypowiedź.
+
+Zamiast wołać fuzz.ratio para po parze w pętlach Pythona (dla każdego tokenu
+osobno w każdym etapie parsera), liczymy całą macierz jednym wywołaniem
+rapidfuzz.process.cdist (C++). Wyniki zaokrąglamy tak jak
+fuzzywuzzy (int(round(...))), więc progi 66/70 w parserze działają bez zmian.
+
+Macierze dla bieżącej wypowiedzi leżą w ContextVar, a fuzzy_match_pizza /
+fuzzy_find_ingredient czytają z nich najlepsze dopasowanie.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from rapidfuzz import fuzz, process
+
+from app.utils import metrics, tracing
+
+
+_current_matrices: ContextVar[Optional[Dict[int, "ScoreMatrix"]]] = ContextVar("score_matrices", default=None)
+
+
+class ScoreMatrix:
+    def __init__(self, queries: List[str], names: List[str]):
+        self.names = names
+        self.rows = {query: row for row, query in enumerate(queries)}
+        if queries and names:
+            scores = process.cdist(queries, names, scorer=fuzz.ratio, dtype=np.float32)
+            self.scores = np.rint(scores).astype(np.int32)
+            self.best_columns = self.scores.argmax(axis=1)
+        else:
+            self.scores = np.zeros((len(queries), len(names)), dtype=np.int32)
+            self.best_columns = np.zeros(len(queries), dtype=np.int64)
+
+    def best(self, query: str) -> Optional[Tuple[Optional[str], int]]:
+        """
+        (najlepsza nazwa, score) jak w pętli z fuzz.ratio - przy remisie wygrywa pierwsza
+        nazwa, przy zerowym score nazwa to None. None, jeśli zapytania nie ma w macierzy.
+        """
+        row = self.rows.get(query)
+        if row is None:
+            return None
+        if not self.names:
+            return (None, 0)
+        column = self.best_columns[row]
+        score = int(self.scores[row, column])
+        return (self.names[column], score) if score > 0 else (None, 0)
+
+
+@contextmanager
+def scoring(queries: Iterable[str], *name_lists: List[str]):
+    """
+    Liczy macierze dla wszystkich tokenów wypowiedzi i podanych list nazw:
+
+        with batch_scoring.scoring([t.text.lower() for t in tokens], all_pizzas, all_ingredients):
+            ...
+    """
+    with metrics.PARSE_STAGE.time("scoring"), tracing.span("parse.scoring"):
+        queries = list(dict.fromkeys(query for query in queries if query))
+        matrices = {id(names): ScoreMatrix(queries, names) for names in name_lists}
+    token = _current_matrices.set(matrices)
+    try:
+        yield matrices
+    finally:
+        _current_matrices.reset(token)
+
+
+def best_match(query: str, names: List[str]) -> Optional[Tuple[Optional[str], int]]:
+    """Wynik z macierzy bieżącej wypowiedzi albo None, jeśli trzeba liczyć parami."""
+    matrices = _current_matrices.get()
+    if matrices is None:
+        return None
+    matrix = matrices.get(id(names))
+    if matrix is None or matrix.names is not names:
+        return None
+    return matrix.best(query)
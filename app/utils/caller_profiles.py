@@ -0,0 +1,240 @@
+# path/filename: utils/caller_profiles.py
+"""
+Cache profili stałych klientów, kluczem jest numer telefonu.
+
+Profil rozgrzewamy w /orders/init ostatnimi zamówieniami klienta. Dzięki temu
+wypowiedź w stylu "to samo co ostatnio" nie przechodzi przez parser - kopiujemy
+pozycje poprzedniego zamówienia (order_pizzas + additional_ingredients)
+zapytaniami INSERT ... SELECT i od razu mamy gotowe sloty.
+
+Wpis żyje najwyżej CALLER_PROFILE_TTL_SECONDS (inne workery mogą w tym czasie
+zapisać zamówienia klienta), a zapis pozycji zamówienia w tym procesie usuwa go
+od razu (invalidate_caller_profile). W cache trzymamy historię bez wykluczeń -
+bieżące zamówienie odfiltrowujemy przy każdym odczycie.
+"""
+import copy
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+from sqlalchemy import false, func, insert, literal, select
+from sqlalchemy.orm import Session
+
+from app.models import AdditionalIngredient, Client, Dough, Ingredient, Order, OrderPizzas, Pizza
+from app.utils.logger import get_logger
+
+
+log = get_logger(__name__)
+
+PROFILE_CACHE_SIZE = int(os.getenv("CALLER_PROFILE_CACHE_SIZE", "1000"))
+PROFILE_RECENT_ORDERS = int(os.getenv("CALLER_PROFILE_RECENT_ORDERS", "3"))
+PROFILE_TTL_SECONDS = float(os.getenv("CALLER_PROFILE_TTL_SECONDS", "300"))
+
+REORDER_PHRASES = (
+    "to samo co ostatnio",
+    "to samo co poprzednio",
+    "to samo co zwykle",
+    "to samo co zawsze",
+    "to co ostatnio",
+    "to co zwykle",
+    "to co zawsze",
+    "jak ostatnio",
+    "jak poprzednio",
+    "jak zwykle",
+    "jak zawsze",
+)
+REORDER_FILLER_WORDS = {
+    "dzień", "dobry", "cześć", "witam", "proszę", "poproszę", "chciałbym", "chciałabym",
+    "zamawiam", "zamówić", "zamówię", "biorę", "wezmę", "dla", "mnie", "mi", "to", "samo",
+    "raz", "jeszcze", "i", "a", "więc", "no", "tak", "bardzo", "dziękuję",
+}
+
+CALLER_PROFILES: "OrderedDict[str, dict]" = OrderedDict()
+_profiles_lock = threading.Lock()
+
+
+def _normalize_text(text: str) -> str:
+    return " ".join(re.findall(r"\w+", text.lower()))
+
+
+def is_reorder_request(text: str) -> bool:
+    """
+    Sprawdza, czy wypowiedź to prośba o powtórzenie poprzedniego zamówienia.
+    Poza frazą dopuszczamy tylko słowa grzecznościowe - "jak zwykle, ale z pieczarkami"
+    musi już przejść przez parser.
+    """
+    normalized = _normalize_text(text)
+    for phrase in REORDER_PHRASES:
+        if phrase in normalized:
+            rest = normalized.replace(phrase, " ").split()
+            return all(word in REORDER_FILLER_WORDS for word in rest)
+    return False
+
+
+def _load_recent_orders(db: Session, client_id: int, limit: int = PROFILE_RECENT_ORDERS + 1) -> List[dict]:
+    """
+    Wczytuje ostatnie zamówienia klienta jako listę slotów (taki sam kształt jak w parserze).
+    Trzy zapytania niezależnie od długości historii. Domyślnie o jedno zamówienie więcej,
+    żeby po odfiltrowaniu bieżącego zostało PROFILE_RECENT_ORDERS.
+    """
+    complete_items = select(OrderPizzas.order_id).where(OrderPizzas.pizza_id.isnot(None),
+                                                         OrderPizzas.dough_id.isnot(None))
+    orders_query = select(Order.id).where(Order.client_id == client_id, Order.id.in_(complete_items))
+    order_ids = db.execute(orders_query.order_by(Order.id.desc()).limit(limit)).scalars().all()
+    if not order_ids:
+        return []
+
+    items = db.execute(
+        select(OrderPizzas.id, OrderPizzas.order_id, OrderPizzas.quantity, Pizza.name,
+               Dough.big_size, Dough.on_thick_pastry)
+        .join(Pizza, Pizza.id == OrderPizzas.pizza_id)
+        .join(Dough, Dough.id == OrderPizzas.dough_id)
+        .where(OrderPizzas.order_id.in_(order_ids))
+        .order_by(OrderPizzas.id)
+    ).all()
+    extras = db.execute(
+        select(AdditionalIngredient.order_pizza_id, Ingredient.name, AdditionalIngredient.quantity)
+        .join(Ingredient, Ingredient.id == AdditionalIngredient.ingredient_id)
+        .where(AdditionalIngredient.order_pizza_id.in_([item.id for item in items]))
+        .order_by(AdditionalIngredient.id)
+    ).all()
+
+    extras_by_item: Dict[int, list] = {}
+    for row in extras:
+        extras_by_item.setdefault(row.order_pizza_id, []).append((row.name.lower(), row.quantity))
+
+    slots_by_order: Dict[int, list] = {order_id: [] for order_id in order_ids}
+    for item in items:
+        slots_by_order[item.order_id].append({
+            "pizza":        item.name.lower(),
+            "pizza_count":  item.quantity,
+            "dough":        {
+                "big_size": item.big_size,
+                "on_thick_pastry": item.on_thick_pastry,
+            },
+            "extras":       extras_by_item.get(item.id, []),
+            "missing_info": []
+        })
+    return [{"order_id": order_id, "slots": slots_by_order[order_id]} for order_id in order_ids]
+
+
+def _store_profile(phone: str, profile: dict):
+    with _profiles_lock:
+        CALLER_PROFILES[phone] = profile
+        CALLER_PROFILES.move_to_end(phone)
+        while len(CALLER_PROFILES) > PROFILE_CACHE_SIZE:
+            CALLER_PROFILES.popitem(last=False)
+
+
+def _without_order(profile: dict, exclude_order_id: Optional[int]) -> dict:
+    recent_orders = [order for order in profile["recent_orders"] if order["order_id"] != exclude_order_id]
+    return {**profile, "recent_orders": recent_orders[:PROFILE_RECENT_ORDERS]}
+
+
+def warm_caller_profile(db: Session, client: Client, exclude_order_id: Optional[int] = None) -> dict:
+    """
+    Wczytuje (lub odświeża) profil klienta. Wołane w /orders/init, zanim padnie pierwsze zdanie.
+    """
+    profile = {
+        "client_id": client.id,
+        "phone": client.phone,
+        "recent_orders": _load_recent_orders(db, client.id),
+        "loaded_at": time.monotonic(),
+    }
+    _store_profile(client.phone, profile)
+    log.info("Caller profile for %s warmed with %s orders", client.phone, len(profile["recent_orders"]))
+    return _without_order(profile, exclude_order_id)
+
+
+def get_caller_profile(db: Session, client: Client, exclude_order_id: Optional[int] = None) -> dict:
+    """Profil z cache (o ile nie starszy niż TTL), zawsze bez zamówienia exclude_order_id."""
+    with _profiles_lock:
+        profile = CALLER_PROFILES.get(client.phone)
+        if profile is not None and time.monotonic() - profile["loaded_at"] > PROFILE_TTL_SECONDS:
+            del CALLER_PROFILES[client.phone]
+            profile = None
+        if profile is not None:
+            CALLER_PROFILES.move_to_end(client.phone)
+    if profile is None:
+        return warm_caller_profile(db, client, exclude_order_id)
+    return _without_order(profile, exclude_order_id)
+
+
+def invalidate_caller_profile(db: Session, order_id: int):
+    """
+    Usuwa z cache profil klienta, do którego należy zamówienie - wołane po zapisaniu
+    jego pozycji, żeby kolejne "to samo co ostatnio" widziało aktualną historię.
+    """
+    if not CALLER_PROFILES:
+        return
+    phone = db.execute(
+        select(Client.phone).join(Order, Order.client_id == Client.id).where(Order.id == order_id)
+    ).scalar()
+    with _profiles_lock:
+        CALLER_PROFILES.pop(phone, None)
+
+
+def reorder_previous_order(db: Session, source_order_id: int, target_order_id: int) -> List[int]:
+    """
+    Kopiuje kompletne pozycje zamówienia source do target razem z dodatkami.
+    Każda tabela to jeden INSERT ... SELECT; nowe wiersze dodatków wiążemy ze starymi
+    po pozycji (row_number po id), więc nie ma pętli po pozycjach w Pythonie.
+    Zwraca ID nowych wierszy order_pizzas w tej samej kolejności co w źródle.
+    """
+    last_id_before = db.execute(
+        select(func.coalesce(func.max(OrderPizzas.id), 0)).where(OrderPizzas.order_id == target_order_id)
+    ).scalar()
+    source_filter = (OrderPizzas.order_id == source_order_id,
+                     OrderPizzas.pizza_id.isnot(None),
+                     OrderPizzas.dough_id.isnot(None))
+
+    db.execute(insert(OrderPizzas).from_select(
+        ["order_id", "pizza_id", "dough_id", "quantity", "is_partial"],
+        select(literal(target_order_id), OrderPizzas.pizza_id, OrderPizzas.dough_id,
+               OrderPizzas.quantity, false())
+        .where(*source_filter)
+        .order_by(OrderPizzas.id)
+    ))
+
+    old_items = (select(OrderPizzas.id.label("old_id"),
+                        func.row_number().over(order_by=OrderPizzas.id).label("position"))
+                 .where(*source_filter).subquery())
+    new_items = (select(OrderPizzas.id.label("new_id"),
+                        func.row_number().over(order_by=OrderPizzas.id).label("position"))
+                 .where(OrderPizzas.order_id == target_order_id, OrderPizzas.id > last_id_before)
+                 .subquery())
+    db.execute(insert(AdditionalIngredient).from_select(
+        ["order_pizza_id", "ingredient_id", "quantity"],
+        select(new_items.c.new_id, AdditionalIngredient.ingredient_id, AdditionalIngredient.quantity)
+        .select_from(AdditionalIngredient)
+        .join(old_items, old_items.c.old_id == AdditionalIngredient.order_pizza_id)
+        .join(new_items, new_items.c.position == old_items.c.position)
+    ))
+
+    new_ids = db.execute(
+        select(OrderPizzas.id)
+        .where(OrderPizzas.order_id == target_order_id, OrderPizzas.id > last_id_before)
+        .order_by(OrderPizzas.id)
+    ).scalars().all()
+    db.commit()
+    log.info("Reordered %s items from order %s into order %s", len(new_ids), source_order_id, target_order_id)
+    return new_ids
+
+
+def reorder_last_order(db: Session, order: Order) -> Optional[List[dict]]:
+    """
+    Powtarza ostatnie zamówienie klienta w ramach `order`.
+    Zwraca gotowe sloty z ustawionym db_id albo None, jeśli klient nie ma historii.
+    """
+    profile = get_caller_profile(db, order.client, exclude_order_id=order.id)
+    if not profile["recent_orders"]:
+        return None
+    last_order = profile["recent_orders"][0]
+    db_ids = reorder_previous_order(db, last_order["order_id"], order.id)
+    slots = copy.deepcopy(last_order["slots"])
+    for slot, db_id in zip(slots, db_ids):
+        slot["db_id"] = db_id
+    return slots
@@ -0,0 +1,151 @@
+# path/filename: utils/catalog.py
+"""
+Katalog menu (nazwy pizz i składników, skład pizz, dozwolone ciasta) współdzielony
+przez wszystkie żądania.
+
+Dawniej każdy PizzaParser czytał z bazy całe tabele pizzas i ingredients.
+Teraz katalog wczytujemy raz i odświeżamy co CATALOG_TTL_SECONDS; `version`
+to skrót zawartości, więc zmienia się tylko wtedy, gdy zmieni się menu.
+
+Struktury pochodne (tablica lematów, indeksy nazw itp.) trzymamy w samym
+obiekcie katalogu przez get_index(), więc nowa wersja menu = nowe indeksy.
+"""
+import hashlib
+import os
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.models import Dough, Ingredient, Pizza, pizza_doughs, pizza_ingredients
+from app.utils import tracing
+from app.utils.logger import get_logger
+
+
+log = get_logger(__name__)
+
+CATALOG_TTL_SECONDS = float(os.getenv("CATALOG_TTL_SECONDS", "300"))
+
+
+class MenuCatalog:
+    def __init__(self, pizzas: List[Tuple[int, str]], ingredients: List[Tuple[int, str]],
+                 pizza_ingredients: Optional[Dict[int, List[int]]] = None,
+                 menu_pizza_ids: Optional[Set[int]] = None,
+                 doughs: Optional[List[Tuple[int, Optional[bool], Optional[bool]]]] = None,
+                 pizza_doughs: Optional[Dict[int, List[int]]] = None):
+        self.pizzas = pizzas
+        self.ingredients = ingredients
+        self.pizza_ingredients = pizza_ingredients or {}
+        # pizze z in_menu = true; domyślnie wszystkie (np. katalog budowany w testach)
+        self.menu_pizza_ids = menu_pizza_ids if menu_pizza_ids is not None else {pizza_id for pizza_id, _ in pizzas}
+        self.doughs = doughs or []  # (id, big_size, on_thick_pastry)
+        self.pizza_doughs = pizza_doughs or {}
+        self.pizza_names = [name.lower() for _, name in pizzas]
+        self.ingredient_names = [name.lower() for _, name in ingredients]
+        self.version = hashlib.sha1(
+            repr((pizzas, ingredients, sorted(self.pizza_ingredients.items()), sorted(self.menu_pizza_ids),
+                  self.doughs, sorted(self.pizza_doughs.items()))).encode()
+        ).hexdigest()[:12]
+        self.loaded_at = time.monotonic()
+        self._indexes = {}
+        self._indexes_lock = threading.RLock()  # indeks może budować się z innych indeksów
+
+    def get_index(self, name: str, build: Callable[["MenuCatalog"], object]):
+        """Zwraca strukturę pochodną `name`, budując ją raz dla tej wersji katalogu."""
+        index = self._indexes.get(name)
+        if index is None:
+            with self._indexes_lock:
+                index = self._indexes.get(name)
+                if index is None:
+                    started = time.perf_counter()
+                    index = build(self)
+                    self._indexes[name] = index
+                    log.info("Catalog %s: built %s in %.1f ms", self.version, name,
+                             (time.perf_counter() - started) * 1000)
+        return index
+
+
+def load_catalog(db: Session) -> MenuCatalog:
+    pizza_rows = db.query(Pizza.id, Pizza.name, Pizza.in_menu).order_by(Pizza.id).all()
+    pizzas = [(p.id, p.name) for p in pizza_rows]
+    menu_pizza_ids = {p.id for p in pizza_rows if p.in_menu is not False}
+    ingredients = [(i.id, i.name) for i in db.query(Ingredient.id, Ingredient.name).order_by(Ingredient.id)]
+    doughs = [(d.id, d.big_size, d.on_thick_pastry)
+              for d in db.query(Dough.id, Dough.big_size, Dough.on_thick_pastry).order_by(Dough.id)]
+    return MenuCatalog(pizzas, ingredients, _load_pairs(db, pizza_ingredients), menu_pizza_ids,
+                       doughs, _load_pairs(db, pizza_doughs))
+
+
+def _load_pairs(db: Session, table) -> Dict[int, List[int]]:
+    """Tabela asocjacyjna (pizza_id, X_id) jako {pizza_id: [X_id, ...]}."""
+    pizza_column, other_column = table.c
+    pairs: Dict[int, List[int]] = {}
+    for pizza_id, other_id in db.execute(select(pizza_column, other_column).order_by(pizza_column, other_column)):
+        pairs.setdefault(pizza_id, []).append(other_id)
+    return pairs
+
+
+_catalog: Optional[MenuCatalog] = None
+_catalog_lock = threading.Lock()  # tylko na podmianę wskaźnika - zapytania idą poza blokadą
+_refresh_started = 0.0
+CATALOG_REFRESH_TIMEOUT_SECONDS = 30.0  # po tym czasie nieudane odświeżenie przejmuje kolejny wołający
+
+
+def current_catalog() -> Optional[MenuCatalog]:
+    """
+    Bieżący katalog bez zapytań do bazy. None oznacza, że wołający ma go wczytać
+    (load_catalog) i oddać do publish_catalog(); kiedy odświeżenie już trwa,
+    pozostali dostają dotychczasowy katalog zamiast czekać.
+    Podział pozwala endpointom async wczytać wiersze przez run_sync, a indeksy
+    budować w puli wątków - nic tu nie blokuje pętli zdarzeń.
+    """
+    global _refresh_started
+    catalog = _catalog
+    if catalog is not None and time.monotonic() - catalog.loaded_at < CATALOG_TTL_SECONDS:
+        return catalog
+    with _catalog_lock:
+        now = time.monotonic()
+        if _catalog is not None and now - _refresh_started < CATALOG_REFRESH_TIMEOUT_SECONDS:
+            return _catalog
+        _refresh_started = now
+    return None
+
+
+def publish_catalog(fresh: MenuCatalog) -> MenuCatalog:
+    """
+    Ustawia wczytany katalog jako bieżący. Jeżeli zawartość się nie zmieniła,
+    zostaje stary obiekt (razem z policzonymi indeksami); katalog wczytany wcześniej
+    niż bieżący nie nadpisuje go.
+    """
+    global _catalog, _refresh_started
+    with _catalog_lock:
+        _refresh_started = 0.0
+        catalog = _catalog
+        if catalog is not None and catalog.version == fresh.version:
+            catalog.loaded_at = max(catalog.loaded_at, fresh.loaded_at)
+            return catalog
+        if catalog is not None and catalog.loaded_at > fresh.loaded_at:
+            return catalog
+        _catalog = fresh
+    log.info("Menu catalog loaded, version %s (%s pizzas, %s ingredients)",
+             fresh.version, len(fresh.pizzas), len(fresh.ingredients))
+    return fresh
+
+
+def get_catalog(db: Session) -> MenuCatalog:
+    """Zwraca bieżący katalog, wczytując go ponownie po upływie TTL."""
+    catalog = current_catalog()
+    if catalog is not None:
+        return catalog
+    with tracing.span("catalog.load"):
+        fresh = load_catalog(db)
+    return publish_catalog(fresh)
+
+
+def invalidate_catalog():
+    """Wymusza ponowne wczytanie katalogu przy następnym żądaniu (np. po edycji menu)."""
+    global _catalog
+    with _catalog_lock:
+        _catalog = None
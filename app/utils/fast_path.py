@@ -0,0 +1,107 @@
+# path/filename: utils/fast_path.py
+"""
+Szybka ścieżka dla krótkich wypowiedzi ("duża", "na grubym", "cienka proszę").
+
+Zamiast uruchamiać cały potok spaCy tokenizujemy tekst wyrażeniem regularnym
+i bierzemy lematy z tablicy policzonej wcześniej (raz na wersję katalogu) dla
+słów z leksykonów parsera i nazw z menu. Jeżeli choć jeden token nie jest
+w tablicy, zwracamy None i wołający używa pełnego potoku.
+"""
+import os
+import re
+import threading
+import time
+from typing import Dict, Iterable, List, Optional
+
+from spacy.lang.pl.lex_attrs import like_num
+
+
+FAST_PATH_MAX_TOKENS = int(os.getenv("FAST_PATH_MAX_TOKENS", "3"))
+
+_TOKEN_RE = re.compile(r"\w+|[.,!?;:]")
+_PUNCTUATION = set(".,!?;:")
+
+FAST_PATH_STATS = {
+    "fast": {"count": 0, "time": 0.0},
+    "full": {"count": 0, "time": 0.0},
+}
+_stats_lock = threading.Lock()
+
+
+class LexToken:
+    """Minimalny zamiennik spacy.tokens.Token - tylko atrybuty, które czyta parser."""
+    __slots__ = ("text", "lemma_", "like_num")
+
+    def __init__(self, text: str, lemma: str):
+        self.text = text
+        self.lemma_ = lemma
+        self.like_num = like_num(text)
+
+    def __str__(self):
+        return self.text
+
+    __repr__ = __str__
+
+
+class LemmaTable:
+    def __init__(self, lemmas: Dict[str, str]):
+        self.lemmas = lemmas
+
+    @classmethod
+    def build(cls, nlp, words: Iterable[str]) -> "LemmaTable":
+        """Lematyzuje każde słowo osobno; słowa, które spaCy dzieli na kilka tokenów, pomijamy."""
+        words = sorted({word.lower() for word in words if word})
+        lemmas = {}
+        for word, doc in zip(words, nlp.pipe(words)):
+            if len(doc) == 1:
+                lemmas[word] = doc[0].lemma_
+        return cls(lemmas)
+
+    def lemma(self, word: str) -> Optional[str]:
+        if word in _PUNCTUATION or word.isdigit():
+            return word
+        return self.lemmas.get(word)
+
+    def tokenize(self, text: str) -> Optional[List[LexToken]]:
+        """Tokeny dla krótkiej wypowiedzi albo None, jeśli trzeba użyć pełnego potoku."""
+        words = _TOKEN_RE.findall(text)
+        if not words or sum(word not in _PUNCTUATION for word in words) > FAST_PATH_MAX_TOKENS:
+            return None
+        if "".join(words) != "".join(text.split()):
+            return None  # znaki, których regex nie rozumie - tokenizacja mogłaby się różnić od spaCy
+        tokens = []
+        for word in words:
+            lemma = self.lemma(word)
+            if lemma is None:
+                return None
+            tokens.append(LexToken(word, lemma))
+        return tokens
+
+
+def record(path: str, elapsed: float):
+    with _stats_lock:
+        FAST_PATH_STATS[path]["count"] += 1
+        FAST_PATH_STATS[path]["time"] += elapsed
+
+
+def get_fast_path_stats() -> dict:
+    with _stats_lock:
+        fast, full = dict(FAST_PATH_STATS["fast"]), dict(FAST_PATH_STATS["full"])
+    total = fast["count"] + full["count"]
+    return {
+        "hit_rate": fast["count"] / total if total else 0.0,
+        "fast": {**fast, "avg_ms": fast["time"] / fast["count"] * 1000 if fast["count"] else 0.0},
+        "full": {**full, "avg_ms": full["time"] / full["count"] * 1000 if full["count"] else 0.0},
+    }
+
+
+def tokenize(nlp, lemma_table: LemmaTable, text: str) -> list:
+    """Szybka ścieżka, a gdy się nie da - pełny potok spaCy. Mierzy obie."""
+    started = time.perf_counter()
+    tokens = lemma_table.tokenize(text)
+    if tokens is not None:
+        record("fast", time.perf_counter() - started)
+        return tokens
+    tokens = list(nlp(text))
+    record("full", time.perf_counter() - started)
+    return tokens
@@ -0,0 +1,181 @@
+# path/filename: utils/inflection.py
+"""
+Odmiana nazw z menu i indeks form -> id pozycji katalogu.
+
+Klient mówi "z pieczarkami", "poproszę Margheritę", "bez oliwek", a w bazie
+mamy "Pieczarki", "Margherita", "Oliwki". Zamiast za każdym razem liczyć
+fuzz.ratio po całym menu, raz na wersję katalogu generujemy formy odmiany
+(prostymi regułami dla polskich końcówek), przepuszczamy je przez lematyzator
+i zapisujemy w słowniku. Drugi słownik, po kluczach fonetycznych (utils/phonetic.py),
+łapie typowe przekręcenia ASR; fuzzy zostaje tylko dla reszty.
+"""
+import threading
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from app.utils.phonetic import phonetic_key
+
+
+# Miękczenie tematu przed -e w celowniku/miejscowniku (margherita -> margericie).
+_SOFTENED = {
+    "t": "cie", "d": "dzie", "r": "rze", "n": "nie", "s": "sie", "z": "zie",
+    "ł": "le", "w": "wie", "m": "mie", "p": "pie", "b": "bie", "f": "fie",
+    "k": "ce", "g": "dze", "ch": "sze", "st": "ście", "sł": "śle",
+}
+_HARD_TO_Y = ("cz", "rz", "sz", "dz", "c", "ż")
+_INDECLINABLE_ENDINGS = ("o", "e", "u", "i", "ó")
+
+FORM_INDEX_STATS = {"exact": 0, "phonetic": 0, "fuzzy": 0}
+_stats_lock = threading.Lock()
+
+
+def _soften(stem: str) -> Optional[str]:
+    for hard in sorted(_SOFTENED, key=len, reverse=True):
+        if stem.endswith(hard):
+            return stem[:-len(hard)] + _SOFTENED[hard]
+    return None
+
+
+def _feminine_noun(word: str) -> Set[str]:
+    """pieczarka, margherita, kukurydza, bazylia, mozzarella"""
+    stem = word[:-1]
+    if stem.endswith("i"):  # bazylia
+        return {stem + "i", stem + "ę", stem + "ą", stem + "om", stem + "ami", stem + "ach"}
+    forms = {stem + "ę", stem + "ą", stem + "om", stem + "ami", stem + "ach"}
+    forms.add(stem + ("i" if stem.endswith(("k", "g", "l", "j")) else "y"))
+    if not stem.endswith(("l", "j") + _HARD_TO_Y):
+        softened = _soften(stem)
+        if softened:
+            forms.add(softened)
+    if stem.endswith("k") and len(stem) > 2 and stem[-2] not in "aeiouyąęó":
+        forms.add(stem[:-1] + "ek")  # pieczarek, oliwek
+    return forms
+
+
+def _feminine_adjective(word: str) -> Set[str]:
+    """hawajska, wegetariańska"""
+    stem = word[:-1]
+    return {stem + "iej", stem + "ą", stem + "ie", stem + "ich", stem + "im", stem + "imi", stem + "i"}
+
+
+def _masculine_noun(word: str) -> Set[str]:
+    """kurczak, parmezan, ananas"""
+    forms = {word + "a", word + "u", word + "owi", word + "ów", word + "om", word + "ami", word + "ach"}
+    if word.endswith(("k", "g")):
+        forms.update({word + "iem", word + "i"})
+    else:
+        forms.update({word + "em", word + "y"})
+    softened = _soften(word)
+    if softened:
+        forms.add(softened)
+    return forms
+
+
+def inflect(word: str) -> Set[str]:
+    """
+    Przybliżone formy odmiany jednego słowa (małymi literami), razem z samym słowem.
+    Reguły są celowo zachłanne - forma, która w języku nie istnieje, po prostu nigdy
+    nie padnie, a kolizje między pozycjami menu usuwa build_form_index().
+    """
+    forms = {word}
+    if len(word) < 3 or not word.isalpha():
+        return forms
+    if word.endswith(("ska", "cka")):
+        forms |= _feminine_adjective(word)
+    elif word.endswith("a"):
+        forms |= _feminine_noun(word)
+    elif word.endswith(("ki", "gi")) or (word.endswith("y") and not word.endswith("wy")):
+        # liczba mnoga (pieczarki, oliwki, pomidory) - odmieniamy jak od pojedynczej
+        singular = word[:-1] + "a"
+        forms |= {singular} | _feminine_noun(singular)
+    elif not word.endswith(_INDECLINABLE_ENDINGS):
+        forms |= _masculine_noun(word)
+    return forms
+
+
+def inflect_name(name: str) -> Set[str]:
+    """Formy wielowyrazowej nazwy: odmieniamy każde słowo, reszta zostaje w mianowniku."""
+    words = name.split()
+    forms = {name}
+    for i, word in enumerate(words):
+        for form in inflect(word):
+            forms.add(" ".join(words[:i] + [form] + words[i + 1:]))
+    return forms
+
+
+class FormIndex(list):
+    """
+    Lista nazw (jak dotychczas przekazywana do fuzzy_match_pizza / fuzzy_find_ingredient)
+    wzbogacona o słowniki forma -> id i klucz fonetyczny -> id, dzięki którym dokładne
+    trafienie (także typowo przekręcone przez ASR) to jeden lookup.
+    """
+
+    def __init__(self, names: Iterable[str], forms: Dict[str, int], names_by_id: Dict[int, str],
+                 phonetic: Optional[Dict[str, int]] = None):
+        super().__init__(names)
+        self.forms = forms
+        self.names_by_id = names_by_id
+        self.phonetic = phonetic or {}
+
+    def lookup(self, form: str) -> Optional[str]:
+        item_id = self.forms.get(form.lower())
+        return self.names_by_id[item_id] if item_id is not None else None
+
+    def lookup_phonetic(self, form: str) -> Optional[str]:
+        item_id = self.phonetic.get(phonetic_key(form))
+        return self.names_by_id[item_id] if item_id is not None else None
+
+
+def build_form_index(items: List[Tuple[int, str]], nlp=None) -> FormIndex:
+    """
+    Formy odmiany i lematy dla pozycji katalogu (id, nazwa). Nazwy z bazy zawsze
+    wskazują na swoją pozycję; forma wygenerowana dla dwóch różnych pozycji jest
+    niejednoznaczna i trafia z powrotem do fuzzy. To samo dotyczy kluczy fonetycznych.
+    """
+    names_by_id = {item_id: name.lower() for item_id, name in items}
+    candidates: Dict[str, Set[int]] = {}
+    for item_id, name in names_by_id.items():
+        for form in inflect_name(name):
+            candidates.setdefault(form, set()).add(item_id)
+
+    if nlp is not None:
+        forms = sorted(candidates)
+        for form, doc in zip(forms, nlp.pipe(forms)):
+            lemma = " ".join(t.lemma_.lower() for t in doc if t.lemma_)
+            if lemma and len(doc) == len(form.split()):
+                candidates.setdefault(lemma, set()).update(candidates[form])
+
+    forms: Dict[str, int] = {}
+    for form, ids in candidates.items():
+        if len(ids) == 1:
+            forms[form] = next(iter(ids))
+    for item_id, name in names_by_id.items():
+        forms[name] = item_id
+
+    phonetic_candidates: Dict[str, Set[int]] = {}
+    for form, ids in candidates.items():
+        phonetic_candidates.setdefault(phonetic_key(form), set()).update(ids)
+    phonetic = {key: next(iter(ids)) for key, ids in phonetic_candidates.items() if len(ids) == 1}
+    return FormIndex(names_by_id.values(), forms, names_by_id, phonetic)
+
+
+def lookup(names: List[str], form: str) -> Optional[str]:
+    """
+    Trafienie w indeksie form, a potem w indeksie fonetycznym (jeśli `names` je ma).
+    None oznacza, że wołający musi policzyć fuzzy.
+    """
+    if not isinstance(names, FormIndex):
+        return None
+    name, kind = names.lookup(form), "exact"
+    if name is None:
+        name, kind = names.lookup_phonetic(form), "phonetic"
+    with _stats_lock:
+        FORM_INDEX_STATS[kind if name is not None else "fuzzy"] += 1
+    return name
+
+
+def get_form_index_stats() -> dict:
+    with _stats_lock:
+        stats = dict(FORM_INDEX_STATS)
+    total = stats["exact"] + stats["phonetic"] + stats["fuzzy"]
+    stats["indexed_rate"] = (stats["exact"] + stats["phonetic"]) / total if total else 0.0
+    return stats
@@ -1,8 +1,162 @@
+# path/filename: utils/logger.py
+"""
+Konfiguracja logowania aplikacji.
+
+Wątek obsługujący żądanie tylko wrzuca rekord do ograniczonej kolejki
+(QueueHandler); formatowanie i zapis na stderr robi wątek QueueListener.
+Gdy kolejka jest pełna, rekord przepada i zwiększa licznik "dropped" -
+wolny terminal czy kolektor logów nie może spowalniać rozmów.
+
+Do każdego rekordu dokładamy request_id i conversation_id z ContextVar
+(ustawiane przez middleware i endpointy rozmów).
+
+Zmienne środowiskowe:
+  LOG_FORMAT       json (domyślnie) albo text,
+  LOG_LEVEL        poziom logowania root (INFO),
+  LOG_LEVELS       poziomy per moduł, np. "app.routers.analyze_order=DEBUG,sqlalchemy.engine=WARNING",
+  LOG_QUEUE_SIZE   pojemność kolejki (10000).
+"""
+import atexit
+import json
 import logging
+import os
+import queue
+import sys
+import threading
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Optional
+
+
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json").lower()
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_LEVELS = os.getenv("LOG_LEVELS", "")
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+
+request_id_var: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+conversation_id_var: ContextVar[Optional[str]] = ContextVar("conversation_id", default=None)
+
+LOG_STATS = {"enqueued": 0, "dropped": 0}
+_stats_lock = threading.Lock()
+
+# atrybuty, które ma każdy LogRecord - wszystko inne przyszło przez extra=
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+_TEXT_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+
+
+class JsonFormatter(logging.Formatter):
+    """Jeden obiekt JSON na linię; pola z extra= trafiają do rekordu bez zmian."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        data = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES and value is not None:
+                data[key] = value
+        if record.exc_text:
+            data["exception"] = record.exc_text
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+
+class _ContextFilter(logging.Filter):
+    """Kopiuje id z ContextVar do rekordu jeszcze w wątku żądania (listener ma własny kontekst)."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = request_id_var.get()
+        record.conversation_id = conversation_id_var.get()
+        return True
+
+
+class _BoundedQueueHandler(QueueHandler):
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            with _stats_lock:
+                LOG_STATS["dropped"] += 1
+            return
+        with _stats_lock:
+            LOG_STATS["enqueued"] += 1
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        """
+        Scala argumenty z treścią i zamienia wyjątek na tekst, ale - w odróżnieniu
+        od QueueHandler.prepare - nie formatuje całej linii, żeby JSON powstał dopiero w listenerze.
+        """
+        record = logging.makeLogRecord(vars(record))
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        record.stack_info = None
+        return record
+
+
+def _parse_levels(spec: str) -> Dict[str, str]:
+    levels = {}
+    for item in spec.split(","):
+        name, _, level = item.strip().partition("=")
+        if name and level:
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+_listener: Optional[QueueListener] = None
+
+
+def setup_logging():
+    """Podpina kolejkę pod root logger; kolejne wywołania nic nie robią."""
+    global _listener
+    if _listener is not None:
+        return
+    output = logging.StreamHandler(sys.stderr)
+    output.setFormatter(JsonFormatter() if LOG_FORMAT == "json" else logging.Formatter(_TEXT_FORMAT))
+    handler = _BoundedQueueHandler(queue.Queue(maxsize=LOG_QUEUE_SIZE))
+    handler.addFilter(_ContextFilter())
+    root = logging.getLogger()
+    root.handlers = [handler]
+    root.setLevel(LOG_LEVEL)
+    for name, level in _parse_levels(LOG_LEVELS).items():
+        logging.getLogger(name).setLevel(level)
+    _listener = QueueListener(handler.queue, output, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)  # dopisuje to, co zostało w kolejce
+    os.register_at_fork(after_in_child=_restart_after_fork)
+
+
+def _restart_after_fork():
+    """
+    Proces potomny (worker gunicorna po forku z mastera) nie ma wątku listenera, a zamek
+    odziedziczonej kolejki mógł być zajęty w chwili forka - zakładamy nową kolejkę i wątek.
+    """
+    global _listener, _stats_lock
+    if _listener is None:
+        return
+    _stats_lock = threading.Lock()
+    atexit.unregister(_listener.stop)
+    handler = next(h for h in logging.getLogger().handlers if isinstance(h, _BoundedQueueHandler))
+    handler.queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+    _listener = QueueListener(handler.queue, *_listener.handlers, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)
+
+
+def get_log_stats() -> dict:
+    with _stats_lock:
+        stats = dict(LOG_STATS)
+    stats["queued"] = _listener.queue.qsize() if _listener is not None else 0
+    stats["queue_size"] = LOG_QUEUE_SIZE
+    return stats
 
-console_handler = logging.StreamHandler()
-console_handler.setFormatter(logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s"))
-logging.basicConfig(level=logging.INFO, handlers=[console_handler])
 
 def get_logger(name: str):
-	return logging.getLogger(name)
+    return logging.getLogger(name)
+
+
+setup_logging()
@@ -0,0 +1,122 @@
+# path/filename: utils/menu_bitsets.py
+"""
+Bitmapy nad katalogiem menu: bit i odpowiada i-tej pizzy z catalog.pizzas
+(albo j-temu ciastu z catalog.doughs w macierzy zgodności ciast).
+
+Zbiory trzymamy jako zwykłe inty Pythona (dowolnej długości), więc
+przecięcie "pizze z szynką" & "pizze z pieczarkami" to jedna operacja &,
+niezależnie od tego, czy menu ma pięć pozycji, czy kilkaset.
+"""
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+def _bits(mask: int) -> Iterable[int]:
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+class IngredientIndex:
+    """Indeks odwrotny składnik -> bitmapa pizz, które mają go w bazowym przepisie."""
+
+    def __init__(self, pizza_names: List[str], recipe_sizes: List[int],
+                 masks: Dict[str, int], menu_mask: int):
+        self.pizza_names = pizza_names
+        self.recipe_sizes = recipe_sizes
+        self.masks = masks
+        self.menu_mask = menu_mask
+
+    @classmethod
+    def build(cls, catalog) -> "IngredientIndex":
+        positions = {pizza_id: bit for bit, (pizza_id, _) in enumerate(catalog.pizzas)}
+        ingredient_names = {ingredient_id: name.lower() for ingredient_id, name in catalog.ingredients}
+        masks: Dict[str, int] = {}
+        recipe_sizes = [0] * len(catalog.pizzas)
+        for pizza_id, ingredient_ids in catalog.pizza_ingredients.items():
+            bit = positions.get(pizza_id)
+            if bit is None:
+                continue
+            recipe_sizes[bit] = len(ingredient_ids)
+            for ingredient_id in ingredient_ids:
+                name = ingredient_names.get(ingredient_id)
+                if name is not None:
+                    masks[name] = masks.get(name, 0) | (1 << bit)
+        menu_mask = 0
+        for pizza_id in catalog.menu_pizza_ids:
+            if pizza_id in positions:
+                menu_mask |= 1 << positions[pizza_id]
+        return cls([name.lower() for _, name in catalog.pizzas], recipe_sizes, masks, menu_mask)
+
+    def pizzas_with(self, ingredient_names: Iterable[str]) -> List[Tuple[str, float]]:
+        """
+        Pizze z menu, których przepis zawiera wszystkie podane składniki, razem z pokryciem
+        (ile składników przepisu klient wymienił). Najlepiej pokryte pierwsze.
+        """
+        mask = self.menu_mask
+        named = 0
+        for name in set(ingredient_names):
+            mask &= self.masks.get(name, 0)
+            named += 1
+            if not mask:
+                return []
+        if not named:
+            return []
+        found = [(self.pizza_names[bit], named / self.recipe_sizes[bit]) for bit in _bits(mask)]
+        return sorted(found, key=lambda item: -item[1])
+
+
+class DoughCompatibility:
+    """
+    Macierz zgodności pizza x ciasto: jeden wiersz (bitmapa ciast, bit j = j-te ciasto
+    z catalog.doughs) na pizzę. Pizza bez wpisów w pizza_doughs nie ma ograniczeń.
+    """
+
+    def __init__(self, doughs: List[Tuple[int, Optional[bool], Optional[bool]]],
+                 rows: Dict[str, int], attribute_masks: Dict[Tuple[Optional[bool], Optional[bool]], int]):
+        self.doughs = doughs
+        self.rows = rows
+        self.attribute_masks = attribute_masks
+
+    @classmethod
+    def build(cls, catalog) -> "DoughCompatibility":
+        positions = {dough_id: bit for bit, (dough_id, _, _) in enumerate(catalog.doughs)}
+        # maski ciast o danych atrybutach; None = atrybut jeszcze nieznany (pasuje każde ciasto)
+        attribute_masks = {}
+        for big_size in (True, False, None):
+            for on_thick_pastry in (True, False, None):
+                mask = 0
+                for bit, (_, dough_big, dough_thick) in enumerate(catalog.doughs):
+                    if big_size in (None, dough_big) and on_thick_pastry in (None, dough_thick):
+                        mask |= 1 << bit
+                attribute_masks[(big_size, on_thick_pastry)] = mask
+        pizza_names = {pizza_id: name.lower() for pizza_id, name in catalog.pizzas}
+        rows = {}
+        for pizza_id, dough_ids in catalog.pizza_doughs.items():
+            if pizza_id not in pizza_names:
+                continue
+            row = 0
+            for dough_id in dough_ids:
+                if dough_id in positions:
+                    row |= 1 << positions[dough_id]
+            rows[pizza_names[pizza_id]] = row
+        return cls(catalog.doughs, rows, attribute_masks)
+
+    def allowed(self, pizza: str, big_size: Optional[bool], on_thick_pastry: Optional[bool]) -> bool:
+        row = self.rows.get(pizza)
+        if row is None:
+            return True
+        return bool(row & self.attribute_masks.get((big_size, on_thick_pastry), 0))
+
+    def alternative(self, pizza: str, big_size: Optional[bool],
+                    on_thick_pastry: Optional[bool]) -> Optional[dict]:
+        """Dozwolone ciasto najbliższe wybranemu: najpierw ten sam rozmiar, potem ta sama grubość."""
+        row = self.rows.get(pizza)
+        if not row:
+            return None
+        for key in ((big_size, None), (None, on_thick_pastry), (None, None)):
+            mask = row & self.attribute_masks.get(key, 0)
+            if mask:
+                _, dough_big, dough_thick = self.doughs[next(iter(_bits(mask)))]
+                return {"big_size": dough_big, "on_thick_pastry": dough_thick}
+        return None
@@ -0,0 +1,166 @@
+# path/filename: utils/metrics.py
+"""
+Rejestr metryk w formacie tekstowym Prometheusa (bez prometheus_client).
+
+Dwa rodzaje źródeł:
+  - Counter / Histogram aktualizowane w locie (latencja tras, etapy parsera,
+    czas w bazie) - jedno bisect + dodawanie pod lockiem, więc można je
+    zostawić włączone na produkcji,
+  - kolektory: funkcje wołane dopiero przy scrape'ie, które zamieniają istniejące
+    statystyki (parse_cache, fast_path, pula połączeń, kolejka logów, liczba
+    rozmów w pamięci) na próbki - nic nie kosztują między odczytami.
+
+Liczniki są per proces; przy kilku workerach Prometheus scrape'uje każdy osobno.
+"""
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Tuple
+
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+STAGE_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25)
+
+# (nazwa, typ, opis, [(etykiety, wartość)])
+Family = Tuple[str, str, str, List[Tuple[Dict[str, str], float]]]
+
+_metrics: List["_Metric"] = []
+_collectors: List[Callable[[], Iterable[Family]]] = []
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + "}"
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._lock = threading.Lock()
+        _metrics.append(self)
+
+    def _label_dict(self, values: tuple) -> Dict[str, str]:
+        return dict(zip(self.labelnames, values))
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[tuple, float] = {}
+
+    def inc(self, *labels, amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def samples(self) -> Iterable[str]:
+        with self._lock:
+            values = dict(self._values)
+        for labels, value in values.items():
+            yield f"{self.name}{_labels(self._label_dict(labels))} {_number(value)}"
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+        self._series: Dict[tuple, list] = {}  # etykiety -> [liczniki kubełków..., +Inf, suma]
+
+    def observe(self, value: float, *labels):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[index] += 1
+            series[-1] += value
+
+    @contextmanager
+    def time(self, *labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, *labels)
+
+    def snapshot(self) -> Dict[tuple, Tuple[int, float]]:
+        """(liczba obserwacji, suma) per etykiety - np. do różnicy przed/po przebiegu benchmarku."""
+        with self._lock:
+            return {labels: (sum(values[:-1]), values[-1]) for labels, values in self._series.items()}
+
+    def samples(self) -> Iterable[str]:
+        with self._lock:
+            series = {labels: list(values) for labels, values in self._series.items()}
+        for labels, values in series.items():
+            label_dict = self._label_dict(labels)
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), values[:-1]):
+                cumulative += count
+                yield f"{self.name}_bucket{_labels({**label_dict, 'le': _number(bound)})} {cumulative}"
+            yield f"{self.name}_sum{_labels(label_dict)} {_number(values[-1])}"
+            yield f"{self.name}_count{_labels(label_dict)} {cumulative}"
+
+
+def route_label(scope: dict) -> str:
+    """
+    Szablon trasy z prefiksem routera ("/orders/summary/{order_id}"). scope["route"].path
+    nie zawiera prefiksu dołączonego routera, więc odtwarzamy go z faktycznej ścieżki.
+    Nieznane ścieżki zbieramy pod jedną etykietą, żeby skanery nie mnożyły serii.
+    """
+    route = scope.get("route")
+    if route is None:
+        return "unmatched"
+    path = scope["path"]
+    start = 0
+    while start != -1:
+        if route.path_regex.match(path[start:]):
+            return path[:start] + route.path
+        start = path.find("/", start + 1)
+    return route.path
+
+
+def register_collector(collector: Callable[[], Iterable[Family]]):
+    """Funkcja wołana przy każdym odczycie /metrics, zwraca rodziny próbek."""
+    _collectors.append(collector)
+
+
+def render() -> str:
+    lines = []
+    for metric in _metrics:
+        lines.append(f"# HELP {metric.name} {metric.documentation}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        lines.extend(metric.samples())
+    for collector in _collectors:
+        for name, kind, documentation, samples in collector():
+            lines.append(f"# HELP {name} {documentation}")
+            lines.append(f"# TYPE {name} {kind}")
+            lines.extend(f"{name}{_labels(labels)} {_number(value)}" for labels, value in samples)
+    return "\n".join(lines) + "\n"
+
+
+REQUEST_LATENCY = Histogram("pizza_http_request_duration_seconds", "Czas obsługi żądania HTTP per trasa.",
+                            ("route", "method"))
+REQUESTS = Counter("pizza_http_requests_total", "Liczba żądań HTTP per trasa i status.", ("route", "method", "status"))
+REQUEST_DB_TIME = Histogram("pizza_http_request_db_seconds", "Łączny czas zapytań SQL w jednym żądaniu.", ("route",))
+PARSE_STAGE = Histogram("pizza_parse_stage_seconds", "Czas etapów parsera zamówień.", ("stage",),
+                        buckets=STAGE_BUCKETS)
@@ -0,0 +1,75 @@
+# path/filename: utils/nlp.py
+"""
+Leniwe ładowanie modelu spaCy i profile potoku.
+
+Model ładuje się przy pierwszym użyciu (w praktyce w rozgrzewce przy starcie
+aplikacji), a nie przy imporcie modułu - import app.main i testy, które nie
+parsują tekstu, nie płacą kosztu wczytania modelu.
+
+Parser czyta z tokenów tylko text, lemma_ i like_num, więc domyślny profil
+wycina z pl_core_news_md parser zależności i NER. Lematyzator potrzebuje
+tagów (morphologizer, tagger, attribute_ruler) - tych nie ruszamy.
+Profil "lemmatize" zostawia wektory słów - potrzebują ich podpowiedzi
+semantyczne (utils/semantic.py), które bez wektorów się wyłączają.
+"""
+import os
+import threading
+
+from app.utils.logger import get_logger
+
+
+log = get_logger(__name__)
+
+NLP_MODEL = os.getenv("NLP_MODEL", "pl_core_news_md")
+
+NLP_PROFILES = {
+    "full": {"exclude": [], "keep_vectors": True},
+    "lemmatize": {"exclude": ["parser", "senter", "ner"], "keep_vectors": True},
+    "lemmatize-only": {"exclude": ["parser", "senter", "ner"], "keep_vectors": False},
+}
+NLP_PROFILE = os.getenv("NLP_PROFILE", "lemmatize-only")
+
+_nlp = None
+_nlp_lock = threading.Lock()
+
+
+def _uses_static_vectors(nlp) -> bool:
+    """Czy któryś komponent (zwykle tok2vec) korzysta z wektorów słów jako cech."""
+    def walk(node):
+        if isinstance(node, dict):
+            if node.get("include_static_vectors"):
+                return True
+            return any(walk(value) for value in node.values())
+        return False
+    return walk(nlp.config.get("components", {}))
+
+
+def load_nlp(profile: str = NLP_PROFILE):
+    """Wczytuje model w podanym profilu (bez cache - do tego służy get_nlp)."""
+    import spacy
+
+    if profile not in NLP_PROFILES:
+        raise ValueError(f"Unknown NLP profile {profile!r}, expected one of {sorted(NLP_PROFILES)}")
+    settings = NLP_PROFILES[profile]
+    nlp = spacy.load(NLP_MODEL, exclude=settings["exclude"])
+    if not settings["keep_vectors"]:
+        if _uses_static_vectors(nlp):
+            # Tagger/lematyzator liczą cechy z wektorów - bez nich zmieniłyby się lematy.
+            log.warning("Model %s uses static vectors as features, keeping them", NLP_MODEL)
+        else:
+            nlp.vocab.reset_vectors(width=0)
+    log.info("Loaded spaCy model %s, profile %s, pipeline %s", NLP_MODEL, profile, nlp.pipe_names)
+    return nlp
+
+
+def get_nlp():
+    global _nlp
+    if _nlp is None:
+        with _nlp_lock:
+            if _nlp is None:
+                _nlp = load_nlp(NLP_PROFILE)
+    return _nlp
+
+
+def is_nlp_loaded() -> bool:
+    return _nlp is not None
@@ -0,0 +1,259 @@
+# path/filename: utils/parse_cache.py
+"""
+Cache wyników PizzaParser.parse_order.
+
+Te same zdania padają w wielu rozmowach ("dużą margheritę na cienkim cieście"),
+a powtórki i testy parsują w kółko te same teksty. Dwa poziomy:
+  - LRU w pamięci procesu (PARSE_CACHE_SIZE wpisów),
+  - SQLite na dysku (PARSE_CACHE_PATH, pusty = wyłączony), współdzielony przez
+    workery i restarty; najwyżej PARSE_CACHE_DISK_MAX wierszy, nadmiar (najstarsze
+    po created_at) przycinamy co kilkaset zapisów.
+
+Klucz to wersja kodu parsera (skrót źródeł PARSER_MODULES) + wersja katalogu
++ znormalizowany tekst, więc zarówno wdrożenie zmienionego parsera, jak i zmiana
+menu unieważniają wpisy same. Przy pierwszym użyciu nowej wersji menu usuwamy
+z dysku wpisy wersji starszych (wg pierwszego użycia) o tym samym schemacie, kodzie
+parsera, modelu i profilu NLP - plik może współdzielić inne wdrożenie albo worker,
+który menu jeszcze nie odświeżył. Wpisy starego kodu parsera wypiera limit wierszy.
+Wołający zawsze dostaje głęboką kopię - parser i router modyfikują sloty w miejscu.
+"""
+import copy
+import functools
+import hashlib
+import importlib.util
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import List, Optional
+
+from app.utils.logger import get_logger
+from app.utils.nlp import NLP_MODEL, NLP_PROFILE
+
+
+log = get_logger(__name__)
+
+PARSE_CACHE_SIZE = int(os.getenv("PARSE_CACHE_SIZE", "2048"))
+PARSE_CACHE_PATH = os.getenv("PARSE_CACHE_PATH", os.path.join(tempfile.gettempdir(), "pizza_parse_cache.sqlite3"))
+PARSE_CACHE_DISK_MAX = int(os.getenv("PARSE_CACHE_DISK_MAX", "50000"))
+PARSE_CACHE_TRIM_EVERY = 256  # zapisów w procesie między przycięciami tabeli
+# Podbić przy zmianie formatu wpisów albo logiki parsera spoza PARSER_MODULES
+# (zmiany w tych modułach unieważniają cache same, przez skrót źródeł).
+PARSE_CACHE_SCHEMA = 2
+PARSER_MODULES = (
+    "app.routers.analyze_order",
+    "app.utils.batch_scoring",
+    "app.utils.fast_path",
+    "app.utils.inflection",
+    "app.utils.menu_bitsets",
+    "app.utils.nlp",
+    "app.utils.phonetic",
+    "app.utils.semantic",
+)
+
+PARSE_CACHE_STATS = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "invalidations": 0, "disk_evictions": 0}
+
+_memory: "OrderedDict[tuple, List[dict]]" = OrderedDict()
+_lock = threading.Lock()
+_local = threading.local()
+_current_version: Optional[str] = None
+_disk_enabled = bool(PARSE_CACHE_PATH)
+_disk_writes = 0
+
+
+def normalize(text: str) -> str:
+    return " ".join(unicodedata.normalize("NFC", text).lower().split())
+
+
+@functools.lru_cache(maxsize=None)
+def parser_code_version() -> str:
+    """Skrót źródeł modułów parsera - nowy kod po wdrożeniu nie czyta wyników starego z dysku."""
+    digest = hashlib.sha1()
+    for name in PARSER_MODULES:
+        spec = importlib.util.find_spec(name)
+        digest.update(name.encode())
+        if spec is not None and spec.origin and os.path.isfile(spec.origin):
+            with open(spec.origin, "rb") as f:
+                digest.update(f.read())
+    return digest.hexdigest()[:12]
+
+
+def _namespace_prefix() -> str:
+    return f"{PARSE_CACHE_SCHEMA}:{parser_code_version()}:{NLP_MODEL}:{NLP_PROFILE}:"
+
+
+def _namespace(catalog_version: str) -> str:
+    return _namespace_prefix() + catalog_version
+
+
+def _connection() -> Optional[sqlite3.Connection]:
+    """Jedno połączenie na wątek (parser działa w puli wątków)."""
+    global _disk_enabled
+    if not _disk_enabled:
+        return None
+    connection = getattr(_local, "connection", None)
+    if connection is None:
+        try:
+            connection = sqlite3.connect(PARSE_CACHE_PATH, timeout=1.0, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS parse_cache ("
+                " namespace TEXT NOT NULL, text TEXT NOT NULL, slots TEXT NOT NULL, created_at REAL NOT NULL,"
+                " PRIMARY KEY (namespace, text))"
+            )
+            connection.execute("CREATE INDEX IF NOT EXISTS parse_cache_created_at ON parse_cache (created_at)")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS parse_cache_namespaces ("
+                " namespace TEXT NOT NULL PRIMARY KEY, first_seen REAL NOT NULL)"
+            )
+        except sqlite3.Error as exc:
+            log.warning("Parse cache on disk disabled (%s): %s", PARSE_CACHE_PATH, exc)
+            _disk_enabled = False
+            return None
+        _local.connection = connection
+    return connection
+
+
+def _forget_connection_after_fork():
+    """Połączenia SQLite otwartego przed forkiem nie wolno używać w procesie potomnym."""
+    global _local
+    _local = threading.local()
+
+
+os.register_at_fork(after_in_child=_forget_connection_after_fork)
+
+
+def _disk_get(namespace: str, text: str) -> Optional[List[dict]]:
+    connection = _connection()
+    if connection is None:
+        return None
+    try:
+        row = connection.execute("SELECT slots FROM parse_cache WHERE namespace = ? AND text = ?",
+                                 (namespace, text)).fetchone()
+    except sqlite3.Error as exc:
+        log.warning("Parse cache read failed: %s", exc)
+        return None
+    if row is None:
+        return None
+    slots = json.loads(row[0])
+    for slot in slots:
+        slot["extras"] = [tuple(extra) for extra in slot.get("extras", [])]
+    return slots
+
+
+def _disk_put(namespace: str, text: str, slots: List[dict], trim: bool = False):
+    connection = _connection()
+    if connection is None:
+        return
+    try:
+        connection.execute("INSERT OR REPLACE INTO parse_cache (namespace, text, slots, created_at) VALUES (?, ?, ?, ?)",
+                           (namespace, text, json.dumps(slots, ensure_ascii=False), time.time()))
+        if trim:
+            _trim(connection)
+    except sqlite3.Error as exc:
+        log.warning("Parse cache write failed: %s", exc)
+
+
+def _trim(connection: sqlite3.Connection):
+    """Zostawia PARSE_CACHE_DISK_MAX najnowszych wierszy (wszystkich wdrożeń w pliku)."""
+    deleted = connection.execute(
+        "DELETE FROM parse_cache WHERE created_at < ("
+        " SELECT created_at FROM parse_cache ORDER BY created_at DESC LIMIT 1 OFFSET ?)",
+        (max(PARSE_CACHE_DISK_MAX - 1, 0),),
+    ).rowcount
+    if deleted > 0:
+        with _lock:
+            PARSE_CACHE_STATS["disk_evictions"] += deleted
+
+
+def _on_catalog_version(catalog_version: str):
+    """Nowa wersja menu: czyścimy LRU i wpisy dyskowe starszych wersji tego samego parsera."""
+    global _current_version
+    if _current_version == catalog_version:
+        return
+    with _lock:
+        if _current_version == catalog_version:
+            return
+        if _current_version is not None:
+            PARSE_CACHE_STATS["invalidations"] += 1
+            log.info("Menu changed (%s -> %s), parse cache invalidated", _current_version, catalog_version)
+        _memory.clear()
+        _current_version = catalog_version
+    connection = _connection()
+    if connection is not None:
+        namespace, prefix = _namespace(catalog_version), _namespace_prefix()
+        try:
+            connection.execute("INSERT OR IGNORE INTO parse_cache_namespaces (namespace, first_seen) VALUES (?, ?)",
+                               (namespace, time.time()))
+            connection.execute(
+                "DELETE FROM parse_cache WHERE namespace IN ("
+                " SELECT namespace FROM parse_cache_namespaces"
+                " WHERE substr(namespace, 1, ?) = ? AND namespace != ?"
+                " AND first_seen < (SELECT first_seen FROM parse_cache_namespaces WHERE namespace = ?))",
+                (len(prefix), prefix, namespace, namespace),
+            )
+        except sqlite3.Error as exc:
+            log.warning("Parse cache cleanup failed: %s", exc)
+
+
+def get(catalog_version: str, text: str) -> Optional[List[dict]]:
+    """Kopia zapisanych slotów albo None."""
+    _on_catalog_version(catalog_version)
+    key = (catalog_version, normalize(text))
+    with _lock:
+        slots = _memory.get(key)
+        if slots is not None:
+            _memory.move_to_end(key)
+            PARSE_CACHE_STATS["memory_hits"] += 1
+            return copy.deepcopy(slots)
+    slots = _disk_get(_namespace(catalog_version), key[1])
+    with _lock:
+        if slots is None:
+            PARSE_CACHE_STATS["misses"] += 1
+            return None
+        PARSE_CACHE_STATS["disk_hits"] += 1
+        _remember(key, slots)
+    return copy.deepcopy(slots)
+
+
+def put(catalog_version: str, text: str, slots: List[dict]):
+    _on_catalog_version(catalog_version)
+    key = (catalog_version, normalize(text))
+    global _disk_writes
+    stored = copy.deepcopy(slots)
+    with _lock:
+        _remember(key, stored)
+        _disk_writes += 1
+        trim = _disk_writes % PARSE_CACHE_TRIM_EVERY == 0
+    _disk_put(_namespace(catalog_version), key[1], stored, trim)
+
+
+def _remember(key: tuple, slots: List[dict]):
+    _memory[key] = slots
+    _memory.move_to_end(key)
+    while len(_memory) > PARSE_CACHE_SIZE:
+        _memory.popitem(last=False)
+
+
+def clear():
+    """Czyści oba poziomy (np. przy ręcznym eksperymentowaniu ze słownikami parsera)."""
+    with _lock:
+        _memory.clear()
+    connection = _connection()
+    if connection is not None:
+        connection.execute("DELETE FROM parse_cache")
+
+
+def get_parse_cache_stats() -> dict:
+    with _lock:
+        stats = dict(PARSE_CACHE_STATS)
+        stats["memory_entries"] = len(_memory)
+    lookups = stats["memory_hits"] + stats["disk_hits"] + stats["misses"]
+    stats["hit_rate"] = (stats["memory_hits"] + stats["disk_hits"]) / lookups if lookups else 0.0
+    stats["disk_enabled"] = _disk_enabled
+    return stats
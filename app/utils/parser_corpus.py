@@ -0,0 +1,172 @@
+# path/filename: utils/parser_corpus.py
+"""
+Korpus oznaczonych zamówień dla benchmarku parsera (app/benchmarks/parser_corpus.py).
+
+Wpis korpusu (JSON lines) to jedna rozmowa: kolejne wypowiedzi klienta i sloty,
+które powinny z niej wyjść:
+
+    {"id": "dialog-01", "source": "dialog", "reviewed": true,
+     "turns": ["Poproszę dwie pizze Margherita.", "Obie duże."],
+     "expected": [{"pizza": "Margherita", "pizza_count": 2, "big_size": true,
+                   "on_thick_pastry": null, "extras": []}]}
+
+Zasady oznaczania: sosy, napoje, adres i płatność pomijamy (parser ich nie
+wyciąga), "średnia" to big_size = false, "podwójny ser" to ("Ser", 2), usunięcia
+składników ("bez cebuli") nie są slotami. Wpisy wyeksportowane z produkcji mają
+"reviewed": false, dopóki ktoś nie poprawi ich etykiet - benchmark domyślnie je pomija.
+
+Ocena: sloty przewidziane i oczekiwane parujemy zachłannie po liczbie wspólnych
+faktów (pizza, liczba, rozmiar, ciasto, każdy dodatek), a potem liczymy precision
+i recall per pole oraz dla całych slotów (slot trafiony = wszystkie pola zgodne).
+Pole None ("nie wiadomo") nie jest faktem - ani trafieniem, ani błędem.
+"""
+import json
+import re
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from app.utils.catalog import MenuCatalog
+
+
+FIELDS = ("pizza", "pizza_count", "big_size", "on_thick_pastry", "extras")
+
+
+def load_corpus(path: str, include_unreviewed: bool = False) -> List[dict]:
+    entries = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            if entry.get("reviewed", False) or include_unreviewed:
+                entries.append(entry)
+    return entries
+
+
+def load_menu(path: str) -> MenuCatalog:
+    """Stały katalog z pliku JSON (ten sam kształt co MenuCatalog), żeby benchmark nie potrzebował bazy."""
+    with open(path, encoding="utf-8") as f:
+        menu = json.load(f)
+    return MenuCatalog(
+        [tuple(pizza) for pizza in menu["pizzas"]],
+        [tuple(ingredient) for ingredient in menu["ingredients"]],
+        {int(pizza_id): ids for pizza_id, ids in menu.get("pizza_ingredients", {}).items()},
+        doughs=[tuple(dough) for dough in menu.get("doughs", [])],
+        pizza_doughs={int(pizza_id): ids for pizza_id, ids in menu.get("pizza_doughs", {}).items()},
+    )
+
+
+def from_parser(slot: dict) -> dict:
+    """Slot z PizzaParser w płaskim kształcie korpusu."""
+    return {
+        "pizza": slot["pizza"],
+        "pizza_count": slot["pizza_count"],
+        "big_size": slot["dough"]["big_size"],
+        "on_thick_pastry": slot["dough"]["on_thick_pastry"],
+        "extras": [[name, qty] for name, qty in slot["extras"]],
+    }
+
+
+def _facts(slot: dict) -> Counter:
+    facts = Counter()
+    for field in FIELDS[:-1]:
+        value = slot.get(field)
+        if value is not None:
+            facts[(field, value.lower() if isinstance(value, str) else value)] += 1
+    extras = Counter()
+    for name, qty in slot.get("extras") or []:
+        extras[name.lower()] += qty
+    for name, qty in extras.items():
+        facts[("extras", (name, qty))] += 1
+    return facts
+
+
+def align(expected: List[dict], predicted: List[dict]) -> List[Tuple[Optional[int], Optional[int]]]:
+    """
+    Pary (indeks oczekiwanego, indeks przewidzianego); slot bez pary ma None po drugiej
+    stronie. Zachłannie: najpierw pary z największą liczbą wspólnych faktów, remis - kolejność.
+    """
+    expected_facts = [_facts(slot) for slot in expected]
+    predicted_facts = [_facts(slot) for slot in predicted]
+    candidates = sorted(
+        ((-sum((e & p).values()), i, j) for i, e in enumerate(expected_facts) for j, p in enumerate(predicted_facts)),
+    )
+    pairs = []
+    used_expected, used_predicted = set(), set()
+    for shared, i, j in candidates:
+        if shared == 0 or i in used_expected or j in used_predicted:
+            continue
+        pairs.append((i, j))
+        used_expected.add(i)
+        used_predicted.add(j)
+    pairs.extend((i, None) for i in range(len(expected)) if i not in used_expected)
+    pairs.extend((None, j) for j in range(len(predicted)) if j not in used_predicted)
+    return pairs
+
+
+class CorpusScore:
+    """Liczniki tp/fp/fn per pole i trafienia całych slotów, sumowane po wpisach korpusu."""
+
+    def __init__(self):
+        self.fields: Dict[str, Counter] = {field: Counter() for field in FIELDS}
+        self.slots = Counter()
+
+    def add(self, expected: List[dict], predicted: List[dict]) -> List[Tuple[Optional[dict], Optional[dict]]]:
+        """Dolicza jeden wpis; zwraca pary slotów, które się różnią (do raportu błędów)."""
+        self.slots["expected"] += len(expected)
+        self.slots["predicted"] += len(predicted)
+        errors = []
+        for i, j in align(expected, predicted):
+            expected_facts = _facts(expected[i]) if i is not None else Counter()
+            predicted_facts = _facts(predicted[j]) if j is not None else Counter()
+            for (field, _), count in (expected_facts & predicted_facts).items():
+                self.fields[field]["tp"] += count
+            for (field, _), count in (predicted_facts - expected_facts).items():
+                self.fields[field]["fp"] += count
+            for (field, _), count in (expected_facts - predicted_facts).items():
+                self.fields[field]["fn"] += count
+            if i is not None and j is not None and expected_facts == predicted_facts:
+                self.slots["exact"] += 1
+            else:
+                errors.append((expected[i] if i is not None else None, predicted[j] if j is not None else None))
+        return errors
+
+    def report(self) -> dict:
+        fields = {field: _precision_recall(c["tp"], c["tp"] + c["fp"], c["tp"] + c["fn"])
+                  for field, c in self.fields.items()}
+        total = sum(self.fields.values(), Counter())
+        return {
+            "slots": _precision_recall(self.slots["exact"], self.slots["predicted"], self.slots["expected"]),
+            "fields": fields,
+            "micro": _precision_recall(total["tp"], total["tp"] + total["fp"], total["tp"] + total["fn"]),
+        }
+
+
+def _precision_recall(correct: int, predicted: int, expected: int) -> dict:
+    precision = correct / predicted if predicted else 0.0
+    recall = correct / expected if expected else 0.0
+    f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+    return {"precision": precision, "recall": recall, "f1": f1, "support": expected}
+
+
+# Anonimizacja transkrypcji z produkcji przed dodaniem do korpusu: telefony,
+# e-maile i adresy zastępujemy znacznikami, resztę wypowiedzi zostawiamy.
+_ANONYMIZE_PATTERNS = (
+    (re.compile(r"[\w.+-]+@[\w-]+(?:\.[\w-]+)+"), "<email>"),
+    (re.compile(r"(?:\+?48[ -]?)?\b\d{3}[ -]?\d{3}[ -]?\d{3}\b"), "<telefon>"),
+    (re.compile(r"\b\d{2}-\d{3}\b"), "<kod>"),
+    (re.compile(r"\b(?:(?:ul|al|os|pl)\.|ulic[aęy]|alej[aię]|osiedl[eu])\s*[^\d,.]+?\s+\d+\w?"
+                r"(?:\s*/\s*\d+\w?)?(?:\s+(?:m\.?|mieszkani[ae])\s*\d+)?", re.IGNORECASE), "<adres>"),
+)
+
+
+def anonymize(text: str) -> str:
+    for pattern, replacement in _ANONYMIZE_PATTERNS:
+        text = pattern.sub(replacement, text)
+    return text
+
+
+def corpus_line(entry_id: str, turns: Iterable[str], expected: List[dict], source: str) -> str:
+    """Linia JSONL nowego, jeszcze nieprzejrzanego wpisu (etykiety = propozycja parsera do poprawy)."""
+    return json.dumps({"id": entry_id, "source": source, "reviewed": False,
+                       "turns": [anonymize(text) for text in turns], "expected": expected}, ensure_ascii=False)
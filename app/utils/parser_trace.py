@@ -0,0 +1,103 @@
+# path/filename: utils/parser_trace.py
+"""
+Śledzenie wnętrza parsera zamiast log.info w każdej iteracji pętli.
+
+Domyślnie nic nie jest aktywne: current() zwraca None, a parser sprawdza tylko
+"if trace is not None" - bez formatowania napisów i bez wywołań loggera.
+Ślad włącza się na czas jednego parsowania przez tracing():
+  - zdarzenia DEBUG (logger app.utils.parser_trace) - gdy ten logger ma poziom
+    DEBUG, dla części rozmów wg PARSER_TRACE_SAMPLE_RATE (losowanie po id rozmowy,
+    więc rozmowa jest śledzona w całości albo wcale),
+  - tryb explain - dla każdego pola slotu zapisuje, która reguła je ustawiła
+    i na jakim tokenie; wynik trafia do odpowiedzi API.
+
+Kontekst idzie przez ContextVar, więc działa też w puli wątków (run_in_threadpool
+kopiuje kontekst).
+"""
+import logging
+import os
+import zlib
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, List, Optional
+
+from app.utils.logger import get_logger
+
+
+log = get_logger(__name__)
+
+PARSER_TRACE_SAMPLE_RATE = float(os.getenv("PARSER_TRACE_SAMPLE_RATE", "1.0"))
+
+_current: ContextVar[Optional["ParserTrace"]] = ContextVar("parser_trace", default=None)
+
+
+class ParserTrace:
+    __slots__ = ("conversation_id", "emit", "explain", "rules")
+
+    def __init__(self, conversation_id: Optional[str], emit: bool, explain: bool):
+        self.conversation_id = conversation_id
+        self.emit = emit
+        self.explain = explain
+        self.rules: List[tuple] = []
+
+    def event(self, name: str, **fields):
+        """Zdarzenie strukturalne; pola trafiają też do rekordu jako extra["trace"]."""
+        if self.emit:
+            log.debug("%s %s", name, fields,
+                      extra={"trace": {"event": name, "conversation_id": self.conversation_id, **fields}})
+
+    def rule(self, slot: Optional[dict], field: str, value, rule: str, token: Optional[str] = None):
+        """
+        Reguła ustawiła pole slotu. slot=None oznacza atrybuty wspólne
+        (scalane potem do wszystkich slotów).
+        """
+        if self.explain:
+            self.rules.append((slot, field, value, rule, token))
+        self.event("rule", field=field, value=value, rule=rule, token=token)
+
+    def explanation(self, slots: List[dict]) -> List[dict]:
+        """Zapisane reguły z numerem slotu w zwróconej liście ("common" dla atrybutów wspólnych)."""
+        positions = {id(slot): index for index, slot in enumerate(slots)}
+        result = []
+        for slot, field, value, rule, token in self.rules:
+            if slot is None:
+                where = "common"
+            else:
+                where = positions.get(id(slot))
+                if where is None:  # slot odrzucony w trakcie parsowania
+                    continue
+            result.append({"slot": where, "field": field, "value": value, "rule": rule, "token": token})
+        return result
+
+
+def current() -> Optional[ParserTrace]:
+    return _current.get()
+
+
+def explaining() -> bool:
+    trace = _current.get()
+    return trace is not None and trace.explain
+
+
+def _sampled(conversation_id: Optional[str]) -> bool:
+    if PARSER_TRACE_SAMPLE_RATE >= 1.0:
+        return True
+    if PARSER_TRACE_SAMPLE_RATE <= 0.0:
+        return False
+    key = conversation_id if conversation_id is not None else os.urandom(8).hex()
+    return zlib.crc32(key.encode()) < PARSER_TRACE_SAMPLE_RATE * 2 ** 32
+
+
+@contextmanager
+def tracing(conversation_id: Optional[str] = None, explain: bool = False) -> Iterator[Optional[ParserTrace]]:
+    """Aktywny ślad na czas bloku albo None, gdy ani DEBUG (z próbkowaniem), ani explain."""
+    emit = log.isEnabledFor(logging.DEBUG) and _sampled(conversation_id)
+    if not emit and not explain:
+        yield None
+        return
+    trace = ParserTrace(conversation_id, emit, explain)
+    token = _current.set(trace)
+    try:
+        yield trace
+    finally:
+        _current.reset(token)
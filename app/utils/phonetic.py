@@ -0,0 +1,67 @@
+# path/filename: utils/phonetic.py
+"""
+Klucz fonetyczny dla polskiej mowy i włoskich nazw z menu.
+
+Rozpoznawanie mowy zapisuje nazwy "tak jak słychać": "kapriczioza", "pepperony",
+"hawajskom", "mocarella". Sprowadzamy tekst do zgrubnego zapisu wymowy
+(bez ogonków, cz/ć/ci, rz/ż, bez podwójnych liter, bez rozróżnienia dźwięczności),
+żeby takie warianty i nazwa z katalogu miały ten sam klucz. Klucz to tylko indeks -
+kolizje między pozycjami menu rozstrzyga wołający (build_form_index je odrzuca).
+"""
+import re
+import unicodedata
+
+
+# Kolejność ma znaczenie: najpierw obce zapisy i dwuznaki, potem pojedyncze litery.
+_RULES = [
+    (re.compile(r"ą$"), "om"),
+    (re.compile(r"ę$"), "e"),
+    (re.compile(r"ą"), "on"),
+    (re.compile(r"ę"), "en"),
+    (re.compile(r"ph"), "f"),
+    (re.compile(r"th"), "t"),
+    (re.compile(r"qu"), "kw"),
+    (re.compile(r"zz"), "c"),                    # mozzarella -> mocarela
+    (re.compile(r"sci(?=[aou])|sc(?=[ei])"), "S"),  # prosciutto
+    (re.compile(r"cc?i(?=[aou])"), "C"),        # capriciosa, funghi alla cacciatora
+    (re.compile(r"cc?(?=[ei])"), "C"),           # pancetta (włoskie c przed e/i)
+    (re.compile(r"gg?i(?=[aou])|gg(?=[ei])|dż"), "Z"),  # formaggi, dżem; polskie "ge/gi" jest twarde
+    (re.compile(r"gh(?=[ei])"), "g"),            # margherita, funghi
+    (re.compile(r"cc?h(?=[ei])"), "k"),          # zucchini
+    (re.compile(r"czi(?=[aou])"), "C"),
+    (re.compile(r"cz|ć"), "C"),
+    (re.compile(r"ci(?=[aeou])"), "C"),
+    (re.compile(r"dz(?![iź])"), "c"),
+    (re.compile(r"^c(?=[aou])|cc(?=[aou])"), "k"),  # calzone, focaccia; polskie "ca" zostaje
+    (re.compile(r"ch"), "h"),
+    (re.compile(r"rz|ż|ź|zi(?=[aeou])"), "Z"),
+    (re.compile(r"sz|ś|si(?=[aeou])"), "S"),
+    (re.compile(r"gn"), "ni"),                   # gnocchi
+    (re.compile(r"x"), "ks"),
+    (re.compile(r"ó"), "u"),
+    (re.compile(r"ł"), "l"),
+    (re.compile(r"ń"), "n"),
+    (re.compile(r"[yj]"), "i"),
+    (re.compile(r"v"), "w"),
+    (re.compile(r"q"), "k"),
+]
+
+# Dźwięczność w mowie potocznej i na końcu wyrazu się zaciera - składamy ją.
+_DEVOICE = str.maketrans({"b": "p", "d": "t", "g": "k", "w": "f", "z": "s", "Z": "S"})
+_REPEATED = re.compile(r"(.)\1+")
+_NON_LETTERS = re.compile(r"[^a-zA-Z ]+")
+
+
+def _fold_word(word: str) -> str:
+    for pattern, replacement in _RULES:
+        word = pattern.sub(replacement, word)
+    word = word.translate(_DEVOICE)
+    word = unicodedata.normalize("NFKD", word)
+    word = "".join(ch for ch in word if not unicodedata.combining(ch))
+    word = _NON_LETTERS.sub("", word)
+    return _REPEATED.sub(r"\1", word)
+
+
+def phonetic_key(text: str) -> str:
+    """Zgrubny zapis wymowy tekstu (wielkie litery w kluczu oznaczają głoski cz, sz, ż)."""
+    return " ".join(_fold_word(word) for word in text.lower().split())
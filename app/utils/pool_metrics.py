@@ -0,0 +1,71 @@
+# path/filename: utils/pool_metrics.py
+"""
+Pula połączeń z pomiarem czasu oczekiwania na połączenie.
+
+Standardowe QueuePool mówi tylko, ile połączeń jest wypożyczonych. Żeby dobrać
+DB_POOL_SIZE / DB_MAX_OVERFLOW dla kilku workerów, potrzebujemy też wiedzieć,
+jak długo żądania czekają na wolne połączenie i ile razy skończyło się timeoutem.
+"""
+import threading
+import time
+
+from sqlalchemy import exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+
+class TimedPoolMixin:
+    """Mierzy czas od prośby o połączenie do jego otrzymania (kolejka + ewentualne nawiązanie)."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._stats_lock = threading.Lock()
+        self.checkouts = 0
+        self.checkout_timeouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            return super().connect()
+        except exc.TimeoutError:
+            with self._stats_lock:
+                self.checkout_timeouts += 1
+            raise
+        finally:
+            waited = time.perf_counter() - start
+            with self._stats_lock:
+                self.checkouts += 1
+                self.total_wait += waited
+                self.max_wait = max(self.max_wait, waited)
+
+
+class TimedQueuePool(TimedPoolMixin, QueuePool):
+    pass
+
+
+class TimedAsyncAdaptedQueuePool(TimedPoolMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+def get_pool_stats(engine) -> dict:
+    """Bieżący stan puli silnika: rozmiar, wypożyczone, overflow i statystyki oczekiwania."""
+    pool = engine.pool
+    stats = {"pool_class": type(pool).__name__, "status": pool.status()}
+    if isinstance(pool, QueuePool):
+        stats.update({
+            "size": pool.size(),
+            "checked_in": pool.checkedin(),
+            "checked_out": pool.checkedout(),
+            "overflow": pool.overflow(),
+            "max_overflow": pool._max_overflow,
+        })
+    if isinstance(pool, TimedPoolMixin):
+        with pool._stats_lock:
+            stats.update({
+                "checkouts": pool.checkouts,
+                "checkout_timeouts": pool.checkout_timeouts,
+                "avg_wait_ms": pool.total_wait / pool.checkouts * 1000 if pool.checkouts else 0.0,
+                "max_wait_ms": pool.max_wait * 1000,
+            })
+    return stats
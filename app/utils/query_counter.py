@@ -0,0 +1,168 @@
+# path/filename: utils/query_counter.py
+"""
+Liczenie zapytań SQL w obrębie jednego żądania HTTP (zdarzenia silnika SQLAlchemy).
+
+Dla każdego żądania zbieramy liczbę zapytań, łączny czas w bazie i "kształty"
+zapytań (SQL z wyciętymi parametrami). Ten sam kształt powtórzony kilka razy
+w jednym żądaniu to prawie zawsze N+1 - logujemy go jako ostrzeżenie.
+"""
+import os
+import re
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import event
+
+from app.utils import tracing
+from app.utils.logger import get_logger
+
+
+log = get_logger(__name__)
+
+N_PLUS_ONE_THRESHOLD = int(os.getenv("N_PLUS_ONE_THRESHOLD", "3"))
+
+_current_stats: ContextVar[Optional["QueryStats"]] = ContextVar("query_stats", default=None)
+_request_captures: List[list] = []
+
+ROUTE_QUERY_METRICS: Dict[str, dict] = {}
+_metrics_lock = threading.Lock()
+
+_PLACEHOLDER_LISTS = re.compile(r"\((?:\s*\?\s*,)+\s*\?\s*\)")
+_LITERALS = re.compile(r"%\(\w+\)s|%s|\$\d+|:\w+|'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def statement_shape(statement: str) -> str:
+    """
+    Sprowadza SQL do postaci bez wartości, żeby zapytania różniące się tylko
+    parametrami (np. kolejne id w pętli) miały ten sam kształt.
+    """
+    shape = _LITERALS.sub("?", statement)
+    shape = _PLACEHOLDER_LISTS.sub("(?...)", shape)
+    return _WHITESPACE.sub(" ", shape).strip()
+
+
+class QueryStats:
+    __slots__ = ("count", "total_time", "shapes")
+
+    def __init__(self):
+        self.count = 0
+        self.total_time = 0.0
+        self.shapes: Counter = Counter()
+
+    def record(self, statement: str, elapsed: float):
+        self.count += 1
+        self.total_time += elapsed
+        self.shapes[statement_shape(statement)] += 1
+
+    def duplicates(self, threshold: int = N_PLUS_ONE_THRESHOLD) -> Dict[str, int]:
+        """Kształty zapytań powtórzone co najmniej `threshold` razy (podejrzenie N+1)."""
+        return {shape: n for shape, n in self.shapes.items() if n >= threshold}
+
+    def report(self) -> str:
+        lines = [f"{self.count} queries, {self.total_time * 1000:.1f} ms"]
+        for shape, n in self.shapes.most_common():
+            lines.append(f"  {n}x {shape}")
+        return "\n".join(lines)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current_stats.get() is not None or tracing.active():
+        conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _current_stats.get()
+    traced = tracing.active()
+    if stats is None and not traced:
+        return
+    start_times = conn.info.get("query_start_time")
+    if not start_times:
+        return
+    elapsed = time.perf_counter() - start_times.pop()
+    if stats is not None:
+        stats.record(statement, elapsed)
+    if traced:
+        tracing.add_span("db.query", elapsed, **{"db.statement": statement_shape(statement)})
+
+
+def install(engine):
+    """Podpina liczniki pod silnik. Bez aktywnego track_queries() koszt to jedno ContextVar.get()."""
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+@contextmanager
+def track_queries():
+    """Zlicza zapytania wykonane w bieżącym kontekście (także w wątkach startowanych z kopią kontekstu)."""
+    stats = QueryStats()
+    token = _current_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _current_stats.reset(token)
+
+
+def record_request(route: str, stats: QueryStats):
+    """
+    Zapisuje statystyki zakończonego żądania: agregaty per trasa, ostrzeżenie o N+1
+    i przekazanie do aktywnych assert_max_queries().
+    """
+    duplicates = stats.duplicates()
+    with _metrics_lock:
+        metrics = ROUTE_QUERY_METRICS.setdefault(route, {
+            "requests": 0, "queries": 0, "db_time": 0.0, "max_queries": 0, "n_plus_one_requests": 0
+        })
+        metrics["requests"] += 1
+        metrics["queries"] += stats.count
+        metrics["db_time"] += stats.total_time
+        metrics["max_queries"] = max(metrics["max_queries"], stats.count)
+        if duplicates:
+            metrics["n_plus_one_requests"] += 1
+    if duplicates:
+        log.warning("Probable N+1 in %s: %s", route,
+                    "; ".join(f"{n}x {shape}" for shape, n in duplicates.items()))
+    for captured in list(_request_captures):
+        captured.append((route, stats))
+
+
+def get_route_query_metrics() -> Dict[str, dict]:
+    with _metrics_lock:
+        return {route: dict(metrics) for route, metrics in ROUTE_QUERY_METRICS.items()}
+
+
+def debug_headers(stats: QueryStats) -> Dict[str, str]:
+    return {
+        "X-DB-Queries": str(stats.count),
+        "X-DB-Time-Ms": f"{stats.total_time * 1000:.2f}",
+        "X-DB-Duplicate-Queries": str(sum(stats.duplicates().values())),
+    }
+
+
+@contextmanager
+def assert_max_queries(max_queries: int):
+    """
+    Pomocnik do testów: każde żądanie HTTP obsłużone w bloku (np. przez TestClient)
+    oraz kod wołany bezpośrednio w bloku może wykonać najwyżej `max_queries` zapytań.
+
+        with assert_max_queries(6):
+            client.get("/orders/summary/1")
+    """
+    captured: List[Tuple[str, QueryStats]] = []
+    _request_captures.append(captured)
+    try:
+        with track_queries() as direct:
+            yield captured
+    finally:
+        _request_captures.remove(captured)
+    checked = list(captured)
+    if direct.count:
+        checked.append(("<direct>", direct))
+    for route, stats in checked:
+        assert stats.count <= max_queries, (
+            f"{route}: {stats.count} queries, expected at most {max_queries}\n{stats.report()}"
+        )
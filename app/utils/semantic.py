@@ -0,0 +1,92 @@
+# path/filename: utils/semantic.py
+"""
+Semantyczna podpowiedź pizzy, gdy ani indeks form, ani fuzzy nie znalazły nazwy.
+
+"ta z owocami", "wiejska", "coś z kurczakiem" - takich odwołań nie da się
+dopasować literowo, ale wektory słów z pl_core_news_md niosą dość znaczenia,
+żeby wskazać najbliższą pozycję menu. Dla każdej pizzy liczymy (raz na wersję
+katalogu) wektor z nazwy i wektor z listy składników, a frazę klienta oceniamy
+względem całego menu jednym iloczynem macierz x wektor (podobieństwo cosinusowe).
+
+Wynik to tylko propozycja z pewnością - parser nie wpisuje jej do slotu, tylko
+dokłada do niego klucz "suggestion", a dialog może dopytać "Czy chodzi o ...?".
+Wymaga modelu z wektorami (profil NLP "lemmatize" albo "full" lub model, którego
+tagger i tak używa wektorów) - bez nich podpowiedzi są wyłączone.
+"""
+import os
+from typing import Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from app.utils.logger import get_logger
+
+
+log = get_logger(__name__)
+
+SEMANTIC_MIN_CONFIDENCE = float(os.getenv("SEMANTIC_MIN_CONFIDENCE", "0.5"))
+
+
+def _unit(vector: np.ndarray) -> Optional[np.ndarray]:
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm > 0 else None
+
+
+def phrase_vector(nlp, words: Iterable[str]) -> Optional[np.ndarray]:
+    """Średni znormalizowany wektor słów frazy; słowa bez wektora pomijamy."""
+    vectors = []
+    for word in words:
+        if nlp.vocab.has_vector(word):
+            unit = _unit(nlp.vocab.get_vector(word))
+            if unit is not None:
+                vectors.append(unit)
+    if not vectors:
+        return None
+    return _unit(np.mean(vectors, axis=0))
+
+
+class SemanticIndex:
+    def __init__(self, names: List[str], matrix: Optional[np.ndarray]):
+        self.names = names
+        self.matrix = matrix
+
+    @property
+    def enabled(self) -> bool:
+        return self.matrix is not None and len(self.names) > 0
+
+    @classmethod
+    def build(cls, nlp, catalog) -> "SemanticIndex":
+        """
+        Wiersz macierzy = znormalizowana suma wektora nazwy pizzy i wektora jej składników,
+        więc "z owocami" może trafić w pizzę z ananasem, choć w nazwie owoców nie ma.
+        """
+        if nlp.vocab.vectors.shape[0] == 0:
+            log.info("No word vectors in the loaded model, semantic suggestions disabled")
+            return cls([], None)
+        ingredient_names = dict(catalog.ingredients)
+        names, rows = [], []
+        for pizza_id, name in catalog.pizzas:
+            parts = [phrase_vector(nlp, name.lower().split())]
+            ingredient_words = [word for ingredient_id in catalog.pizza_ingredients.get(pizza_id, [])
+                                for word in ingredient_names[ingredient_id].lower().split()]
+            parts.append(phrase_vector(nlp, ingredient_words))
+            parts = [part for part in parts if part is not None]
+            if not parts:
+                continue
+            names.append(name.lower())
+            rows.append(_unit(np.sum(parts, axis=0)))
+        matrix = np.vstack(rows).astype(np.float32) if rows else None
+        return cls(names, matrix)
+
+    def suggest(self, nlp, words: Iterable[str]) -> Optional[Tuple[str, float]]:
+        """Najbliższa pizza i pewność (cosinus, 0-1) albo None, jeśli nic nie przekracza progu."""
+        if not self.enabled:
+            return None
+        vector = phrase_vector(nlp, words)
+        if vector is None:
+            return None
+        scores = self.matrix @ vector.astype(np.float32)
+        best = int(scores.argmax())
+        confidence = float(max(0.0, min(1.0, scores[best])))
+        if confidence < SEMANTIC_MIN_CONFIDENCE:
+            return None
+        return (self.names[best], round(confidence, 3))
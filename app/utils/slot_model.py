@@ -0,0 +1,195 @@
+# path/filename: utils/slot_model.py
+"""
+Zwarta reprezentacja slotu (jednej pozycji zamówienia) dla stanu rozmowy.
+
+Parser i API pracują na słownikach:
+    {"pizza": "margherita", "pizza_count": 1,
+     "dough": {"big_size": True, "on_thick_pastry": None},
+     "extras": [("pieczarki", 1)], "missing_info": ["Grubość ciasta"], "db_id": 12}
+CONVERSATION_STATES trzyma je przez całą rozmowę, więc dla każdego trwającego
+połączenia wisiały w pamięci zagnieżdżone słowniki i listy polskich napisów.
+
+Slot to klasa z __slots__: id pizzy zamiast nazwy, braki jako maska bitowa
+(etykiety spoza MISSING_LABELS trafiają do krotki missing_other), dodatki jako
+Counter {id składnika: ilość}. Konwersja do i ze słownika jest
+jawna (SlotCodec), więc kształt odpowiedzi API się nie zmienia.
+
+Stan rozmowy zakodowany przy starszej wersji menu może wskazywać id, którego
+w nowym katalogu już nie ma - kodek pamięta nazwy ze wszystkich wersji katalogu
+widzianych w procesie. Id nieznane nawet tam daje slot bez pizzy ("Nazwa pizzy"
+w missing_info) albo pominięty dodatek, nigdy gołą liczbę zamiast nazwy.
+"""
+from collections import Counter
+from typing import Dict, List, Optional, Tuple, Union
+
+
+MISSING_PIZZA = 1
+MISSING_SIZE = 2
+MISSING_THICKNESS = 4
+MISSING_DOUGH_NOT_AVAILABLE = 8
+
+DOUGH_NOT_AVAILABLE = "Ciasto niedostępne dla tej pizzy"
+
+# Kolejność jak w merge_and_find_missing - to_dict() odtwarza listę w tej kolejności.
+MISSING_LABELS = (
+    (MISSING_PIZZA, "Nazwa pizzy"),
+    (MISSING_SIZE, "Rozmiar"),
+    (MISSING_THICKNESS, "Grubość ciasta"),
+    (MISSING_DOUGH_NOT_AVAILABLE, DOUGH_NOT_AVAILABLE),
+)
+_MISSING_BITS = {label: bit for bit, label in MISSING_LABELS}
+
+ItemRef = Union[int, str, None]  # id z katalogu; nazwa tylko, gdy pozycji nie ma już w katalogu
+
+# id -> nazwa ze wszystkich zbudowanych kodeków (także pozycje usunięte z menu)
+_KNOWN_PIZZA_NAMES: Dict[int, str] = {}
+_KNOWN_INGREDIENT_NAMES: Dict[int, str] = {}
+
+
+class Slot:
+    __slots__ = ("pizza", "pizza_count", "big_size", "on_thick_pastry", "extras", "missing",
+                 "db_id", "suggestion", "dough_suggestion", "missing_other")
+
+    def __init__(self, pizza: ItemRef = None, pizza_count: int = 1, big_size: Optional[bool] = None,
+                 on_thick_pastry: Optional[bool] = None, extras: Optional[Counter] = None, missing: int = 0,
+                 db_id: Optional[int] = None, suggestion: Optional[dict] = None,
+                 dough_suggestion: Optional[dict] = None, missing_other: Tuple[str, ...] = ()):
+        self.pizza = pizza
+        self.pizza_count = pizza_count
+        self.big_size = big_size
+        self.on_thick_pastry = on_thick_pastry
+        self.extras = extras if extras is not None else Counter()
+        self.missing = missing
+        self.db_id = db_id
+        self.suggestion = suggestion
+        self.dough_suggestion = dough_suggestion
+        self.missing_other = missing_other
+
+    def _key(self) -> tuple:
+        return (self.pizza, self.pizza_count, self.big_size, self.on_thick_pastry, tuple(self.extras.items()))
+
+    def __eq__(self, other):
+        if not isinstance(other, Slot):
+            return NotImplemented
+        return self._key() == other._key()
+
+    __hash__ = None
+
+    def __repr__(self):
+        return (f"Slot(pizza={self.pizza!r}, count={self.pizza_count}, big={self.big_size}, "
+                f"thick={self.on_thick_pastry}, extras={dict(self.extras)}, missing={self.missing:#x}, "
+                f"db_id={self.db_id})")
+
+
+class SlotCodec:
+    """Zamiana Slot <-> słownik z nazwami; mapy nazwa <-> id budujemy raz na wersję katalogu."""
+
+    def __init__(self, pizza_ids: Dict[str, int], pizza_names: Dict[int, str],
+                 ingredient_ids: Dict[str, int], ingredient_names: Dict[int, str]):
+        self.pizza_ids = pizza_ids
+        self.pizza_names = pizza_names
+        self.ingredient_ids = ingredient_ids
+        self.ingredient_names = ingredient_names
+
+    @classmethod
+    def build(cls, catalog) -> "SlotCodec":
+        pizza_names = {pizza_id: name.lower() for pizza_id, name in catalog.pizzas}
+        ingredient_names = {ingredient_id: name.lower() for ingredient_id, name in catalog.ingredients}
+        _KNOWN_PIZZA_NAMES.update(pizza_names)
+        _KNOWN_INGREDIENT_NAMES.update(ingredient_names)
+        return cls({name: pizza_id for pizza_id, name in pizza_names.items()}, {**_KNOWN_PIZZA_NAMES},
+                   {name: ingredient_id for ingredient_id, name in ingredient_names.items()},
+                   {**_KNOWN_INGREDIENT_NAMES})
+
+    def _pizza_ref(self, name: Optional[str]) -> ItemRef:
+        if name is None:
+            return None
+        return self.pizza_ids.get(name.lower(), name)
+
+    def _ingredient_ref(self, name: str) -> ItemRef:
+        return self.ingredient_ids.get(name.lower(), name)
+
+    def from_dict(self, data: dict) -> Slot:
+        """
+        Dodatki sumujemy po składniku (tak i tak w bazie jest jeden wiersz na składnik pozycji).
+        """
+        extras = Counter()
+        for name, quantity in data.get("extras", ()):
+            extras[self._ingredient_ref(name)] += quantity
+        missing, missing_other = 0, []
+        for label in data.get("missing_info", ()):
+            bit = _MISSING_BITS.get(label)
+            if bit is None:  # etykieta dodana w parserze, a jeszcze nie tutaj - nie gubimy jej
+                missing_other.append(label)
+            else:
+                missing |= bit
+        dough = data.get("dough") or {}
+        return Slot(self._pizza_ref(data.get("pizza")), data.get("pizza_count", 1),
+                    dough.get("big_size"), dough.get("on_thick_pastry"), extras, missing,
+                    data.get("db_id"), data.get("suggestion"), data.get("dough_suggestion"), tuple(missing_other))
+
+    def _name(self, ref: ItemRef, names: Dict[int, str]) -> Optional[str]:
+        """Nazwa dla id; None, gdy id nie ma w żadnej znanej wersji katalogu."""
+        return names.get(ref) if isinstance(ref, int) else ref
+
+    def _extras(self, slot: Slot) -> List[Tuple[str, int]]:
+        extras = ((self._name(ref, self.ingredient_names), quantity) for ref, quantity in slot.extras.items())
+        return [(name, quantity) for name, quantity in extras if name is not None]
+
+    def to_dict(self, slot: Slot) -> dict:
+        pizza = self._name(slot.pizza, self.pizza_names)
+        missing = slot.missing if pizza is not None or slot.pizza is None else slot.missing | MISSING_PIZZA
+        data = {
+            "pizza": pizza,
+            "pizza_count": slot.pizza_count,
+            "dough": {"big_size": slot.big_size, "on_thick_pastry": slot.on_thick_pastry},
+            "extras": self._extras(slot),
+            "missing_info": [label for bit, label in MISSING_LABELS if missing & bit] + list(slot.missing_other),
+        }
+        if slot.db_id is not None:
+            data["db_id"] = slot.db_id
+        if slot.suggestion is not None:
+            data["suggestion"] = slot.suggestion
+        if slot.dough_suggestion is not None:
+            data["dough_suggestion"] = slot.dough_suggestion
+        return data
+
+    def summary(self, slot: Slot) -> dict:
+        """Płaski opis slotu używany w TranscriptionLog.updated_slots."""
+        return {
+            "pizza": self._name(slot.pizza, self.pizza_names),
+            "pizza_count": slot.pizza_count,
+            "big_size": slot.big_size,
+            "on_thick_pastry": slot.on_thick_pastry,
+            "extras": [f"{name}-{quantity}" for name, quantity in self._extras(slot)],
+        }
+
+    def encode(self, slots: List[dict]) -> List[Slot]:
+        return [self.from_dict(slot) for slot in slots]
+
+    def decode(self, slots: List[Slot]) -> List[dict]:
+        return [self.to_dict(slot) for slot in slots]
+
+
+def diff_slots(codec: SlotCodec, updated: List[Slot], existing: Optional[List[Slot]] = None) -> str:
+    """
+    Różnice między stanem przed i po wypowiedzi (tekst do TranscriptionLog.updated_slots).
+    Sloty równe (porównanie krotek pól) pomijamy bez budowania ich opisu.
+    """
+    existing_by_id = {slot.db_id: slot for slot in existing or ()}
+    updated_ids = set()
+    differences = []
+    for slot in updated:
+        updated_ids.add(slot.db_id)
+        before = existing_by_id.get(slot.db_id)
+        if before is None:
+            differences.append(f"Nowy slot: {codec.summary(slot)}")
+        elif before != slot:
+            old, new = codec.summary(before), codec.summary(slot)
+            for key, value in new.items():
+                if old[key] != value:
+                    differences.append(f"Zmieniona zmienna w slocie {slot.db_id}: {key} (z '{old[key]}' na '{value}')")
+    for db_id, slot in existing_by_id.items():
+        if db_id not in updated_ids:
+            differences.append(f"Slot usunięty: {codec.summary(slot)}")
+    return ", ".join(differences) if differences else "Brak zmian"
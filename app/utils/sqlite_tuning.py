@@ -0,0 +1,121 @@
+# path/filename: utils/sqlite_tuning.py
+"""
+Wbudowana baza SQLite dla wdrożeń na jednej maszynie (DATABASE_URL=sqlite:///...).
+
+Każde nowe połączenie (silnik synchroniczny i aiosqlite) dostaje te same PRAGMA:
+  - journal_mode=WAL - czytelnicy nie blokują zapisującego i odwrotnie; przy
+    rozmowach (krótkie zapisy transkrypcji, dużo odczytów menu) to podstawa,
+  - synchronous=NORMAL - w WAL bezpieczne przy awarii procesu, fsync tylko
+    przy checkpoincie zamiast przy każdym commit,
+  - busy_timeout - zapis czeka na zwolnienie blokady zamiast od razu zwracać
+    "database is locked" (zapisujący jest w danej chwili tylko jeden),
+  - foreign_keys=ON - inaczej SQLite ignoruje ondelete="CASCADE" z modeli,
+  - cache_size / mmap_size / temp_store - menu i indeksy mieszczą się w pamięci.
+
+Schemat nowej bazy tworzymy z modeli i oznaczamy w alembic_version jako head
+(create_schema) - stare migracje zmieniają kolumny w sposób, którego SQLite nie
+obsługuje (ALTER constraint, typy ENUM Postgresa). Nowe migracje idą przez
+`alembic upgrade head` jak na Postgresie, w trybie batch (alembic/env.py).
+"""
+import fcntl
+import os
+import re
+
+from sqlalchemy import event, inspect
+from sqlalchemy.engine import Engine, make_url
+
+
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+SQLITE_CACHE_SIZE_MB = int(os.getenv("SQLITE_CACHE_SIZE_MB", "64"))
+SQLITE_MMAP_SIZE_MB = int(os.getenv("SQLITE_MMAP_SIZE_MB", "256"))
+SQLITE_SEED_FILE = os.getenv("SQLITE_SEED_FILE", "")
+
+ALEMBIC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "alembic")
+_REVISION = re.compile(r"^revision(?::[^=]*)?=\s*['\"](\w+)['\"]", re.MULTILINE)
+_DOWN_REVISION = re.compile(r"^down_revision(?::[^=]*)?=\s*(.+)$", re.MULTILINE)
+_QUOTED = re.compile(r"['\"](\w+)['\"]")
+
+PRAGMAS = (
+    ("journal_mode", "WAL"),
+    ("synchronous", SQLITE_SYNCHRONOUS),
+    ("busy_timeout", str(SQLITE_BUSY_TIMEOUT_MS)),
+    ("foreign_keys", "ON"),
+    ("cache_size", str(-SQLITE_CACHE_SIZE_MB * 1024)),  # ujemna wartość = KiB, nie strony
+    ("mmap_size", str(SQLITE_MMAP_SIZE_MB * 1024 * 1024)),
+    ("temp_store", "MEMORY"),
+)
+
+
+def is_sqlite(url: str) -> bool:
+    return make_url(url).get_backend_name() == "sqlite"
+
+
+def _set_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    try:
+        for name, value in PRAGMAS:
+            cursor.execute(f"PRAGMA {name}={value}")
+    finally:
+        cursor.close()
+
+
+def install(engine: Engine):
+    """PRAGMA na każdym nowym połączeniu; dla silnika async podajemy async_engine.sync_engine."""
+    event.listen(engine, "connect", _set_pragmas)
+
+
+def alembic_head(versions_dir: str = os.path.join(ALEMBIC_DIR, "versions")) -> str:
+    """
+    Rewizja head z plików migracji. Bez importu alembic: katalog alembic/ w korzeniu
+    repozytorium ma __init__.py i przy cwd na sys.path przesłania pakiet.
+    """
+    revisions, parents = set(), set()
+    for filename in os.listdir(versions_dir):
+        if not filename.endswith(".py"):
+            continue
+        with open(os.path.join(versions_dir, filename), encoding="utf-8") as f:
+            source = f.read()
+        revision = _REVISION.search(source)
+        if revision is None:
+            continue
+        revisions.add(revision.group(1))
+        down_revision = _DOWN_REVISION.search(source)
+        if down_revision is not None:
+            parents.update(_QUOTED.findall(down_revision.group(1)))
+    heads = revisions - parents
+    if len(heads) != 1:
+        raise RuntimeError(f"Expected one alembic head, found {sorted(heads)}")
+    return heads.pop()
+
+
+def create_schema(engine: Engine, seed_file: str = "") -> bool:
+    """
+    Pusta baza -> tabele z modeli (+ opcjonalnie dane z `seed_file`, np. init_db.sql)
+    i alembic_version = head, żeby kolejne migracje stosowały się normalnie.
+    Bazę z istniejącym schematem zostawia bez zmian. Kilka workerów startujących
+    naraz serializuje blokada pliku obok bazy.
+    """
+    from app.database import Base
+    import app.models  # noqa: F401 - rejestruje tabele w Base.metadata
+
+    with open(f"{engine.url.database}.init-lock", "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        if inspect(engine).has_table("alembic_version"):
+            return False
+        Base.metadata.create_all(engine)
+        if seed_file:
+            with open(seed_file, encoding="utf-8") as f:
+                script = f.read()
+            connection = engine.raw_connection()
+            try:
+                connection.driver_connection.executescript(f"BEGIN;\n{script}\nCOMMIT;")
+            except Exception:
+                connection.driver_connection.rollback()
+                raise
+            finally:
+                connection.close()
+        with engine.begin() as connection:
+            connection.exec_driver_sql("CREATE TABLE alembic_version (version_num VARCHAR(32) NOT NULL PRIMARY KEY)")
+            connection.exec_driver_sql("INSERT INTO alembic_version (version_num) VALUES (?)", (alembic_head(),))
+        return True
@@ -0,0 +1,76 @@
+# path/filename: utils/stack_sampler.py
+"""
+Próbkujący profiler stosów dla działającego workera.
+
+Przez zadany czas co `interval` sekund zrzucamy stosy wszystkich wątków
+(sys._current_frames()) i zliczamy je w formacie "collapsed" (jedna linia:
+"wątek;ramka;ramka;...;liść liczba"), który bezpośrednio przyjmują
+flamegraph.pl, speedscope czy inferno. Nic nie instalujemy w interpreterze
+(ani setprofile, ani sygnałów), więc poza sesją profilowania koszt jest zerowy,
+a w trakcie - jeden wątek budzący się co kilka milisekund.
+"""
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Dict, Optional
+
+
+PROFILE_MAX_SECONDS = float(os.getenv("PROFILE_MAX_SECONDS", "60"))
+PROFILE_MIN_INTERVAL = 0.001
+
+_running = threading.Lock()
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    path = code.co_filename.replace("\\", "/").split("/")
+    return f"{'/'.join(path[-2:])}:{code.co_name}"
+
+
+def _collapse(frame, thread_name: str) -> str:
+    labels = []
+    while frame is not None:
+        labels.append(_frame_label(frame))
+        frame = frame.f_back
+    labels.append(thread_name)
+    return ";".join(reversed(labels))
+
+
+class ProfilerBusy(Exception):
+    pass
+
+
+def sample(seconds: float, interval: float = 0.005) -> Dict[str, object]:
+    """
+    Blokuje na `seconds` (wołać z puli wątków). Zwraca {"stacks": Counter, "samples": n, ...}.
+    Naraz może działać tylko jedna sesja - inaczej ProfilerBusy.
+    """
+    seconds = min(max(seconds, 0.0), PROFILE_MAX_SECONDS)
+    interval = max(interval, PROFILE_MIN_INTERVAL)
+    if not _running.acquire(blocking=False):
+        raise ProfilerBusy()
+    try:
+        own_id = threading.get_ident()
+        stacks: Counter = Counter()
+        samples = 0
+        started = time.perf_counter()
+        deadline = started + seconds
+        while time.perf_counter() < deadline:
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id != own_id:
+                    stacks[_collapse(frame, names.get(thread_id, str(thread_id)))] += 1
+            samples += 1
+            time.sleep(interval)
+        return {"stacks": stacks, "samples": samples, "seconds": time.perf_counter() - started, "interval": interval}
+    finally:
+        _running.release()
+
+
+def collapsed(stacks: Counter, thread: Optional[str] = None) -> str:
+    """Tekst do flamegraph.pl / speedscope; opcjonalnie tylko wątki o nazwie zaczynającej się od `thread`."""
+    lines = [f"{stack} {count}" for stack, count in stacks.most_common()
+             if thread is None or stack.startswith(thread)]
+    return "\n".join(lines) + "\n"
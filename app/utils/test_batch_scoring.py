@@ -0,0 +1,31 @@
+from fuzzywuzzy import fuzz
+
+from app.utils import batch_scoring
+
+
+NAMES = ["margherita", "pepperoni", "wegetariańska", "hawajska", "capriciosa", "cztery sery"]
+QUERIES = ["margerita", "peperoni", "hawajską", "kapriczioza", "sery", "cola", "z", "dużą", "wiejską"]
+
+
+def _pairwise(query, names):
+    best_score, best_name = 0, None
+    for name in names:
+        score = fuzz.ratio(query, name)
+        if score > best_score:
+            best_score, best_name = score, name
+    return (best_name, best_score)
+
+
+def test_matrix_matches_pairwise_fuzzywuzzy():
+    matrix = batch_scoring.ScoreMatrix(QUERIES, NAMES)
+    for query in QUERIES:
+        assert matrix.best(query) == _pairwise(query, NAMES)
+
+
+def test_best_match_only_inside_scoring_block():
+    assert batch_scoring.best_match("margerita", NAMES) is None
+    with batch_scoring.scoring(QUERIES, NAMES):
+        assert batch_scoring.best_match("margerita", NAMES) == _pairwise("margerita", NAMES)
+        assert batch_scoring.best_match("spoza wypowiedzi", NAMES) is None
+        assert batch_scoring.best_match("margerita", list(NAMES)) is None
+    assert batch_scoring.best_match("margerita", NAMES) is None
@@ -0,0 +1,120 @@
+import pytest
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session
+
+from app.models import AdditionalIngredient, Client, Dough, Ingredient, Order, OrderPizzas, Pizza
+from app.utils import caller_profiles, sqlite_tuning
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    engine = create_engine(f"sqlite:///{tmp_path / 'pizzeria.db'}")
+    sqlite_tuning.install(engine)
+    sqlite_tuning.create_schema(engine)
+    monkeypatch.setattr(caller_profiles, "CALLER_PROFILES", caller_profiles.OrderedDict())
+    with Session(engine) as session:
+        yield session
+    engine.dispose()
+
+
+def _item(db, order, pizza, dough, quantity=1, extras=()):
+    item = OrderPizzas(order_id=order.id, pizza_id=pizza and pizza.id, dough_id=dough and dough.id,
+                       quantity=quantity, is_partial=pizza is None)
+    db.add(item)
+    db.flush()
+    for ingredient, extra_quantity in extras:
+        db.add(AdditionalIngredient(order_pizza_id=item.id, ingredient_id=ingredient.id, quantity=extra_quantity))
+    db.flush()
+    return item
+
+
+def _extras(db, item_id):
+    return db.execute(
+        select(Ingredient.name, AdditionalIngredient.quantity)
+        .join(Ingredient, Ingredient.id == AdditionalIngredient.ingredient_id)
+        .where(AdditionalIngredient.order_pizza_id == item_id)
+        .order_by(Ingredient.name)
+    ).all()
+
+
+def test_is_reorder_request():
+    assert caller_profiles.is_reorder_request("Dzień dobry, poproszę to samo co ostatnio.")
+    assert caller_profiles.is_reorder_request("Jak zwykle, dziękuję")
+    assert not caller_profiles.is_reorder_request("Jak zwykle, ale z pieczarkami")
+    assert not caller_profiles.is_reorder_request("Poproszę dużą margheritę")
+
+
+def test_reorder_copies_complete_items_with_their_extras(db):
+    margherita, capriciosa = Pizza(name="Margherita"), Pizza(name="Capriciosa")
+    small = Dough(big_size=False, on_thick_pastry=False, price=0)
+    big = Dough(big_size=True, on_thick_pastry=True, price=5)
+    ham = Ingredient(name="Szynka", category="mięso", price=4)
+    mushrooms = Ingredient(name="Pieczarki", category="warzywa", price=3)
+    client = Client(phone="600700800")
+    db.add_all([margherita, capriciosa, small, big, ham, mushrooms, client])
+    db.flush()
+    source, other, target = (Order(client_id=client.id) for _ in range(3))
+    db.add_all([source, other, target])
+    db.flush()
+
+    _item(db, source, margherita, small, quantity=2, extras=[(ham, 2)])
+    _item(db, other, capriciosa, big, extras=[(mushrooms, 5)])  # id pomiędzy pozycjami źródła
+    _item(db, source, None, None)  # niekompletna pozycja nie jest kopiowana
+    _item(db, source, capriciosa, big, extras=[(mushrooms, 1), (ham, 1)])
+    _item(db, source, margherita, big)
+    _item(db, target, capriciosa, small)  # pozycja złożona w tej rozmowie przed "to samo co ostatnio"
+    db.commit()
+
+    new_ids = caller_profiles.reorder_previous_order(db, source.id, target.id)
+    assert len(new_ids) == 3
+    copied = db.execute(select(OrderPizzas.id, OrderPizzas.pizza_id, OrderPizzas.dough_id, OrderPizzas.quantity,
+                               OrderPizzas.is_partial)
+                        .where(OrderPizzas.id.in_(new_ids)).order_by(OrderPizzas.id)).all()
+    assert [tuple(row[1:]) for row in copied] == [(margherita.id, small.id, 2, False),
+                                                  (capriciosa.id, big.id, 1, False),
+                                                  (margherita.id, big.id, 1, False)]
+    assert [_extras(db, item_id) for item_id in new_ids] == [[("Szynka", 2)], [("Pieczarki", 1), ("Szynka", 1)], []]
+
+    slots = caller_profiles.reorder_last_order(db, target)  # ostatnie inne zamówienie klienta to `other`
+    assert [(slot["pizza"], slot["extras"]) for slot in slots] == [("capriciosa", [("pieczarki", 5)])]
+    assert _extras(db, slots[0]["db_id"]) == [("Pieczarki", 5)]
+
+
+def test_profile_skips_current_order_on_every_read_and_expires(db, monkeypatch):
+    margherita = Pizza(name="Margherita")
+    small = Dough(big_size=False, on_thick_pastry=False, price=0)
+    client = Client(phone="600700900")
+    db.add_all([margherita, small, client])
+    db.flush()
+    first, second = Order(client_id=client.id), Order(client_id=client.id)
+    db.add_all([first, second])
+    db.flush()
+    _item(db, first, margherita, small)
+    _item(db, second, margherita, small, quantity=2)
+    db.commit()
+
+    # rozgrzany z wykluczeniem `first`, czytany przez rozmowę o `second`
+    caller_profiles.warm_caller_profile(db, client, exclude_order_id=first.id)
+    profile = caller_profiles.get_caller_profile(db, client, exclude_order_id=second.id)
+    assert [order["order_id"] for order in profile["recent_orders"]] == [first.id]
+
+    third = Order(client_id=client.id)
+    db.add(third)
+    db.flush()
+    _item(db, third, margherita, small, quantity=3)
+    db.commit()
+    assert second.id in [order["order_id"] for order in caller_profiles.get_caller_profile(db, client)["recent_orders"]]
+    caller_profiles.invalidate_caller_profile(db, third.id)
+    assert client.phone not in caller_profiles.CALLER_PROFILES
+    profile = caller_profiles.get_caller_profile(db, client)
+    assert [order["order_id"] for order in profile["recent_orders"]] == [third.id, second.id, first.id]
+
+    monkeypatch.setattr(caller_profiles, "PROFILE_TTL_SECONDS", 0)
+    fourth = Order(client_id=client.id)
+    db.add(fourth)
+    db.flush()
+    _item(db, fourth, margherita, small)
+    db.commit()
+    profile = caller_profiles.get_caller_profile(db, client, exclude_order_id=fourth.id)
+    assert [order["order_id"] for order in profile["recent_orders"]] == [third.id, second.id, first.id]
+    assert caller_profiles.get_caller_profile(db, client)["recent_orders"][0]["order_id"] == fourth.id
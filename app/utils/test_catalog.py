@@ -0,0 +1,19 @@
+from app.utils import catalog
+from app.utils.catalog import MenuCatalog
+
+
+def test_refresh_serves_current_catalog_and_keeps_newest(monkeypatch):
+    monkeypatch.setattr(catalog, "_catalog", None)
+    monkeypatch.setattr(catalog, "_refresh_started", 0.0)
+    assert catalog.current_catalog() is None
+    first = catalog.publish_catalog(MenuCatalog([(1, "Margherita")], []))
+    assert catalog.current_catalog() is first
+
+    monkeypatch.setattr(catalog, "CATALOG_TTL_SECONDS", 0)
+    older = MenuCatalog([(1, "Margherita"), (2, "Hawajska")], [])
+    assert catalog.current_catalog() is None  # ten wołający wczytuje nowy katalog
+    assert catalog.current_catalog() is first  # pozostali w tym czasie dostają dotychczasowy
+    newer = MenuCatalog([(1, "Margherita"), (3, "Wiejska")], [])
+    assert catalog.publish_catalog(newer) is newer
+    assert catalog.publish_catalog(older) is newer  # spóźniony, starszy odczyt nie nadpisuje nowszego
+    assert catalog.publish_catalog(MenuCatalog([(1, "Margherita"), (3, "Wiejska")], [])) is newer
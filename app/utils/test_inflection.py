@@ -0,0 +1,39 @@
+from types import SimpleNamespace
+
+from app.routers.analyze_order import _assign_extras_trigram
+from app.utils.inflection import build_form_index, inflect
+
+
+def test_inflect_covers_common_cases():
+    assert {"margheritę", "margherity", "margheritą"} <= inflect("margherita")
+    assert {"pieczarkami", "pieczarkach", "pieczarek", "pieczarka"} <= inflect("pieczarki")
+    assert {"kurczakiem", "kurczaka"} <= inflect("kurczak")
+    assert inflect("pepperoni") == {"pepperoni"}
+
+
+def test_form_index_resolves_forms_to_catalog_names():
+    index = build_form_index([(1, "Pieczarki"), (2, "Papryka"), (3, "Pomidor")])
+    assert list(index) == ["pieczarki", "papryka", "pomidor"]
+    assert index.lookup("Pieczarkami") == "pieczarki"
+    assert index.lookup("papryką") == "papryka"
+    assert index.lookup("pomidorów") == "pomidor"
+    assert index.lookup("pieczrki") is None
+
+
+def test_ambiguous_forms_are_left_to_fuzzy():
+    index = build_form_index([(1, "Oliwka"), (2, "Oliwki")])
+    assert index.lookup("oliwki") == "oliwki"
+    assert index.lookup("oliwką") is None
+
+
+def test_trigram_conjunction_resolves_both_ingredients():
+    index = build_form_index([(1, "Szynka"), (2, "Pieczarki"), (3, "Cebula")])
+    tokens = [SimpleNamespace(text=text, lemma_=lemma, like_num=False)
+              for text, lemma in (("z", "z"), ("szynką", "szynka"), ("i", "i"), ("pieczarkami", "pieczarka"))]
+    slot = {"extras": []}
+    _assign_extras_trigram(tokens, [slot], index, {"extras": []})
+    assert set(slot["extras"]) == {("szynka", 1), ("pieczarki", 1)}
+
+    slot = {"extras": []}
+    _assign_extras_trigram(tokens[:3], [slot], index, {"extras": []})  # "z szynką i" na końcu wypowiedzi
+    assert slot["extras"] == [("szynka", 1)]
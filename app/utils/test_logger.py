@@ -0,0 +1,41 @@
+import json
+import logging
+import queue
+
+from app.utils import logger
+
+
+def _record(message="Zamówienie %s", *args, **extra):
+    record = logging.LogRecord("app.test", logging.INFO, __file__, 1, message, args or (7,), None)
+    record.__dict__.update(extra)
+    return record
+
+
+def test_json_record_carries_context_and_extra():
+    handler = logger._BoundedQueueHandler(queue.Queue(maxsize=10))
+    handler.addFilter(logger._ContextFilter())
+    request_token = logger.request_id_var.set("req-1")
+    conversation_token = logger.conversation_id_var.set("conv-1")
+    try:
+        handler.handle(_record(trace={"event": "number", "value": 2}))
+    finally:
+        logger.request_id_var.reset(request_token)
+        logger.conversation_id_var.reset(conversation_token)
+    line = json.loads(logger.JsonFormatter().format(handler.queue.get_nowait()))
+    assert line["message"] == "Zamówienie 7"
+    assert line["request_id"] == "req-1" and line["conversation_id"] == "conv-1"
+    assert line["trace"] == {"event": "number", "value": 2}
+
+
+def test_full_queue_drops_instead_of_blocking():
+    handler = logger._BoundedQueueHandler(queue.Queue(maxsize=2))
+    dropped = logger.LOG_STATS["dropped"]
+    for _ in range(5):
+        handler.handle(_record())
+    assert handler.queue.qsize() == 2
+    assert logger.LOG_STATS["dropped"] == dropped + 3
+
+
+def test_levels_from_environment_spec():
+    assert logger._parse_levels("app.routers.analyze_order=debug, sqlalchemy.engine=WARNING,,bad") == {
+        "app.routers.analyze_order": "DEBUG", "sqlalchemy.engine": "WARNING"}
@@ -0,0 +1,97 @@
+from types import SimpleNamespace
+
+from app.routers.analyze_order import _assign_extras_trigram, _create_slot, match_pizza_by_ingredients, validate_dough
+from app.utils.catalog import MenuCatalog
+from app.utils.menu_bitsets import DoughCompatibility, IngredientIndex
+from app.utils.slot_model import DOUGH_NOT_AVAILABLE
+
+
+PIZZAS = [(1, "Margherita"), (2, "Capriciosa"), (3, "Wiejska"), (4, "Hawajska")]
+INGREDIENTS = [(1, "Pomidor"), (2, "Mozzarella"), (3, "Szynka"), (4, "Pieczarki"), (5, "Boczek"), (6, "Ananas")]
+RECIPES = {1: [1, 2], 2: [1, 2, 3, 4], 3: [1, 2, 3, 4, 5], 4: [1, 2, 3, 6]}
+DOUGHS = [(1, False, False), (2, False, True), (3, True, False), (4, True, True)]
+PIZZA_DOUGHS = {1: [1, 3], 2: [4]}
+
+
+def _slot(extras):
+    return {"pizza": None, "pizza_count": 1, "dough": {"big_size": True, "on_thick_pastry": None},
+            "extras": extras, "missing_info": ["Nazwa pizzy", "Grubość ciasta"]}
+
+
+def test_intersection_ranks_by_recipe_coverage():
+    index = IngredientIndex.build(MenuCatalog(PIZZAS, INGREDIENTS, RECIPES))
+    assert index.pizzas_with(["szynka", "pieczarki"]) == [("capriciosa", 0.5), ("wiejska", 0.4)]
+    assert index.pizzas_with(["ananas"]) == [("hawajska", 0.25)]
+    assert index.pizzas_with(["ananas", "boczek"]) == []
+    assert index.pizzas_with(["kawior"]) == []
+
+
+def test_pizzas_outside_menu_are_skipped():
+    index = IngredientIndex.build(MenuCatalog(PIZZAS, INGREDIENTS, RECIPES, menu_pizza_ids={1, 2, 3}))
+    assert index.pizzas_with(["ananas"]) == []
+
+
+def test_slot_gets_pizza_or_suggestion():
+    index = IngredientIndex.build(MenuCatalog(PIZZAS, INGREDIENTS, RECIPES))
+    slot = _slot([("szynka", 2), ("boczek", 1)])
+    assert match_pizza_by_ingredients(slot, index)
+    assert slot["pizza"] == "wiejska"
+    assert slot["extras"] == [("szynka", 1)]
+    assert slot["missing_info"] == ["Grubość ciasta"]
+
+    slot = _slot([("szynka", 1), ("pieczarki", 1)])
+    assert match_pizza_by_ingredients(slot, index)
+    assert slot["pizza"] is None
+    assert slot["suggestion"]["pizza"] == "capriciosa"
+    assert slot["suggestion"]["alternatives"] == ["wiejska"]
+
+
+def _tokens(*pairs):
+    return [SimpleNamespace(text=text, lemma_=lemma, like_num=False) for text, lemma in pairs]
+
+
+def test_explicitly_ordered_extras_stay_on_top_of_the_recipe():
+    index = IngredientIndex.build(MenuCatalog(PIZZAS, INGREDIENTS, RECIPES))
+    ingredients = [name.lower() for _, name in INGREDIENTS]
+
+    slot, explicit = _create_slot(), {}
+    tokens = _tokens(("pizza", "pizza"), ("z", "z"), ("dodatkowym", "dodatkowy"), ("ananasem", "ananas"))
+    _assign_extras_trigram(tokens, [slot], ingredients, {"extras": []}, explicit=explicit)
+    assert slot["extras"] == [("ananas", 1)] and explicit == {id(slot): {("ananas", 1): 1}}
+    assert not match_pizza_by_ingredients(slot, index, [("ananas", 1)])  # dodatek nie wybiera hawajskiej
+    assert slot["pizza"] is None and slot["extras"] == [("ananas", 1)]
+
+    slot = _slot([("szynka", 2), ("ananas", 1), ("szynka", 1)])
+    assert match_pizza_by_ingredients(slot, index, [("szynka", 1)])
+    assert slot["pizza"] == "hawajska"
+    assert slot["extras"] == [("szynka", 1), ("szynka", 1)]  # z przepisu zdjęta jedna, dodatkowa zostaje
+
+
+def test_scales_to_large_menus():
+    pizzas = [(i, f"Pizza {i}") for i in range(1, 801)]
+    recipes = {i: [1, 2] + ([3] if i % 2 else []) + ([4] if i % 5 == 0 else []) for i in range(1, 801)}
+    index = IngredientIndex.build(MenuCatalog(pizzas, INGREDIENTS, recipes))
+    found = index.pizzas_with(["szynka", "pieczarki"])
+    assert len(found) == 80
+    assert all(int(name.split()[1]) % 10 == 5 for name, _ in found)
+
+
+def test_dough_compatibility():
+    compatibility = DoughCompatibility.build(MenuCatalog(PIZZAS, INGREDIENTS, RECIPES, doughs=DOUGHS,
+                                                         pizza_doughs=PIZZA_DOUGHS))
+    assert compatibility.allowed("margherita", True, False)
+    assert compatibility.allowed("margherita", None, False)
+    assert not compatibility.allowed("margherita", None, True)
+    assert compatibility.allowed("wiejska", False, True)  # bez wpisów w pizza_doughs
+    assert compatibility.alternative("margherita", True, True) == {"big_size": True, "on_thick_pastry": False}
+    assert compatibility.alternative("capriciosa", False, False) == {"big_size": True, "on_thick_pastry": True}
+
+
+def test_validate_dough_marks_slot():
+    compatibility = DoughCompatibility.build(MenuCatalog(PIZZAS, INGREDIENTS, RECIPES, doughs=DOUGHS,
+                                                         pizza_doughs=PIZZA_DOUGHS))
+    slot = _slot([])
+    slot.update(pizza="margherita", missing_info=[], dough={"big_size": False, "on_thick_pastry": True})
+    validate_dough(slot, compatibility)
+    assert slot["missing_info"] == [DOUGH_NOT_AVAILABLE]
+    assert slot["dough_suggestion"] == {"big_size": False, "on_thick_pastry": False}
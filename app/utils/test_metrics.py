@@ -0,0 +1,23 @@
+from starlette.routing import Route
+
+from app.utils import metrics
+
+
+def test_histogram_renders_cumulative_buckets():
+    histogram = metrics.Histogram("test_stage_seconds", "Test.", ("stage",), buckets=(0.01, 0.1))
+    for value in (0.005, 0.01, 0.05, 2.0):
+        histogram.observe(value, "merge")
+    lines = [line for line in metrics.render().splitlines() if line.startswith("test_stage_seconds")]
+    assert lines == [
+        'test_stage_seconds_bucket{stage="merge",le="0.01"} 2',
+        'test_stage_seconds_bucket{stage="merge",le="0.1"} 3',
+        'test_stage_seconds_bucket{stage="merge",le="+Inf"} 4',
+        'test_stage_seconds_sum{stage="merge"} 2.065',
+        'test_stage_seconds_count{stage="merge"} 4',
+    ]
+
+
+def test_route_label_restores_router_prefix():
+    route = Route("/summary/{order_id}", endpoint=lambda request: None)
+    assert metrics.route_label({"path": "/orders/summary/15", "route": route}) == "/orders/summary/{order_id}"
+    assert metrics.route_label({"path": "/wp-login.php"}) == "unmatched"
@@ -0,0 +1,92 @@
+import pytest
+
+from app.utils import parse_cache
+
+
+SLOTS = [{"pizza": "margherita", "pizza_count": 1, "dough": {"big_size": True, "on_thick_pastry": False},
+          "extras": [("pieczarki", 1)], "missing_info": []}]
+
+
+@pytest.fixture(autouse=True)
+def isolated_cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(parse_cache, "PARSE_CACHE_PATH", str(tmp_path / "parse_cache.sqlite3"))
+    monkeypatch.setattr(parse_cache, "_disk_enabled", True)
+    monkeypatch.setattr(parse_cache, "_local", parse_cache.threading.local())
+    monkeypatch.setattr(parse_cache, "_current_version", None)
+    monkeypatch.setattr(parse_cache, "PARSE_CACHE_STATS", dict.fromkeys(parse_cache.PARSE_CACHE_STATS, 0))
+    parse_cache._memory.clear()
+    yield
+    parse_cache._memory.clear()
+
+
+def test_hit_after_put_with_normalized_text():
+    assert parse_cache.get("v1", "Dużą  Margheritę") is None
+    parse_cache.put("v1", "Dużą  Margheritę", SLOTS)
+    assert parse_cache.get("v1", "dużą margheritę ") == SLOTS
+    stats = parse_cache.get_parse_cache_stats()
+    assert (stats["memory_hits"], stats["misses"]) == (1, 1)
+
+
+def test_copy_on_read():
+    parse_cache.put("v1", "margherita", SLOTS)
+    first = parse_cache.get("v1", "margherita")
+    first[0]["extras"].append(("szynka", 2))
+    first[0]["dough"]["big_size"] = None
+    assert parse_cache.get("v1", "margherita") == SLOTS
+
+
+def test_disk_tier_survives_memory_eviction():
+    parse_cache.put("v1", "margherita", SLOTS)
+    parse_cache._memory.clear()
+    assert parse_cache.get("v1", "margherita") == SLOTS
+    assert parse_cache.get_parse_cache_stats()["disk_hits"] == 1
+
+
+def test_lru_is_bounded(monkeypatch):
+    monkeypatch.setattr(parse_cache, "PARSE_CACHE_SIZE", 2)
+    for text in ("a", "b", "c"):
+        parse_cache.put("v1", text, SLOTS)
+    assert [key[1] for key in parse_cache._memory] == ["b", "c"]
+
+
+def test_menu_change_invalidates_both_tiers():
+    parse_cache.put("v1", "margherita", SLOTS)
+    assert parse_cache.get("v2", "margherita") is None
+    assert parse_cache.get("v1", "margherita") is None
+    assert parse_cache.get_parse_cache_stats()["invalidations"] == 2
+
+
+def test_disk_tier_is_bounded(monkeypatch):
+    monkeypatch.setattr(parse_cache, "PARSE_CACHE_DISK_MAX", 2)
+    monkeypatch.setattr(parse_cache, "PARSE_CACHE_TRIM_EVERY", 1)
+    for text in ("a", "b", "c"):
+        parse_cache.put("v1", text, SLOTS)
+    parse_cache._memory.clear()
+    assert [parse_cache.get("v1", text) is not None for text in ("a", "b", "c")] == [False, True, True]
+    assert parse_cache.get_parse_cache_stats()["disk_evictions"] == 1
+
+
+def test_cleanup_keeps_other_profiles_and_newer_versions(monkeypatch):
+    def switch(profile: str):
+        monkeypatch.setattr(parse_cache, "NLP_PROFILE", profile)
+        monkeypatch.setattr(parse_cache, "_current_version", None)  # osobny proces z tym samym plikiem
+        parse_cache._memory.clear()
+
+    parse_cache.put("v1", "margherita", SLOTS)
+    parse_cache.put("v2", "margherita", SLOTS)
+    profile = parse_cache.NLP_PROFILE
+    switch("other")
+    parse_cache.put("v1", "margherita", SLOTS)
+    switch(profile)
+    assert parse_cache.get("v1", "margherita") is None  # worker na starym menu nie kasuje nowszego
+    parse_cache._memory.clear()
+    assert parse_cache.get("v2", "margherita") == SLOTS
+    switch("other")
+    assert parse_cache.get("v1", "margherita") == SLOTS
+
+
+def test_parser_code_change_misses_old_entries(monkeypatch):
+    parse_cache.put("v1", "margherita", SLOTS)
+    parse_cache._memory.clear()
+    monkeypatch.setattr(parse_cache, "parser_code_version", lambda: "new-parser")
+    assert parse_cache.get("v1", "margherita") is None
@@ -0,0 +1,46 @@
+import os
+
+from app.test_analyze_pizza_order import example_orders_by_chat_gpt
+from app.utils.parser_corpus import CorpusScore, align, anonymize, load_corpus, load_menu
+
+
+CORPUS_DIR = os.path.join(os.path.dirname(__file__), "..", "benchmarks", "corpus")
+
+
+def _slot(pizza, big_size=None, on_thick_pastry=None, extras=(), pizza_count=1):
+    return {"pizza": pizza, "pizza_count": pizza_count, "big_size": big_size, "on_thick_pastry": on_thick_pastry,
+            "extras": [list(extra) for extra in extras]}
+
+
+def test_alignment_and_field_scores():
+    expected = [_slot("Margherita", True, False), _slot("Pepperoni", False, None, [("Ser", 2)])]
+    predicted = [_slot("pepperoni", None, None, [("ser", 1), ("ser", 1)]), _slot("margherita", True, True)]
+    assert align(expected, predicted) == [(0, 1), (1, 0)]
+
+    score = CorpusScore()
+    errors = score.add(expected, predicted)
+    report = score.report()
+    assert report["fields"]["pizza"]["f1"] == 1.0
+    assert report["fields"]["extras"]["precision"] == 1.0  # duplikaty dodatków się sumują
+    assert report["fields"]["big_size"]["recall"] == 0.5  # None w predykcji to brak, nie błąd
+    assert report["fields"]["on_thick_pastry"]["precision"] == 0.0
+    assert report["slots"]["precision"] == 0.0 and len(errors) == 2
+
+    score.add([_slot("Hawajska")], [])
+    assert score.report()["slots"]["support"] == 3
+
+
+def test_corpus_labels_match_menu_and_examples():
+    entries = load_corpus(os.path.join(CORPUS_DIR, "orders.jsonl"))
+    catalog = load_menu(os.path.join(CORPUS_DIR, "menu.json"))
+    texts = {entry["turns"][0] for entry in entries}
+    assert set(example_orders_by_chat_gpt) <= texts
+    for entry in entries:
+        for slot in entry["expected"]:
+            assert slot["pizza"] is None or slot["pizza"].lower() in catalog.pizza_names, entry["id"]
+            assert all(name.lower() in catalog.ingredient_names for name, _ in slot["extras"]), entry["id"]
+
+
+def test_anonymize_contact_details():
+    text = "Dwie duże, adres ul. Długa 12/4, telefon 600 700 800, mail jan.kowalski@example.com."
+    assert anonymize(text) == "Dwie duże, adres <adres>, telefon <telefon>, mail <email>."
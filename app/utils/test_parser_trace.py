@@ -0,0 +1,39 @@
+import logging
+
+from app.utils import parser_trace
+
+
+def test_disabled_by_default():
+    with parser_trace.tracing("abc") as trace:
+        assert trace is None
+        assert parser_trace.current() is None
+
+
+def test_explanation_maps_rules_to_returned_slots():
+    first, second, dropped = {"pizza": None}, {"pizza": None}, {"pizza": None}
+    with parser_trace.tracing(explain=True) as trace:
+        assert parser_trace.current() is trace and parser_trace.explaining()
+        trace.rule(second, "pizza", "hawajska", "pizza_name", "hawajską")
+        trace.rule(None, "big_size", True, "size_synonym", "dużą")
+        trace.rule(dropped, "pizza_count", 2, "count_before_name", "dwie")
+        trace.rule(first, "big_size", True, "common_attributes")
+    assert parser_trace.current() is None
+    assert trace.explanation([first, second]) == [
+        {"slot": 1, "field": "pizza", "value": "hawajska", "rule": "pizza_name", "token": "hawajską"},
+        {"slot": "common", "field": "big_size", "value": True, "rule": "size_synonym", "token": "dużą"},
+        {"slot": 0, "field": "big_size", "value": True, "rule": "common_attributes", "token": None},
+    ]
+
+
+def test_debug_sampling_is_per_conversation(monkeypatch, caplog):
+    monkeypatch.setattr(parser_trace, "PARSER_TRACE_SAMPLE_RATE", 0.5)
+    caplog.set_level(logging.DEBUG, logger=parser_trace.log.name)
+    decisions = {}
+    for conversation_id in (f"call-{n}" for n in range(200)):
+        with parser_trace.tracing(conversation_id) as first, parser_trace.tracing(conversation_id) as again:
+            assert (first is None) == (again is None)
+            decisions[conversation_id] = first is not None
+            if first is not None:
+                first.event("number", token="dwie", value=2)
+    assert 60 < sum(decisions.values()) < 140
+    assert caplog.records[0].trace["event"] == "number"
@@ -0,0 +1,76 @@
+import pytest
+
+from app.utils.inflection import build_form_index
+from app.utils.phonetic import phonetic_key
+
+
+PIZZAS = [(1, "Margherita"), (2, "Pepperoni"), (3, "Wegetariańska"), (4, "Hawajska"), (5, "Capriciosa"),
+          (6, "Quattro Formaggi"), (7, "Prosciutto e Funghi")]
+INGREDIENTS = [(1, "Pomidor"), (2, "Mozzarella"), (3, "Bazylia"), (4, "Salami"), (5, "Pieczarki"),
+               (6, "Parmezan"), (7, "Kurczak"), (8, "Szynka"), (9, "Ananas"), (10, "Oliwki"),
+               (11, "Papryka"), (12, "Kukurydza"), (13, "Pancetta"), (14, "Rzodkiewka")]
+
+# (co zapisało ASR, czego oczekujemy z katalogu)
+MISHEARD_PIZZAS = [
+    ("kapriczioza", "capriciosa"),
+    ("kapricioza", "capriciosa"),
+    ("capricioza", "capriciosa"),
+    ("pepperony", "pepperoni"),
+    ("peperoni", "pepperoni"),
+    ("peperony", "pepperoni"),
+    ("margerita", "margherita"),
+    ("margeritę", "margherita"),
+    ("margerite", "margherita"),
+    ("hawajskom", "hawajska"),
+    ("hawaiska", "hawajska"),
+    ("hawajsko", None),
+    ("wegetarianska", "wegetariańska"),
+    ("wegetariańskom", "wegetariańska"),
+    ("kwatro formadżi", "quattro formaggi"),
+    ("proszuto e fungi", "prosciutto e funghi"),
+]
+MISHEARD_INGREDIENTS = [
+    ("mocarella", "mozzarella"),
+    ("mocarelą", "mozzarella"),
+    ("pieczarky", "pieczarki"),
+    ("pieczarkamy", "pieczarki"),
+    ("kurczag", "kurczak"),
+    ("szynkom", "szynka"),
+    ("oliwky", "oliwki"),
+    ("bazylja", "bazylia"),
+    ("salammi", "salami"),
+    ("annanas", "ananas"),
+    ("paprika", "papryka"),
+    ("parmezam", None),
+    ("kukuryca", "kukurydza"),
+    ("panczeta", "pancetta"),
+    ("żodkiewka", "rzodkiewka"),
+    ("żotkiewkę", "rzodkiewka"),
+]
+
+
+@pytest.fixture(scope="module")
+def pizzas():
+    return build_form_index(PIZZAS)
+
+
+@pytest.fixture(scope="module")
+def ingredients():
+    return build_form_index(INGREDIENTS)
+
+
+@pytest.mark.parametrize("heard, expected", MISHEARD_PIZZAS)
+def test_misheard_pizza_names(pizzas, heard, expected):
+    assert pizzas.lookup_phonetic(heard) == expected
+
+
+@pytest.mark.parametrize("heard, expected", MISHEARD_INGREDIENTS)
+def test_misheard_ingredient_names(ingredients, heard, expected):
+    assert ingredients.lookup_phonetic(heard) == expected
+
+
+def test_phonetic_key_folds_spelling_variants():
+    assert phonetic_key("Mozzarella") == phonetic_key("mocarela")
+    assert phonetic_key("rzeżucha") == phonetic_key("żeżucha")
+    assert phonetic_key("ćwiartka") == phonetic_key("czwiartka")
+    assert phonetic_key("pepperoni") != phonetic_key("peperonata")
@@ -0,0 +1,25 @@
+import pytest
+from sqlalchemy import create_engine, exc
+
+from app.utils.pool_metrics import TimedQueuePool, get_pool_stats
+
+
+def test_exhausted_pool_counts_timeouts_and_checked_out(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'pool.db'}", poolclass=TimedQueuePool,
+                           pool_size=1, max_overflow=0, pool_timeout=0.05)
+    held = engine.connect()
+    with pytest.raises(exc.TimeoutError):
+        engine.connect()
+
+    stats = get_pool_stats(engine)
+    assert stats["pool_class"] == "TimedQueuePool"
+    assert (stats["size"], stats["checked_out"], stats["overflow"]) == (1, 1, 0)
+    assert (stats["checkouts"], stats["checkout_timeouts"]) == (2, 1)
+    assert stats["max_wait_ms"] >= 50
+
+    held.close()
+    with engine.connect():
+        assert get_pool_stats(engine)["checked_out"] == 1
+    stats = get_pool_stats(engine)
+    assert (stats["checked_out"], stats["checked_in"], stats["checkouts"], stats["checkout_timeouts"]) == (0, 1, 3, 1)
+    engine.dispose()
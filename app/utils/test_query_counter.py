@@ -0,0 +1,49 @@
+import pytest
+from sqlalchemy import create_engine, text
+
+from app.utils import query_counter
+from app.utils.query_counter import assert_max_queries, statement_shape, track_queries
+
+
+@pytest.fixture
+def engine():
+    engine = create_engine("sqlite://")
+    query_counter.install(engine)
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE pizzas (id INTEGER PRIMARY KEY, name TEXT)"))
+        conn.execute(text("INSERT INTO pizzas (name) VALUES ('Margherita'), ('Pepperoni'), ('Hawajska')"))
+    yield engine
+    engine.dispose()
+
+
+def test_statement_shape_ignores_parameter_values():
+    assert statement_shape("SELECT * FROM pizzas WHERE id = 1") == statement_shape("SELECT *  FROM pizzas WHERE id = 42")
+    assert statement_shape("SELECT * FROM pizzas WHERE id IN (?, ?, ?)") == "SELECT * FROM pizzas WHERE id IN (?...)"
+
+
+def test_track_queries_counts_and_flags_n_plus_one(engine):
+    with track_queries() as stats:
+        with engine.connect() as conn:
+            for pizza_id in (1, 2, 3):
+                conn.execute(text("SELECT name FROM pizzas WHERE id = :id"), {"id": pizza_id})
+    assert stats.count == 3
+    assert list(stats.duplicates(threshold=3).values()) == [3]
+
+
+def test_queries_outside_tracking_are_not_counted(engine):
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+    with track_queries() as stats:
+        pass
+    assert stats.count == 0
+
+
+def test_assert_max_queries(engine):
+    with assert_max_queries(1):
+        with engine.connect() as conn:
+            conn.execute(text("SELECT name FROM pizzas"))
+    with pytest.raises(AssertionError, match="2 queries, expected at most 1"):
+        with assert_max_queries(1):
+            with engine.connect() as conn:
+                conn.execute(text("SELECT 1"))
+                conn.execute(text("SELECT 2"))
@@ -0,0 +1,55 @@
+from app.utils.catalog import MenuCatalog
+from app.utils.slot_model import MISSING_SIZE, MISSING_THICKNESS, SlotCodec, diff_slots
+
+
+PIZZAS = [(1, "Margherita"), (2, "Capriciosa")]
+INGREDIENTS = [(1, "Pomidor"), (2, "Pieczarki"), (3, "Szynka")]
+
+
+def _codec():
+    return SlotCodec.build(MenuCatalog(PIZZAS, INGREDIENTS))
+
+
+def _slot(**changes):
+    slot = {"pizza": "margherita", "pizza_count": 2, "dough": {"big_size": True, "on_thick_pastry": None},
+            "extras": [("pieczarki", 1), ("szynka", 2)], "missing_info": ["Rozmiar", "Grubość ciasta"], "db_id": 7}
+    slot.update(changes)
+    return slot
+
+
+def test_round_trip_keeps_api_shape():
+    codec = _codec()
+    compact = codec.from_dict(_slot())
+    assert compact.pizza == 1
+    assert dict(compact.extras) == {2: 1, 3: 2}
+    assert compact.missing == MISSING_SIZE | MISSING_THICKNESS
+    assert codec.to_dict(compact) == _slot()
+
+    unknown = _slot(pizza="diabolo", extras=[("kawior", 1)], missing_info=[])
+    del unknown["db_id"]
+    assert codec.to_dict(codec.from_dict(unknown)) == unknown
+
+    new_label = _slot(missing_info=["Rozmiar", "Sos"])
+    assert codec.from_dict(new_label).missing_other == ("Sos",)
+    assert codec.to_dict(codec.from_dict(new_label)) == new_label
+
+
+def test_diff_reports_only_changed_fields():
+    codec = _codec()
+    before = codec.encode([_slot()])
+    after = codec.encode([_slot(pizza_count=3), _slot(pizza="capriciosa", db_id=8)])
+    assert diff_slots(codec, codec.encode([_slot()]), before) == "Brak zmian"
+    changes = diff_slots(codec, after, before)
+    assert changes.startswith("Zmieniona zmienna w slocie 7: pizza_count (z '2' na '3'), Nowy slot: {'pizza': 'capriciosa'")
+    assert diff_slots(codec, [], before).startswith("Slot usunięty: {'pizza': 'margherita'")
+
+
+def test_ids_missing_from_a_newer_menu_never_leak_as_names():
+    stored = _codec().encode([_slot()])
+    newer = SlotCodec.build(MenuCatalog([(2, "Capriciosa")], [(1, "Pomidor")]))  # bez margherity, pieczarek, szynki
+    assert newer.decode(stored) == [_slot()]
+
+    orphan = SlotCodec({}, {}, {}, {})  # id spoza każdej znanej wersji katalogu
+    decoded = orphan.to_dict(stored[0])
+    assert (decoded["pizza"], decoded["extras"]) == (None, [])
+    assert decoded["missing_info"] == ["Nazwa pizzy", "Rozmiar", "Grubość ciasta"]
@@ -0,0 +1,30 @@
+import os
+
+from sqlalchemy import create_engine, inspect
+
+from app.database import _async_url
+from app.utils import sqlite_tuning
+
+
+SEED_FILE = os.path.join(os.path.dirname(sqlite_tuning.ALEMBIC_DIR), "init_db.sql")
+
+
+def test_async_url_keeps_backend():
+    assert _async_url("sqlite:////data/pizzeria.db") == "sqlite+aiosqlite:////data/pizzeria.db"
+    assert _async_url("postgresql+psycopg2://u:p@db:5432/pizzeria") == "postgresql+asyncpg://u:p@db:5432/pizzeria"
+
+
+def test_pragmas_and_schema_on_new_database(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'pizzeria.db'}")
+    sqlite_tuning.install(engine)
+    with engine.connect() as connection:
+        assert connection.exec_driver_sql("PRAGMA journal_mode").scalar() == "wal"
+        assert connection.exec_driver_sql("PRAGMA foreign_keys").scalar() == 1
+
+    assert sqlite_tuning.create_schema(engine, SEED_FILE)
+    assert not sqlite_tuning.create_schema(engine, SEED_FILE)  # istniejąca baza zostaje bez zmian
+    assert {"orders", "order_pizzas", "transcription_logs"} <= set(inspect(engine).get_table_names())
+    with engine.connect() as connection:
+        assert connection.exec_driver_sql("SELECT version_num FROM alembic_version").scalar() \
+            == sqlite_tuning.alembic_head()
+        assert connection.exec_driver_sql("SELECT count(*) FROM pizzas").scalar() == 5
@@ -0,0 +1,36 @@
+import threading
+import time
+
+import pytest
+
+from app.utils import stack_sampler
+
+
+def _busy_parser(stop: threading.Event):
+    while not stop.is_set():
+        time.sleep(0.001)
+
+
+def test_collapsed_stacks_cover_other_threads():
+    stop = threading.Event()
+    worker = threading.Thread(target=_busy_parser, args=(stop,), name="parser-worker")
+    worker.start()
+    try:
+        result = stack_sampler.sample(0.2, interval=0.002)
+    finally:
+        stop.set()
+        worker.join()
+    assert result["samples"] > 10
+    text = stack_sampler.collapsed(result["stacks"], thread="parser-worker")
+    stack, count = text.splitlines()[0].rsplit(" ", 1)
+    assert stack.startswith("parser-worker;") and "test_stack_sampler.py:_busy_parser" in stack
+    assert int(count) > 0
+
+
+def test_only_one_session_at_a_time():
+    stack_sampler._running.acquire()
+    try:
+        with pytest.raises(stack_sampler.ProfilerBusy):
+            stack_sampler.sample(0.01)
+    finally:
+        stack_sampler._running.release()
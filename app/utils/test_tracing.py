@@ -0,0 +1,37 @@
+import threading
+
+from app.utils import tracing
+
+
+def test_spans_nest_across_threads_and_slow_traces_are_kept(monkeypatch):
+    exported = []
+    monkeypatch.setattr(tracing, "TRACE_FILE", "unused.jsonl")
+    monkeypatch.setattr(tracing, "_export", exported.append)
+
+    monkeypatch.setattr(tracing, "TRACE_SLOW_MS", 0)
+    with tracing.start_trace("POST /conversation/continue"):
+        with tracing.span("parse"):
+            worker = threading.Thread(target=lambda: tracing.add_span("db.query", 0.002, **{"db.statement": "SELECT ?"}))
+            worker.start()  # wątki bez kopii kontekstu nie należą do śladu
+            worker.join()
+            with tracing.span("parse.tokenize", tokens=3):
+                pass
+    assert not tracing.active()
+    (trace,) = exported
+    by_name = {span["name"]: span for span in trace.spans}
+    assert set(by_name) == {"POST /conversation/continue", "parse", "parse.tokenize"}
+    assert by_name["parse.tokenize"]["parentSpanId"] == by_name["parse"]["spanId"]
+    assert by_name["parse"]["parentSpanId"] == by_name["POST /conversation/continue"]["spanId"]
+    assert "parentSpanId" not in by_name["POST /conversation/continue"]
+    assert by_name["parse.tokenize"]["attributes"] == [{"key": "tokens", "value": {"intValue": "3"}}]
+
+    monkeypatch.setattr(tracing, "TRACE_SLOW_MS", 60_000)
+    with tracing.start_trace("GET /monitoring/ready"):
+        pass
+    assert len(exported) == 1
+
+
+def test_disabled_without_trace_file(monkeypatch):
+    monkeypatch.setattr(tracing, "TRACE_FILE", "")
+    with tracing.start_trace("GET /metrics"):
+        assert not tracing.active()
@@ -0,0 +1,190 @@
+# path/filename: utils/tracing.py
+"""
+Lekkie spany dla wolnych żądań: kolejność kroków jednej rozmowy (stan, katalog,
+spaCy, etapy parsera, zapytania SQL, zapis transkrypcji) z czasami.
+
+Ślad zaczyna się w middleware (start_trace) i żyje w ContextVar, więc spany
+z puli wątków (parser) i z run_sync (sesja SQLAlchemy) trafiają do tego samego
+śladu. Bez aktywnego śladu span() kosztuje jedno ContextVar.get().
+
+Tail sampling: po zakończeniu żądania zapisujemy ślad tylko wtedy, gdy trwało
+co najmniej TRACE_SLOW_MS. Zapis idzie przez kolejkę i wątek w tle do
+rotowanego pliku JSON lines (TRACE_FILE, pusty = śledzenie wyłączone) - jedna
+linia na ślad w kształcie OTLP/JSON (resourceSpans -> scopeSpans -> spans),
+takim jak z file exportera OpenTelemetry Collectora, więc można go wczytać
+do Jaegera/Tempo albo przejrzeć jq.
+"""
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import Dict, List, Optional
+
+
+TRACE_FILE = os.getenv("TRACE_FILE", "")
+TRACE_SLOW_MS = float(os.getenv("TRACE_SLOW_MS", "250"))
+TRACE_FILE_MAX_BYTES = int(os.getenv("TRACE_FILE_MAX_BYTES", str(10 * 1024 * 1024)))
+TRACE_FILE_BACKUPS = int(os.getenv("TRACE_FILE_BACKUPS", "3"))
+SERVICE_NAME = os.getenv("SERVICE_NAME", "pizza-assistant")
+
+TRACE_STATS = {"traces": 0, "exported": 0, "dropped": 0}
+
+_trace: ContextVar[Optional["Trace"]] = ContextVar("trace", default=None)
+_parent: ContextVar[Optional[str]] = ContextVar("trace_parent_span", default=None)
+
+# logger tylko do eksportu, bez propagacji do root (te linie nie są logami aplikacji)
+_exporter = logging.getLogger("app.traces")
+_exporter.propagate = False
+_listener: Optional[QueueListener] = None
+_listener_lock = threading.Lock()
+
+
+def _new_id(n_bytes: int) -> str:
+    return os.urandom(n_bytes).hex()
+
+
+class Trace:
+    __slots__ = ("trace_id", "spans")
+
+    def __init__(self):
+        self.trace_id = _new_id(16)
+        self.spans: List[dict] = []  # list.append jest atomowe, spany dopisują też wątki puli
+
+
+def _attribute(key: str, value) -> dict:
+    if isinstance(value, bool):
+        return {"key": key, "value": {"boolValue": value}}
+    if isinstance(value, int):
+        return {"key": key, "value": {"intValue": str(value)}}
+    if isinstance(value, float):
+        return {"key": key, "value": {"doubleValue": value}}
+    return {"key": key, "value": {"stringValue": str(value)}}
+
+
+def _record(trace: Trace, span_id: str, parent_id: Optional[str], name: str, start_ns: int, end_ns: int,
+            attributes: Dict[str, object], error: Optional[BaseException] = None):
+    span = {
+        "traceId": trace.trace_id,
+        "spanId": span_id,
+        "name": name,
+        "kind": 1,  # SPAN_KIND_INTERNAL
+        "startTimeUnixNano": str(start_ns),
+        "endTimeUnixNano": str(end_ns),
+        "attributes": [_attribute(key, value) for key, value in attributes.items() if value is not None],
+        "status": {"code": 2, "message": repr(error)} if error is not None else {},
+    }
+    if parent_id is not None:
+        span["parentSpanId"] = parent_id
+    trace.spans.append(span)
+
+
+def active() -> bool:
+    return _trace.get() is not None
+
+
+@contextmanager
+def span(name: str, **attributes):
+    trace = _trace.get()
+    if trace is None:
+        yield
+        return
+    span_id = _new_id(8)
+    parent_id = _parent.get()
+    token = _parent.set(span_id)
+    start_ns = time.time_ns()
+    error = None
+    try:
+        yield
+    except BaseException as exc:
+        error = exc
+        raise
+    finally:
+        _parent.reset(token)
+        _record(trace, span_id, parent_id, name, start_ns, time.time_ns(), attributes, error)
+
+
+def add_span(name: str, duration: float, **attributes):
+    """Span dla czegoś, co już się skończyło i trwało `duration` sekund (np. zapytanie SQL z eventu silnika)."""
+    trace = _trace.get()
+    if trace is None:
+        return
+    end_ns = time.time_ns()
+    _record(trace, _new_id(8), _parent.get(), name, end_ns - int(duration * 1e9), end_ns, attributes)
+
+
+@contextmanager
+def start_trace(name: str, **attributes):
+    """Ślad całego żądania; po zakończeniu zapisywany tylko, jeśli był wolniejszy niż TRACE_SLOW_MS."""
+    if not TRACE_FILE:
+        yield
+        return
+    trace = Trace()
+    trace_token = _trace.set(trace)
+    started = time.perf_counter()
+    try:
+        with span(name, **attributes):
+            yield
+    finally:
+        _trace.reset(trace_token)
+        TRACE_STATS["traces"] += 1
+        if (time.perf_counter() - started) * 1000 >= TRACE_SLOW_MS:
+            _export(trace)
+
+
+class _DroppingQueueHandler(QueueHandler):
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            TRACE_STATS["dropped"] += 1
+
+
+def _start_exporter():
+    """Plik i wątek zapisu tworzymy przy pierwszym wolnym żądaniu."""
+    global _listener
+    with _listener_lock:
+        if _listener is not None:
+            return
+        handler = RotatingFileHandler(TRACE_FILE, maxBytes=TRACE_FILE_MAX_BYTES, backupCount=TRACE_FILE_BACKUPS,
+                                      encoding="utf-8")
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        listener = QueueListener(queue.Queue(maxsize=1000), handler)
+        listener.start()
+        _exporter.addHandler(_DroppingQueueHandler(listener.queue))
+        _exporter.setLevel(logging.INFO)
+        _listener = listener
+
+
+def _reset_exporter_after_fork():
+    """Wątek zapisu nie przeżywa forka - worker założy własny przy pierwszym wolnym żądaniu."""
+    global _listener, _listener_lock
+    _listener = None
+    _listener_lock = threading.Lock()
+    for handler in list(_exporter.handlers):
+        _exporter.removeHandler(handler)
+
+
+os.register_at_fork(after_in_child=_reset_exporter_after_fork)
+
+
+def _export(trace: Trace):
+    if _listener is None:
+        _start_exporter()
+    line = {
+        "resourceSpans": [{
+            "resource": {"attributes": [_attribute("service.name", SERVICE_NAME),
+                                        _attribute("process.pid", os.getpid())]},
+            "scopeSpans": [{"scope": {"name": "app.utils.tracing"}, "spans": trace.spans}],
+        }]
+    }
+    _exporter.info("%s", json.dumps(line, ensure_ascii=False))
+    TRACE_STATS["exported"] += 1
+
+
+def get_trace_stats() -> dict:
+    return {**TRACE_STATS, "enabled": bool(TRACE_FILE), "slow_ms": TRACE_SLOW_MS, "file": TRACE_FILE}
@@ -0,0 +1,86 @@
+# path/filename: gunicorn.conf.py
+"""
+Produkcyjne uruchomienie: gunicorn jako master + N workerów uvicorn.
+
+    gunicorn -c gunicorn.conf.py app.main:app
+
+Master importuje aplikację (preload_app), ładuje model spaCy, katalog menu
+i indeksy parsera, a dopiero potem forkuje workery - strony pamięci z modelem
+są współdzielone copy-on-write zamiast ładowane osobno w każdym workerze.
+gc.freeze() przed forkiem przenosi te obiekty do stałej generacji, żeby
+odśmiecanie w workerach nie dotykało ich nagłówków i nie kopiowało stron.
+
+Po forku worker zamyka odziedziczone pule połączeń (dispose(close=False) -
+gniazda należą do mastera); kolejkę logów i eksporter śladów odtwarzają
+hooki os.register_at_fork w utils/logger.py i utils/tracing.py.
+
+Zmienne środowiskowe:
+  WEB_CONCURRENCY                liczba workerów (domyślnie liczba rdzeni),
+  PORT                           port (8005),
+  GUNICORN_MAX_REQUESTS          po tylu żądaniach worker kończy się łagodnie i master
+                                 startuje nowy (0 = bez recyklingu),
+  GUNICORN_MAX_REQUESTS_JITTER   losowy rozrzut, żeby workery nie restartowały się naraz,
+  GUNICORN_TIMEOUT               worker bez znaku życia dłużej niż tyle sekund jest zabijany,
+  GUNICORN_GRACEFUL_TIMEOUT      czas na dokończenie żądań przy restarcie / zatrzymaniu.
+
+Pula połączeń DB jest per worker: do bazy trafia do
+WEB_CONCURRENCY * (DB_POOL_SIZE + DB_MAX_OVERFLOW) połączeń na silnik.
+"""
+import gc
+import logging
+import os
+import time
+
+
+workers = int(os.getenv("WEB_CONCURRENCY", str(os.cpu_count() or 1)))
+worker_class = "uvicorn_worker.UvicornWorker"
+bind = f"0.0.0.0:{os.getenv('PORT', '8005')}"
+preload_app = True
+
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", "5000"))
+max_requests_jitter = int(os.getenv("GUNICORN_MAX_REQUESTS_JITTER", "500"))
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "60"))
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", "30"))
+keepalive = 5
+
+# plik heartbeat workerów w tmpfs - na overlayfs w kontenerze zapis potrafi blokować
+worker_tmp_dir = "/dev/shm" if os.path.isdir("/dev/shm") else None
+
+log = logging.getLogger("app.gunicorn")
+
+
+def when_ready(server):
+    """
+    Master, przed uruchomieniem workerów: model, katalog i indeksy parsera.
+    Gdy baza jeszcze nie wstała, workery rozgrzeją się same (lifespan w app.main).
+    """
+    from app.database import IS_SQLITE, SessionLocal, async_engine, engine
+    from app.routers import analyze_order
+    from app.utils import sqlite_tuning
+
+    started = time.perf_counter()
+    try:
+        if IS_SQLITE:
+            sqlite_tuning.create_schema(engine, sqlite_tuning.SQLITE_SEED_FILE)
+        with SessionLocal() as db:
+            analyze_order.warm_up(db)
+        log.info("Preloaded model and catalog in master in %.2f s", time.perf_counter() - started)
+    except Exception:
+        log.exception("Preload in master failed, workers will warm up on their own")
+    finally:
+        # żadnych otwartych połączeń w masterze - workery nie mogą współdzielić gniazd
+        engine.dispose()
+        async_engine.sync_engine.dispose()
+    gc.freeze()
+
+
+def pre_fork(server, worker):
+    # obiekty zaalokowane w masterze od poprzedniego forka (np. przy recyklingu workerów)
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    from app.database import async_engine, engine
+
+    engine.dispose(close=False)
+    async_engine.sync_engine.dispose(close=False)
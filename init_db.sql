@@ -21,13 +21,11 @@ INSERT INTO ingredients (name, category, price) VALUES
 ('Tuńczyk', 'seafood', 3);
 
 -- Wypełnienie tabeli doughs
-INSERT INTO doughs (big_size, on_thick_pastry, without_gluten, price) VALUES
-(false, false, false, 7.0),
-(false, true, false, 9.0),
-(true, false, false, 11.0),
-(true, true, false, 13.0),
-(false, false, true, 10.0),
-(true, false, true, 14.0);
+INSERT INTO doughs (big_size, on_thick_pastry, price) VALUES
+(false, false, 7.0),
+(false, true, 9.0),
+(true, false, 11.0),
+(true, true, 13.0);
 
 -- Wypełnienie tabeli pizzas
 INSERT INTO pizzas (name, in_menu) VALUES
@@ -101,16 +99,16 @@ INSERT INTO pizza_doughs (pizza_id, dough_id) VALUES
 (3, 4); -- Vegetarian: big, thick, gluten-free
 
 -- Wypełnienie tabeli clients
-INSERT INTO clients (phone, address) VALUES
-('123-456-789', 'ul. Pleśniowa 123'),
-('987-654-321', 'ul. Pomidorowa 321');
+INSERT INTO clients (phone) VALUES
+('123-456-789'),
+('987-654-321');
 
 -- Wypełnienie tabeli orders
 INSERT INTO orders (order_start_time, total_price, client_id) VALUES
 ('2024-12-08 18:00:00', 12.5, 1),
 ('2024-12-08 19:00:00', 15.0, 2);
 
-INSERT INTO order_pizzas (order_id, pizza_id, dough_id, quantity) VALUES
-(1, 1, 2, 1), -- Order 1: Margherita
-(1, 3, 4, 1), -- Order 1: Vegetarian
-(2, 2, 1, 2);-- Order 2: Pepperoni
\ No newline at end of file
+INSERT INTO order_pizzas (order_id, pizza_id, dough_id, quantity, is_partial) VALUES
+(1, 1, 2, 1, false), -- Order 1: Margherita
+(1, 3, 4, 1, false), -- Order 1: Vegetarian
+(2, 2, 1, 2, false);-- Order 2: Pepperoni
\ No newline at end of file